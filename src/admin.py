@@ -107,7 +107,8 @@ def view_indexed_documents():
     console.input("\nPress Enter to return to menu...")
 
 def index_documents(index_documents_manager:DocumentIndexingManager):
-    index_documents_manager.start_indexing_from_directory()
+    num_indexed = index_documents_manager.start_indexing_from_directory()
+    console.print(f"[green]{num_indexed} new or changed document(s) indexed.[/green]")
     
     console.input("\nPress Enter to return to menu...")
 
@@ -0,0 +1,143 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import sys
+import os
+
+# Make the application packages (system, services, models) importable when run as a script
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['OTEL_SDK_DISABLED'] = 'true'
+
+import json
+import time
+from pathlib import Path
+from typing import List, Tuple, Dict, Any, Iterable
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from rich.console import Console
+from rich.table import Table
+
+from system.setup import do_setup
+from models.database import TABLE_NAME_EMBEDDING_DATA
+
+console = Console()
+
+
+def setup_benchmark():
+    config, logger = do_setup()
+    # Measure retrieval itself, a repeated query must not be answered from the result caches
+    config['retrieval_cache_enabled'] = False
+    config['answer_cache_enabled'] = False
+    return config, logger
+
+
+def load_chunk_queries(config, num_queries: int, query_words: int = 12) -> List[Tuple[str, List[str]]]:
+    """
+    Build (query, relevant node ids) pairs from the indexed corpus itself: every query is a window of
+    words taken from the middle of a stored chunk and that chunk is the one relevant result.
+    The sample is deterministic so repeated runs compare like with like.
+    """
+    engine = create_engine(config['postgresql_conn_str'])
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(f"SELECT node_id, text FROM {TABLE_NAME_EMBEDDING_DATA} ORDER BY md5(node_id) LIMIT :limit"),
+            {"limit": int(num_queries)},
+        ).all()
+    engine.dispose()
+
+    queries = []
+    for node_id, chunk_text in rows:
+        words = chunk_text.split()
+        if len(words) < query_words:
+            continue
+        start = (len(words) - query_words) // 2
+        queries.append((" ".join(words[start:start + query_words]), [node_id]))
+    return queries
+
+
+def load_chunk_texts(config, num_texts: int) -> List[str]:
+    # Full chunk texts, same deterministic sample as load_chunk_queries
+    engine = create_engine(config['postgresql_conn_str'])
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(f"SELECT text FROM {TABLE_NAME_EMBEDDING_DATA} ORDER BY md5(node_id) LIMIT :limit"),
+            {"limit": int(num_texts)},
+        ).all()
+    engine.dispose()
+    return [row[0] for row in rows]
+
+
+def load_query_file(file_path: str) -> List[Tuple[str, List[str]]]:
+    # JSONL with one {"query": "...", "relevant_node_ids": ["..."]} object per line
+    queries = []
+    with open(Path(file_path), "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            queries.append((item["query"], list(item["relevant_node_ids"])))
+    return queries
+
+
+def load_queries(config, queries_file: str = None, num_queries: int = 100, query_words: int = 12) -> List[Tuple[str, List[str]]]:
+    if queries_file:
+        return load_query_file(queries_file)
+    return load_chunk_queries(config, num_queries, query_words)
+
+
+def recall_at_k(retrieved_ids: List[str], relevant_ids: Iterable[str], k: int) -> float:
+    relevant_ids = set(relevant_ids)
+    if not relevant_ids:
+        return 0.0
+    return len(relevant_ids.intersection(retrieved_ids[:k])) / len(relevant_ids)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    latencies_ms = np.asarray(latencies, dtype=float) * 1000.0
+    if latencies_ms.size == 0:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def timed(fn, *args, **kwargs) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_message(message: str, style: str = None):
+    # Plain text next to the result tables, markup off so brackets in the text print as they are
+    console.print(message, style=style, markup=False)
+
+
+def print_warning(message: str):
+    print_message(message, style="yellow")
+
+
+def print_results(title: str, rows: List[Dict[str, Any]]):
+    if not rows:
+        console.print(f"[yellow]{title}: no results[/yellow]")
+        return
+
+    table = Table(title=title)
+    columns = list(rows[0].keys())
+    for column in columns:
+        table.add_column(column)
+    for row in rows:
+        table.add_row(*[f"{row[column]:.4f}" if isinstance(row[column], float) else str(row[column]) for column in columns])
+    console.print(table)
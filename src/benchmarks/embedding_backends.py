@@ -0,0 +1,93 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Throughput, single-query latency and cosine agreement of the ONNX embedding backend (fp32 and int8) vs PyTorch.
+# Texts are chunks from the indexed corpus; agreement is the cosine similarity to the PyTorch vector of the same text.
+# Usage (from the project root):
+#   python src/benchmarks/embedding_backends.py --num-texts 256 --quantization avx512_vnni --threads 4
+
+import argparse
+import time
+
+import numpy as np
+
+from common import setup_benchmark, load_chunk_queries, load_chunk_texts, latency_summary, timed, print_results, print_warning
+
+
+def embed_texts(embed_model, texts, batch_size):
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embed_model.get_text_embedding_batch(texts[start:start + batch_size]))
+    return np.asarray(vectors, dtype=float)
+
+
+def cosine_agreement(vectors, reference_vectors):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    reference_vectors = reference_vectors / np.linalg.norm(reference_vectors, axis=1, keepdims=True)
+    return np.sum(vectors * reference_vectors, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX Runtime embedding backends.")
+    parser.add_argument("--num-texts", type=int, default=256)
+    parser.add_argument("--num-queries", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantization", type=str, default="avx2")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--model", type=str, default=None)
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.embeddings import get_embedding_model, create_onnx_embedding, EMBEDDING_BACKEND_HUGGINGFACE, ONNX_QUANTIZATION_NONE
+
+    model_name = args.model or config['model_embedding']
+    # Full chunk texts for throughput, short query windows for latency
+    texts = load_chunk_texts(config, args.num_texts)
+    queries = [query for query, _ in load_chunk_queries(config, args.num_queries)]
+    if not texts or not queries:
+        print_warning("No chunks available, index some documents first.")
+        return
+
+    backends = [
+        ("pytorch", lambda: get_embedding_model(model_name, EMBEDDING_BACKEND_HUGGINGFACE)),
+        ("onnx fp32", lambda: create_onnx_embedding(model_name, ONNX_QUANTIZATION_NONE, args.threads, config.get('onnx_model_dir', 'data/onnx_models'))),
+        (f"onnx int8 ({args.quantization})", lambda: create_onnx_embedding(model_name, args.quantization, args.threads, config.get('onnx_model_dir', 'data/onnx_models'))),
+    ]
+
+    results, reference_vectors = [], None
+    for backend_name, create_model in backends:
+        embed_model = create_model()
+        embed_model.get_query_embedding(queries[0])  # warm up
+
+        start = time.perf_counter()
+        vectors = embed_texts(embed_model, texts, args.batch_size)
+        elapsed = time.perf_counter() - start
+        latencies = [timed(embed_model.get_query_embedding, query)[1] for query in queries]
+
+        if reference_vectors is None:
+            reference_vectors = vectors
+        agreement = cosine_agreement(vectors, reference_vectors)
+        results.append({
+            "backend": backend_name,
+            "texts": len(texts),
+            "texts_per_s": len(texts) / elapsed,
+            **latency_summary(latencies),
+            "cosine_mean": float(agreement.mean()),
+            "cosine_min": float(agreement.min()),
+        })
+
+    print_results(f"Embedding backends ({model_name})", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# HNSW parameter autotuner: sweeps ef_search (and optionally m / ef_construction, each rebuilding the index in place)
+# against exact brute-force search on the indexed corpus, prints the recall/latency curve and recommends the fastest
+# setting that reaches the target recall. The configured index parameters are restored at the end.
+# Usage (from the project root):
+#   python src/benchmarks/hnsw_autotune.py --target-recall 0.95 --ef-search 10,20,40,64,100,200,400
+#   python src/benchmarks/hnsw_autotune.py --m 16,32 --ef-construction 64,128 --top-k 10
+
+import argparse
+
+from common import setup_benchmark, load_queries, latency_summary, timed, print_results, print_message, print_warning
+
+
+def parse_values(values: str):
+    return [int(value) for value in values.split(",") if value.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune HNSW m, ef_construction and ef_search for a target recall.")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--ef-search", type=str, default="10,20,40,64,100,200,400")
+    parser.add_argument("--m", type=str, default=None, help="comma separated, default: the configured hnsw_m")
+    parser.add_argument("--ef-construction", type=str, default=None, help="comma separated, default: the configured hnsw_ef_construction")
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager
+    from services.vectorstore import HNSW_MAX_EF_SEARCH
+
+    rag_manager = RAGManager()
+    vector_store_manager = rag_manager.vector_store_manager
+    queries = load_queries(config, args.queries_file, args.num_queries, args.query_words)
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    query_embeddings = rag_manager.get_query_embeddings([query for query, _ in queries])
+    # Exact top-k per query (sequential scan) is the reference every HNSW setting is measured against
+    exact_ids = [[node.node.node_id for node in nodes] for nodes in vector_store_manager.batch_vector_search(query_embeddings, args.top_k, exact=True)]
+
+    configured = (vector_store_manager.hnsw_m, vector_store_manager.hnsw_ef_construction)
+    m_values = parse_values(args.m) if args.m else [configured[0]]
+    ef_construction_values = parse_values(args.ef_construction) if args.ef_construction else [configured[1]]
+    ef_search_values = [ef_search for ef_search in parse_values(args.ef_search) if 1 <= ef_search <= HNSW_MAX_EF_SEARCH]
+
+    results = []
+    try:
+        for m in m_values:
+            for ef_construction in ef_construction_values:
+                vector_store_manager.hnsw_m, vector_store_manager.hnsw_ef_construction = m, ef_construction
+                (is_built, build_s) = timed(vector_store_manager.ensure_vector_storage_index)
+                if not is_built:
+                    print_warning(f"Skipping m={m}, ef_construction={ef_construction}, the index could not be built.")
+                    continue
+                index_mb = vector_store_manager.get_vector_index_size() / (1024 * 1024)
+
+                for ef_search in ef_search_values:
+                    vector_store_manager.batch_vector_search(query_embeddings[:1], args.top_k, ef_search=ef_search)  # warm up the index pages
+                    recalls, latencies = [], []
+                    for query_embedding, reference in zip(query_embeddings, exact_ids):
+                        nodes, elapsed = timed(vector_store_manager.batch_vector_search, [query_embedding], args.top_k, ef_search=ef_search)
+                        ids = [node.node.node_id for node in nodes[0]]
+                        recalls.append(len(set(ids) & set(reference)) / max(len(reference), 1))
+                        latencies.append(elapsed)
+                    results.append({
+                        "m": m,
+                        "ef_construction": ef_construction,
+                        "ef_search": ef_search,
+                        "build_s": build_s,
+                        "index_mb": index_mb,
+                        f"recall@{args.top_k}_vs_exact": sum(recalls) / len(recalls),
+                        **latency_summary(latencies),
+                    })
+    finally:
+        vector_store_manager.hnsw_m, vector_store_manager.hnsw_ef_construction = configured
+        vector_store_manager.ensure_vector_storage_index()
+
+    print_results(f"HNSW recall/latency curve ({vector_store_manager.vector_storage} storage, top_k={args.top_k})", results)
+
+    recall_column = f"recall@{args.top_k}_vs_exact"
+    candidates = [row for row in results if row[recall_column] >= args.target_recall]
+    if not candidates:
+        best = max(results, key=lambda row: row[recall_column], default=None)
+        if best:
+            print_warning(f"No setting reaches recall {args.target_recall}, best is {best[recall_column]:.4f} "
+                  f"(m={best['m']}, ef_construction={best['ef_construction']}, ef_search={best['ef_search']}). Try larger values.")
+        return
+
+    best = min(candidates, key=lambda row: row["p95_ms"])
+    print_message(f"Recommended for recall >= {args.target_recall}: recall {best[recall_column]:.4f}, p95 {best['p95_ms']:.2f} ms")
+    print_message(f"  hnsw_m: {best['m']}")
+    print_message(f"  hnsw_ef_construction: {best['ef_construction']}")
+    print_message(f"  hnsw_ef_search: {best['ef_search']}  (or per request: \"ef_search\": {best['ef_search']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Throughput of a sequential query_context_retrieval loop vs query_context_retrieval_batch.
+# The batch path embeds all queries in one model call and fetches every neighbour list in one SQL round trip.
+# Usage (from the project root):
+#   python src/benchmarks/retrieval_batch.py --num-queries 100 --batch-size 100
+
+import argparse
+import time
+
+from common import setup_benchmark, load_queries, print_results, print_message, print_warning
+
+
+def run_sequential(rag_manager, queries, batch_size):
+    for query in queries:
+        rag_manager.query_context_retrieval(query)
+
+
+def run_batch(rag_manager, queries, batch_size):
+    for start in range(0, len(queries), batch_size):
+        rag_manager.query_context_retrieval_batch(queries[start:start + batch_size])
+
+
+def check_same_results(rag_manager, queries):
+    # The batch path must return the same chunks as the single-query path
+    mismatches = 0
+    for query, (_, batch_sources, _, _) in zip(queries, rag_manager.query_context_retrieval_batch(queries)):
+        _, sources, _, _ = rag_manager.query_context_retrieval(query)
+        if [source["text"] for source in sources] != [source["text"] for source in batch_sources]:
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and batched multi-query retrieval.")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--retrieval-mode", type=str, default=None)
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager
+
+    rag_manager = RAGManager()
+    queries = [query for query, _ in load_queries(config, args.queries_file, args.num_queries, args.query_words)]
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    if args.retrieval_mode:
+        rag_manager.retrieval_mode = args.retrieval_mode
+    rag_manager.query_context_retrieval_batch(queries[:2])  # warm up model and connection pool
+    rag_manager.query_context_retrieval(queries[0])
+
+    results = []
+    for path_name, runner in [("sequential", run_sequential), ("batch", run_batch)]:
+        RAGManager.embedding_cache.clear()  # every run pays for its own query embeddings
+        start = time.perf_counter()
+        runner(rag_manager, queries, args.batch_size)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "path": path_name,
+            "retrieval_mode": rag_manager.retrieval_mode,
+            "queries": len(queries),
+            "total_s": elapsed,
+            "throughput_qps": len(queries) / elapsed,
+        })
+
+    print_results("Sequential vs batched retrieval", results)
+    print_message(f"Queries with different results between paths: {check_same_results(rag_manager, queries[:20])}")
+
+
+if __name__ == "__main__":
+    main()
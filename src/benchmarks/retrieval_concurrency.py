@@ -0,0 +1,99 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Throughput of the blocking retrieval path vs aquery_context_retrieval under parallel requests.
+# "blocking" calls query_context_retrieval inside coroutines, as the chat handler did before the async path.
+# Usage (from the project root):
+#   python src/benchmarks/retrieval_concurrency.py --num-queries 100 --concurrency 1 4 16
+
+import argparse
+import asyncio
+import time
+
+from common import setup_benchmark, load_queries, latency_summary, print_results, print_warning
+
+
+async def run_blocking(rag_manager, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query):
+        async with semaphore:
+            start = time.perf_counter()
+            rag_manager.query_context_retrieval(query)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[one(query) for query in queries])
+    return latencies
+
+
+async def run_async(rag_manager, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query):
+        async with semaphore:
+            start = time.perf_counter()
+            await rag_manager.aquery_context_retrieval(query)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[one(query) for query in queries])
+    return latencies
+
+
+async def run_benchmark(rag_manager, queries, concurrency_levels):
+    from services.rag import RAGManager
+
+    results = []
+    await rag_manager.aquery_context_retrieval(queries[0])  # warm up both engines
+    rag_manager.query_context_retrieval(queries[0])
+
+    for concurrency in concurrency_levels:
+        for path_name, runner in [("blocking", run_blocking), ("async", run_async)]:
+            RAGManager.embedding_cache.clear()  # every run pays for its own query embeddings
+            start = time.perf_counter()
+            latencies = await runner(rag_manager, queries, concurrency)
+            elapsed = time.perf_counter() - start
+            results.append({
+                "path": path_name,
+                "concurrency": concurrency,
+                "queries": len(queries),
+                "throughput_qps": len(queries) / elapsed,
+                **latency_summary(latencies),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare blocking and async retrieval under concurrent load.")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager
+
+    rag_manager = RAGManager()
+    queries = [query for query, _ in load_queries(config, args.queries_file, args.num_queries, args.query_words)]
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    results = asyncio.run(run_benchmark(rag_manager, queries, args.concurrency))
+    print_results("Blocking vs async retrieval", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Recall@k and latency of pure vector retrieval vs hybrid (vector + full-text, RRF) retrieval.
+# Usage (from the project root):
+#   python src/benchmarks/retrieval_hybrid.py --num-queries 100 --top-k 10
+#   python src/benchmarks/retrieval_hybrid.py --queries-file data/eval_queries.jsonl
+
+import argparse
+
+from common import setup_benchmark, load_queries, recall_at_k, latency_summary, timed, print_results, print_warning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector and hybrid retrieval (recall@k, latency).")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager, RETRIEVAL_MODES
+
+    rag_manager = RAGManager()
+    queries = load_queries(config, args.queries_file, args.num_queries, args.query_words)
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    # Embed up front so both modes are timed on retrieval alone
+    query_bundles = [rag_manager._embed_query(query) for query, _ in queries]
+
+    results = []
+    for retrieval_mode in RETRIEVAL_MODES:
+        recalls, latencies = [], []
+        rag_manager._retrieve_nodes(query_bundles[0], args.top_k, retrieval_mode)  # warm up connections
+        for query_bundle, (_, relevant_ids) in zip(query_bundles, queries):
+            nodes, elapsed = timed(rag_manager._retrieve_nodes, query_bundle, args.top_k, retrieval_mode)
+            latencies.append(elapsed)
+            recalls.append(recall_at_k([node.node.node_id for node in nodes], relevant_ids, args.top_k))
+
+        results.append({
+            "mode": retrieval_mode,
+            "queries": len(queries),
+            f"recall@{args.top_k}": sum(recalls) / len(recalls),
+            **latency_summary(latencies),
+        })
+
+    print_results("Vector vs hybrid retrieval", results)
+
+
+if __name__ == "__main__":
+    main()
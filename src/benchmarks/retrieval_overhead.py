@@ -0,0 +1,80 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Per-stage cost of the objects built around each retrieval and ingestion call:
+# a fresh VectorIndexRetriever vs the cached one, QueryBundle construction, SentenceSplitter construction vs reuse, and a full retriever run with a fresh vs a cached retriever.
+# The retriever serves full-text search, dense queries run VectorStoreManager.batch_vector_search without one.
+# Usage (from the project root):
+#   python src/benchmarks/retrieval_overhead.py --iterations 1000 --num-queries 50
+
+import argparse
+import time
+
+from common import setup_benchmark, load_queries, latency_summary, print_results, print_warning
+
+
+def measure(stage, fn, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return {"stage": stage, "iterations": iterations, **latency_summary(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-call object construction overhead of retrieval and ingestion.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--num-queries", type=int, default=50)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--top-k", type=int, default=None)
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from llama_index.core import QueryBundle
+    from llama_index.core.node_parser import SentenceSplitter
+    from llama_index.core.vector_stores.types import VectorStoreQueryMode
+    from services.rag import RAGManager
+
+    rag_manager = RAGManager()
+    top_k = args.top_k or int(config['top_k_retrieval'])
+    query_mode = VectorStoreQueryMode.TEXT_SEARCH
+
+    results = [
+        measure("retriever: new", lambda: rag_manager._create_retriever(top_k, query_mode), args.iterations),
+        measure("retriever: cached", lambda: rag_manager._get_retriever(top_k, query_mode), args.iterations),
+        measure("query bundle", lambda: QueryBundle(query_str="benchmark query", embedding=[0.0]), args.iterations),
+        measure("splitter: new", lambda: SentenceSplitter(chunk_size=int(config['chunk_size']), chunk_overlap=int(config['chunk_overlap']), separator=" "), args.iterations),
+        measure("splitter: cached", rag_manager._get_node_parser, args.iterations),
+    ]
+
+    queries = [query for query, _ in load_queries(config, args.queries_file, args.num_queries, args.query_words)]
+    if queries:
+        bundles = [QueryBundle(query_str=query, embedding=embedding) for query, embedding in zip(queries, rag_manager.get_query_embeddings(queries))]
+        rag_manager._get_retriever(top_k, query_mode).retrieve(bundles[0])  # warm up connection pool
+        for stage, get_retriever in [("retrieve: new retriever", rag_manager._create_retriever), ("retrieve: cached retriever", rag_manager._get_retriever)]:
+            latencies = []
+            for bundle in bundles:
+                start = time.perf_counter()
+                get_retriever(top_k, query_mode).retrieve(bundle)
+                latencies.append(time.perf_counter() - start)
+            results.append({"stage": stage, "iterations": len(bundles), **latency_summary(latencies)})
+    else:
+        print_warning("No queries available, index some documents to measure full retrieval.")
+
+    print_results("Per-call object overhead", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Recall@k and latency of two-stage retrieval with a dimension-reduced first pass ("reduced" vector storage):
+# HNSW over the first N dimensions returns top_k * rescore_factor candidates, re-scored with the full vectors.
+# Every reduced dimension rebuilds the HNSW index in place and the configured storage is restored at the end.
+# Usage (from the project root):
+#   python src/benchmarks/retrieval_two_stage.py --reduced-dims 128,256,512 --rescore-factors 4,10 --top-k 10
+
+import argparse
+
+from common import setup_benchmark, load_queries, recall_at_k, latency_summary, timed, print_results, print_warning
+
+
+def run_queries(vector_store_manager, query_embeddings, queries, top_k):
+    recalls, latencies, retrieved_ids = [], [], []
+    vector_store_manager.batch_vector_search(query_embeddings[:1], top_k)  # warm up the index pages
+    for query_embedding, (_, relevant_ids) in zip(query_embeddings, queries):
+        nodes, elapsed = timed(vector_store_manager.batch_vector_search, [query_embedding], top_k)
+        ids = [node.node.node_id for node in nodes[0]]
+        latencies.append(elapsed)
+        recalls.append(recall_at_k(ids, relevant_ids, top_k))
+        retrieved_ids.append(ids)
+    return recalls, latencies, retrieved_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-dimension HNSW with a reduced-dimension first pass plus re-scoring.")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--reduced-dims", type=str, default="128,256,512")
+    parser.add_argument("--rescore-factors", type=str, default="4,10")
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager
+    from services.vectorstore import VECTOR_STORAGE_FLOAT32, VECTOR_STORAGE_REDUCED
+    from services.embeddings import is_matryoshka_model
+
+    rag_manager = RAGManager()
+    vector_store_manager = rag_manager.vector_store_manager
+    queries = load_queries(config, args.queries_file, args.num_queries, args.query_words)
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    if not is_matryoshka_model():
+        print_warning(f"{config['model_embedding']} is not Matryoshka-trained, expect poor recall from its leading dimensions (the service refuses the reduced mode for it).")
+
+    query_embeddings = rag_manager.get_query_embeddings([query for query, _ in queries])
+    configured = (vector_store_manager.vector_storage, vector_store_manager.reduced_dim, vector_store_manager.rescore_factor)
+    reduced_dims = [int(dim) for dim in args.reduced_dims.split(",") if 0 < int(dim) < vector_store_manager.embed_dim]
+    rescore_factors = [int(factor) for factor in args.rescore_factors.split(",")]
+
+    results = []
+    try:
+        vector_store_manager.vector_storage = VECTOR_STORAGE_FLOAT32
+        if not vector_store_manager.ensure_vector_storage_index(VECTOR_STORAGE_FLOAT32):
+            print_warning("The float32 index could not be built.")
+            return
+        recalls, latencies, float32_ids = run_queries(vector_store_manager, query_embeddings, queries, args.top_k)
+        results.append({
+            "storage": f"float32 ({vector_store_manager.embed_dim})",
+            "rescore_factor": "-",
+            "index_mb": vector_store_manager.get_vector_index_size(VECTOR_STORAGE_FLOAT32) / (1024 * 1024),
+            f"recall@{args.top_k}": sum(recalls) / len(recalls),
+            f"overlap@{args.top_k}_vs_float32": 1.0,
+            **latency_summary(latencies),
+        })
+
+        vector_store_manager.vector_storage = VECTOR_STORAGE_REDUCED
+        for reduced_dim in reduced_dims:
+            vector_store_manager.reduced_dim = reduced_dim
+            if not vector_store_manager.ensure_vector_storage_index(VECTOR_STORAGE_REDUCED):
+                print_warning(f"Skipping reduced ({reduced_dim}), the index could not be built.")
+                continue
+            index_mb = vector_store_manager.get_vector_index_size(VECTOR_STORAGE_REDUCED) / (1024 * 1024)
+            for rescore_factor in rescore_factors:
+                vector_store_manager.rescore_factor = rescore_factor
+                recalls, latencies, retrieved_ids = run_queries(vector_store_manager, query_embeddings, queries, args.top_k)
+                overlap = [len(set(ids) & set(reference)) / max(len(reference), 1) for ids, reference in zip(retrieved_ids, float32_ids)]
+                results.append({
+                    "storage": f"reduced ({reduced_dim})",
+                    "rescore_factor": rescore_factor,
+                    "index_mb": index_mb,
+                    f"recall@{args.top_k}": sum(recalls) / len(recalls),
+                    f"overlap@{args.top_k}_vs_float32": sum(overlap) / len(overlap),
+                    **latency_summary(latencies),
+                })
+    finally:
+        vector_store_manager.vector_storage, vector_store_manager.reduced_dim, vector_store_manager.rescore_factor = configured
+        vector_store_manager.ensure_vector_storage_index(configured[0])
+
+    print_results("Two-stage retrieval with a reduced first pass", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+# Index size, recall@k and latency of the float32, halfvec and binary vector storage modes.
+# Every mode migrates the HNSW index in place (building it can take a while) and the configured mode is restored at the end.
+# Usage (from the project root):
+#   python src/benchmarks/vector_storage.py --num-queries 100 --top-k 10 --rescore-factor 4
+
+import argparse
+
+from common import setup_benchmark, load_queries, recall_at_k, latency_summary, timed, print_results, print_warning
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector storage modes (index size, recall@k, latency).")
+    parser.add_argument("--num-queries", type=int, default=100)
+    parser.add_argument("--query-words", type=int, default=12)
+    parser.add_argument("--queries-file", type=str, default=None)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=None)
+    args = parser.parse_args()
+
+    config, logger = setup_benchmark()
+
+    from services.rag import RAGManager
+    from services.vectorstore import VECTOR_STORAGE_MODES, VECTOR_STORAGE_FLOAT32
+
+    rag_manager = RAGManager()
+    vector_store_manager = rag_manager.vector_store_manager
+    queries = load_queries(config, args.queries_file, args.num_queries, args.query_words)
+    if not queries:
+        print_warning("No queries available, index some documents first.")
+        return
+
+    # Embed up front so every mode is timed on retrieval alone
+    query_embeddings = rag_manager.get_query_embeddings([query for query, _ in queries])
+    configured_storage = vector_store_manager.vector_storage
+    if args.rescore_factor:
+        vector_store_manager.rescore_factor = args.rescore_factor
+
+    results, float32_ids = [], None
+    try:
+        for vector_storage in VECTOR_STORAGE_MODES:
+            vector_store_manager.vector_storage = vector_storage
+            if not vector_store_manager.ensure_vector_storage_index(vector_storage):
+                print_warning(f"Skipping {vector_storage}, the index could not be built.")
+                continue
+
+            recalls, latencies, retrieved_ids = [], [], []
+            vector_store_manager.batch_vector_search(query_embeddings[:1], args.top_k)  # warm up the index pages
+            for query_embedding, (_, relevant_ids) in zip(query_embeddings, queries):
+                nodes, elapsed = timed(vector_store_manager.batch_vector_search, [query_embedding], args.top_k)
+                ids = [node.node.node_id for node in nodes[0]]
+                latencies.append(elapsed)
+                recalls.append(recall_at_k(ids, relevant_ids, args.top_k))
+                retrieved_ids.append(ids)
+
+            if vector_storage == VECTOR_STORAGE_FLOAT32:
+                float32_ids = retrieved_ids
+            # Overlap of the top-k with the float32 top-k, i.e. what quantization costs
+            overlap = [len(set(ids) & set(reference)) / max(len(reference), 1) for ids, reference in zip(retrieved_ids, float32_ids)] if float32_ids else [0.0]
+
+            results.append({
+                "storage": vector_storage,
+                "index_mb": vector_store_manager.get_vector_index_size(vector_storage) / (1024 * 1024),
+                "queries": len(queries),
+                f"recall@{args.top_k}": sum(recalls) / len(recalls),
+                f"overlap@{args.top_k}_vs_float32": sum(overlap) / len(overlap),
+                **latency_summary(latencies),
+            })
+    finally:
+        vector_store_manager.vector_storage = configured_storage
+        vector_store_manager.ensure_vector_storage_index(configured_storage)
+
+    print_results("Vector storage modes", results)
+
+
+if __name__ == "__main__":
+    main()
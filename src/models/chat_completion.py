@@ -12,12 +12,15 @@
 # =============================================================================
 
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 
 
 class ChatRequest(BaseModel):
     model: str
     messages: list
+    retrieval_mode: Optional[str] = None
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None  # chunk metadata, e.g. {"doc_id": [...]} or {"filename": "..."}
+    ef_search: Optional[int] = None  # HNSW candidates per search for this request, higher = better recall, slower
 
     def get(self, key, default=None):
         return getattr(self, key, self.__dict__.get(key, default))
@@ -25,6 +28,9 @@ class ChatRequest(BaseModel):
 
 class RAGRequest(BaseModel):
     query: str
+    retrieval_mode: Optional[str] = None
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None  # chunk metadata, e.g. {"doc_id": [...]} or {"filename": "..."}
+    ef_search: Optional[int] = None  # HNSW candidates per search for this request, higher = better recall, slower
 
     def get(self, key, default=None):
         return getattr(self, key, self.__dict__.get(key, default))
@@ -10,13 +10,22 @@
 # Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
 # =============================================================================
 
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 DATABASE_NAME = "document_search"
 
 TABLE_NAME_DOCUMENT = "document"
+TABLE_NAME_DOCUMENT_SECTION = "document_section"
 TABLE_NAME_EMBEDDING = "data_embedding"
+TABLE_NAME_EMBEDDING_DATA = f"data_{TABLE_NAME_EMBEDDING}"  # PGVectorStore prefixes its table name with 'data_'
+TABLE_NAME_INDEX_STATE = "index_state"
+TABLE_NAME_EMBEDDING_MODEL_STATE = "embedding_model_state"
+
+INDEX_NAME_EMBEDDING_FLOAT32 = f"{TABLE_NAME_EMBEDDING_DATA}_embedding_idx"  # name PGVectorStore gives its HNSW index
+INDEX_NAME_EMBEDDING_HALFVEC = f"{TABLE_NAME_EMBEDDING_DATA}_embedding_halfvec_idx"
+INDEX_NAME_EMBEDDING_BINARY = f"{TABLE_NAME_EMBEDDING_DATA}_embedding_binary_idx"
+INDEX_NAME_EMBEDDING_REDUCED = f"{TABLE_NAME_EMBEDDING_DATA}_embedding_reduced_idx"
 
 CONNECTION_STRING = f"postgresql://[USER]:[PASS]@[HOST]:[PORT]/{DATABASE_NAME}"
 
@@ -28,6 +37,179 @@ CREATE_DATABASE_QUERY = f"""
 CREATE DATABASE {DATABASE_NAME};
 """
 
+# Tables created before incremental ingestion have no content_hash column, create_all does not add columns
+ADD_DOCUMENT_CONTENT_HASH_COLUMN_QUERY = f"""
+ALTER TABLE {TABLE_NAME_DOCUMENT} ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+"""
+
+# Model states recorded before the embed text version existed describe vectors of version 1 chunk texts
+ADD_EMBED_TEXT_VERSION_COLUMN_QUERY = f"""
+ALTER TABLE {TABLE_NAME_EMBEDDING_MODEL_STATE} ADD COLUMN IF NOT EXISTS embed_text_version INTEGER NOT NULL DEFAULT 1;
+"""
+
+# Replacing a document's chunks: delete by filename (also removes chunks of duplicate rows from older runs),
+# insert the new rows and record the content hash, all in one transaction
+DELETE_DOCUMENT_CHUNKS_QUERY = f"""
+DELETE FROM {TABLE_NAME_EMBEDDING_DATA} WHERE metadata_->>'filename' = :filename;
+"""
+
+INSERT_EMBEDDING_QUERY = f"""
+INSERT INTO {TABLE_NAME_EMBEDDING_DATA} (text, metadata_, node_id, embedding)
+VALUES (:text, :metadata_, :node_id, CAST(:embedding AS vector));
+"""
+
+# Bulk load: same columns as INSERT_EMBEDDING_QUERY, rows streamed in PostgreSQL's text COPY format
+COPY_EMBEDDING_QUERY = f"""
+COPY {TABLE_NAME_EMBEDDING_DATA} (text, metadata_, node_id, embedding) FROM STDIN;
+"""
+
+UPDATE_DOCUMENT_INDEXED_QUERY = f"""
+UPDATE {TABLE_NAME_DOCUMENT} SET content_hash = :content_hash, num_of_nodes = :num_of_nodes WHERE id = :doc_id;
+"""
+
+BUMP_INDEX_VERSION_QUERY = f"""
+INSERT INTO {TABLE_NAME_INDEX_STATE} (id, version, updated_at) VALUES (1, 1, now())
+ON CONFLICT (id) DO UPDATE SET version = {TABLE_NAME_INDEX_STATE}.version + 1, updated_at = now()
+RETURNING version;
+"""
+
+# Dimension of the embedding column (pgvector keeps it in the type modifier) and whether any chunk is stored
+EMBEDDING_COLUMN_DIMENSION_QUERY = f"""
+SELECT atttypmod FROM pg_attribute WHERE attrelid = to_regclass('{TABLE_NAME_EMBEDDING_DATA}') AND attname = 'embedding';
+"""
+
+EMBEDDING_TABLE_HAS_ROWS_QUERY = f"""
+SELECT EXISTS (SELECT 1 FROM {TABLE_NAME_EMBEDDING_DATA});
+"""
+
+# Stored chunks counted up to :limit, enough to tell a cold load from one into a live corpus
+COUNT_EMBEDDING_ROWS_QUERY = f"""
+SELECT count(*) FROM (SELECT 1 FROM {TABLE_NAME_EMBEDDING_DATA} LIMIT :limit) AS stored_chunks;
+"""
+
+DROP_EMBEDDING_TABLE_QUERY = f"""
+DROP TABLE IF EXISTS {TABLE_NAME_EMBEDDING_DATA};
+"""
+
+# Full-text search column/index used by hybrid retrieval, same shape PGVectorStore creates with hybrid_search=True
+ADD_TEXT_SEARCH_COLUMN_QUERY = f"""
+ALTER TABLE {TABLE_NAME_EMBEDDING_DATA}
+ADD COLUMN IF NOT EXISTS text_search_tsv tsvector GENERATED ALWAYS AS (to_tsvector('[TEXT_SEARCH_CONFIG]', text)) STORED;
+"""
+
+CREATE_TEXT_SEARCH_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {TABLE_NAME_EMBEDDING}_idx ON {TABLE_NAME_EMBEDDING_DATA} USING gin (text_search_tsv);
+"""
+
+# Rows written through PGVectorStore.add carry the LlamaIndex ref_doc_id as top-level doc_id (node_to_metadata_dict
+# overwrites ours), restore the document id from the node's own metadata so doc_id filters match them
+RESTORE_CHUNK_DOC_ID_QUERY = f"""
+UPDATE {TABLE_NAME_EMBEDDING_DATA}
+SET metadata_ = CAST(jsonb_set(CAST(metadata_ AS jsonb), '{{doc_id}}', to_jsonb(CAST(metadata_->>'_node_content' AS jsonb) #>> '{{metadata,doc_id}}')) AS json)
+WHERE metadata_->>'_node_content' IS NOT NULL
+  AND CAST(metadata_->>'_node_content' AS jsonb) #>> '{{metadata,doc_id}}' IS NOT NULL
+  AND metadata_->>'doc_id' IS DISTINCT FROM CAST(metadata_->>'_node_content' AS jsonb) #>> '{{metadata,doc_id}}';
+"""
+
+PGVECTOR_VERSION_QUERY = """
+SELECT extversion FROM pg_extension WHERE extname = 'vector';
+"""
+
+# Btree expression index per filterable metadata key, matches the metadata_->>'key' predicates used for filtering
+CREATE_METADATA_FILTER_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {TABLE_NAME_EMBEDDING}_meta_[METADATA_KEY]_idx ON {TABLE_NAME_EMBEDDING_DATA} ((metadata_->>'[METADATA_KEY]'));
+"""
+
+# HNSW indexes per vector storage mode. The compact ones index an expression over the full-precision column,
+# which stays in the table for re-scoring and for the stored-embedding rerank.
+CREATE_FLOAT32_EMBEDDING_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {INDEX_NAME_EMBEDDING_FLOAT32} ON {TABLE_NAME_EMBEDDING_DATA}
+USING hnsw (embedding vector_cosine_ops) WITH (m = [HNSW_M], ef_construction = [HNSW_EF_CONSTRUCTION]);
+"""
+
+CREATE_HALFVEC_EMBEDDING_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {INDEX_NAME_EMBEDDING_HALFVEC} ON {TABLE_NAME_EMBEDDING_DATA}
+USING hnsw ((embedding::halfvec([EMBED_DIM])) halfvec_cosine_ops) WITH (m = [HNSW_M], ef_construction = [HNSW_EF_CONSTRUCTION]);
+"""
+
+CREATE_BINARY_EMBEDDING_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {INDEX_NAME_EMBEDDING_BINARY} ON {TABLE_NAME_EMBEDDING_DATA}
+USING hnsw ((binary_quantize(embedding)::bit([EMBED_DIM])) bit_hamming_ops) WITH (m = [HNSW_M], ef_construction = [HNSW_EF_CONSTRUCTION]);
+"""
+
+# Matryoshka-style truncation: the first [REDUCED_DIM] dimensions of every vector
+CREATE_REDUCED_EMBEDDING_INDEX_QUERY = f"""
+CREATE INDEX IF NOT EXISTS {INDEX_NAME_EMBEDDING_REDUCED} ON {TABLE_NAME_EMBEDDING_DATA}
+USING hnsw ((subvector(embedding, 1, [REDUCED_DIM])::vector([REDUCED_DIM])) vector_cosine_ops) WITH (m = [HNSW_M], ef_construction = [HNSW_EF_CONSTRUCTION]);
+"""
+
+DROP_INDEX_QUERY = """
+DROP INDEX IF EXISTS [INDEX_NAME];
+"""
+
+INDEX_SIZE_QUERY = """
+SELECT pg_relation_size(to_regclass('[INDEX_NAME]'));
+"""
+
+INDEX_DEFINITION_QUERY = """
+SELECT indexdef FROM pg_indexes WHERE indexname = '[INDEX_NAME]';
+"""
+
+# First-pass distances, written exactly like the index expressions above so the planner picks those indexes
+HALFVEC_FIRST_PASS_DISTANCE = "e.embedding::halfvec([EMBED_DIM]) <=> CAST(q.query_vector AS halfvec([EMBED_DIM]))"
+BINARY_FIRST_PASS_DISTANCE = "binary_quantize(e.embedding)::bit([EMBED_DIM]) <~> binary_quantize(CAST(q.query_vector AS vector))"
+REDUCED_FIRST_PASS_DISTANCE = "subvector(e.embedding, 1, [REDUCED_DIM])::vector([REDUCED_DIM]) <=> subvector(CAST(q.query_vector AS vector), 1, [REDUCED_DIM])"
+
+# Nearest neighbours for many query vectors in one round trip; the LATERAL subquery keeps one HNSW scan per query
+BATCH_VECTOR_SEARCH_QUERY = f"""
+SELECT q.query_index, d.id, d.node_id, d.text, d.metadata_, d.embedding, d.distance
+FROM unnest(CAST(:query_indexes AS integer[]), CAST(:query_vectors AS text[])) AS q(query_index, query_vector)
+CROSS JOIN LATERAL (
+    SELECT e.id, e.node_id, e.text, e.metadata_, [EMBEDDING_COLUMN] AS embedding,
+           e.embedding <=> CAST(q.query_vector AS vector) AS distance
+    FROM {TABLE_NAME_EMBEDDING_DATA} e
+    WHERE TRUE [FILTER_CLAUSE]
+    ORDER BY e.embedding <=> CAST(q.query_vector AS vector)
+    LIMIT :top_k
+) d
+ORDER BY q.query_index, d.distance;
+"""
+
+# Same as above for the compact storage modes: :num_candidates rows from the compact HNSW index (inner "e"),
+# re-scored and cut to :top_k with the full-precision vectors (outer "e" is the candidate set)
+BATCH_RESCORED_VECTOR_SEARCH_QUERY = f"""
+SELECT q.query_index, d.id, d.node_id, d.text, d.metadata_, d.embedding, d.distance
+FROM unnest(CAST(:query_indexes AS integer[]), CAST(:query_vectors AS text[])) AS q(query_index, query_vector)
+CROSS JOIN LATERAL (
+    SELECT e.id, e.node_id, e.text, e.metadata_, [EMBEDDING_COLUMN] AS embedding,
+           e.embedding <=> CAST(q.query_vector AS vector) AS distance
+    FROM (
+        SELECT e.id, e.node_id, e.text, e.metadata_, e.embedding
+        FROM {TABLE_NAME_EMBEDDING_DATA} e
+        WHERE TRUE [FILTER_CLAUSE]
+        ORDER BY [FIRST_PASS_DISTANCE]
+        LIMIT :num_candidates
+    ) e
+    ORDER BY e.embedding <=> CAST(q.query_vector AS vector)
+    LIMIT :top_k
+) d
+ORDER BY q.query_index, d.distance;
+"""
+
+BATCH_TEXT_SEARCH_QUERY = f"""
+SELECT q.query_index, d.id, d.node_id, d.text, d.metadata_, d.embedding, d.rank
+FROM unnest(CAST(:query_indexes AS integer[]), CAST(:query_texts AS text[])) AS q(query_index, query_text)
+CROSS JOIN LATERAL (
+    SELECT e.id, e.node_id, e.text, e.metadata_, [EMBEDDING_COLUMN] AS embedding,
+           ts_rank(e.text_search_tsv, to_tsquery(CAST(:text_search_config AS regconfig), q.query_text)) AS rank
+    FROM {TABLE_NAME_EMBEDDING_DATA} e
+    WHERE e.text_search_tsv @@ to_tsquery(CAST(:text_search_config AS regconfig), q.query_text) [FILTER_CLAUSE]
+    ORDER BY rank DESC
+    LIMIT :top_k
+) d
+ORDER BY q.query_index, d.rank DESC;
+"""
+
 
 Base = declarative_base()
 
@@ -42,3 +224,36 @@ class Document(Base):
     num_of_nodes = Column(Integer, nullable=False)
     content_text = Column(Text)
     content_md = Column(Text)
+    content_hash = Column(String(64))  # sha256 of the source file, set once its chunks are indexed
+
+
+class DocumentSection(Base):
+    # Full text of every markdown section, what small-to-big retrieval expands matching chunks to
+    __tablename__ = f"{TABLE_NAME_DOCUMENT_SECTION}"
+    __table_args__ = (Index(f"{TABLE_NAME_DOCUMENT_SECTION}_doc_section_idx", "doc_id", "section_id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doc_id = Column(String(64), nullable=False)
+    section_id = Column(Integer, nullable=False)
+    title = Column(String(512), nullable=False)
+    content = Column(Text, nullable=False)
+
+
+class IndexState(Base):
+    # Single row holding a counter that is bumped whenever the indexed corpus changes
+    __tablename__ = f"{TABLE_NAME_INDEX_STATE}"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, nullable=False)
+
+
+class EmbeddingModelState(Base):
+    # Single row recording which embedding model built the vectors in the embedding table
+    __tablename__ = f"{TABLE_NAME_EMBEDDING_MODEL_STATE}"
+
+    id = Column(Integer, primary_key=True)
+    model_name = Column(String(255), nullable=False)
+    embed_dim = Column(Integer, nullable=False)
+    embed_text_version = Column(Integer, nullable=False, default=1)  # how chunk texts were built before embedding
+    updated_at = Column(TIMESTAMP, nullable=False)
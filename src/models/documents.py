@@ -11,7 +11,7 @@
 # =============================================================================
 
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -23,6 +23,7 @@ class ProcessedDocumentMetadata(BaseModel):
     processed_successfully: bool
     has_content: bool
     created_at: datetime
+    content_hash: Optional[str] = None  # sha256 of the source file the processed outputs were produced from
 
     def to_dict(self):
         return {
@@ -30,6 +31,7 @@ class ProcessedDocumentMetadata(BaseModel):
             'processed_successfully': self.processed_successfully,
             'has_content': self.has_content,
             'created_at': self.created_at.isoformat() if hasattr(self.created_at, 'isoformat') else self.created_at,
+            'content_hash': self.content_hash,
         }
 
 class ProcessedDocument(BaseModel):
@@ -69,7 +71,7 @@ class ProcessedDocument(BaseModel):
         )
 
     @classmethod
-    def create_from_document(cls, file_path:Path, document:Document, txt_exported, md_exported, title, sections) -> 'ProcessedDocument':
+    def create_from_document(cls, file_path:Path, document:Document, txt_exported, md_exported, title, sections, content_hash:Optional[str]=None) -> 'ProcessedDocument':
         return cls(
             doc_id='',
             file_name=file_path.name,
@@ -83,6 +85,7 @@ class ProcessedDocument(BaseModel):
                 processed_successfully=True,
                 has_content=len(txt_exported.strip()) > 0,
                 created_at=datetime.now(),
+                content_hash=content_hash,
             ),
         )
             
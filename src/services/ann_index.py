@@ -0,0 +1,365 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import os
+import json
+import mmap
+import shutil
+import time
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from system.setup import get_config_logger
+from models.database import TABLE_NAME_EMBEDDING_DATA
+
+IVF_MIN_ROWS = 4096             # below this a flat (exact) scan is already sub-millisecond
+IVF_TRAIN_SAMPLES_PER_LIST = 64
+IVF_TRAIN_ITERATIONS = 10
+FETCH_BATCH_SIZE = 2000
+
+SNAPSHOT_POINTER_FILE = "CURRENT"
+
+
+class _MappedPayloads:
+    # Read-only sequence over payloads.jsonl: the file is memory-mapped like the vectors and a payload
+    # is only parsed when a search returns it, so worker processes share the page cache here as well
+    def __init__(self, payloads_path: Path, offsets: np.ndarray):
+        self.offsets = offsets
+        with open(payloads_path, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] > 0 else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return json.loads(self._mapped[int(self.offsets[index]):int(self.offsets[index + 1])])
+
+
+def row_to_node(node_id: str, node_text: str, metadata: Dict[str, Any], embedding=None, score: float = None) -> NodeWithScore:
+    # Same reconstruction PGVectorStore applies to its result rows
+    try:
+        node = metadata_dict_to_node(metadata)
+        node.set_content(str(node_text))
+    except Exception:
+        node = TextNode(id_=node_id, text=node_text, metadata=metadata)
+    if embedding is not None:
+        node.embedding = np.asarray(embedding, dtype=float).tolist()
+    return NodeWithScore(node=node, score=score)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    # Spherical k-means on a sample of the (normalized) vectors
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * IVF_TRAIN_SAMPLES_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=nlist)
+        non_empty = counts > 0
+        centroids[non_empty] = _normalize_rows(sums[non_empty])
+    return centroids
+
+
+class _IndexState:
+    # Immutable view of the index, swapped as a whole on refresh so searches never see partial updates
+    def __init__(self, vectors, row_ids, centroids, list_offsets, payloads, delta_vectors=None, delta_payloads=None, max_row_id=0):
+        self.vectors = vectors
+        self.row_ids = row_ids
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.payloads = payloads
+        self.delta_vectors = delta_vectors if delta_vectors is not None else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        self.delta_payloads = delta_payloads or []
+        self.max_row_id = max_row_id
+
+    @property
+    def count(self) -> int:
+        return len(self.payloads) + len(self.delta_payloads)
+
+
+class InProcessVectorIndex:
+    """
+    In-process IVF (inverted file) index over the rows of data_embedding, built from and checked
+    against PostgreSQL, which stays the source of truth. The built index is written as a snapshot
+    of .npy files plus a payload file that are memory-mapped, so worker processes on one host share
+    a single copy of the vectors and payloads through the page cache. Rows added after the snapshot
+    are kept in a small in-memory delta that is scanned exactly. Refreshes run on a background thread,
+    never on the request path.
+    """
+
+    def __init__(self, engine, snapshot_dir: str, nprobe: int = 8, refresh_seconds: float = 30):
+        self.config, self.logger = get_config_logger()
+        self.engine = engine
+        self.snapshot_dir = Path(snapshot_dir)
+        self.nprobe = max(int(nprobe), 1)
+        self.refresh_seconds = float(refresh_seconds)
+        self.state: Optional[_IndexState] = None
+        self.last_refresh_check = 0.0
+        self._lock = threading.Lock()
+        self._stop_refresh = threading.Event()
+        self._refresh_thread = None
+
+    # ---- PostgreSQL -------------------------------------------------------
+
+    def _fetch_table_stats(self) -> Tuple[int, int]:
+        with self.engine.connect() as connection:
+            row = connection.execute(text(f"SELECT count(*), coalesce(max(id), 0) FROM {TABLE_NAME_EMBEDDING_DATA}")).one()
+        return int(row[0]), int(row[1])
+
+    def _fetch_rows(self, after_row_id: int = 0) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        row_ids, vectors, payloads = [], [], []
+        query = text(
+            f"SELECT id, node_id, text, metadata_, embedding::real[] AS embedding "
+            f"FROM {TABLE_NAME_EMBEDDING_DATA} WHERE id > :after_row_id ORDER BY id"
+        )
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(query, {"after_row_id": after_row_id})
+            while True:
+                rows = result.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    row_ids.append(row.id)
+                    vectors.append(row.embedding)
+                    payloads.append({"node_id": row.node_id, "text": row.text, "metadata": row.metadata_})
+
+        vectors = _normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(row_ids, dtype=np.int64), vectors, payloads
+
+    # ---- Build / snapshot -------------------------------------------------
+
+    def _build_state(self, row_ids: np.ndarray, vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> _IndexState:
+        nlist = int(np.sqrt(len(vectors))) if len(vectors) >= IVF_MIN_ROWS else 1
+        if nlist > 1:
+            centroids = _train_centroids(vectors, nlist)
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+        else:
+            centroids = np.zeros((1, vectors.shape[1]), dtype=np.float32)
+            assignments = np.zeros(len(vectors), dtype=np.int64)
+
+        # Store every inverted list contiguously so a probe is a slice, not a gather
+        order = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))]).astype(np.int64)
+        return _IndexState(
+            vectors=vectors[order],
+            row_ids=row_ids[order],
+            centroids=centroids,
+            list_offsets=list_offsets,
+            payloads=[payloads[i] for i in order],
+            max_row_id=int(row_ids.max()) if len(row_ids) else 0,
+        )
+
+    def _save_snapshot(self, state: _IndexState) -> None:
+        snapshot_name = f"snapshot_{state.max_row_id}_{len(state.payloads)}_{os.getpid()}"
+        snapshot_path = self.snapshot_dir / snapshot_name
+        snapshot_path.mkdir(parents=True, exist_ok=True)
+
+        np.save(snapshot_path / "vectors.npy", state.vectors)
+        np.save(snapshot_path / "row_ids.npy", state.row_ids)
+        np.save(snapshot_path / "centroids.npy", state.centroids)
+        np.save(snapshot_path / "list_offsets.npy", state.list_offsets)
+        payload_offsets = [0]
+        with open(snapshot_path / "payloads.jsonl", "wb") as f:
+            for payload in state.payloads:
+                line = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                payload_offsets.append(payload_offsets[-1] + len(line))
+        np.save(snapshot_path / "payload_offsets.npy", np.asarray(payload_offsets, dtype=np.int64))
+        with open(snapshot_path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"max_row_id": state.max_row_id, "count": len(state.payloads), "nlist": len(state.centroids)}, f)
+
+        # Publish atomically: readers only ever follow the pointer to a complete snapshot
+        pointer_tmp = self.snapshot_dir / f"{SNAPSHOT_POINTER_FILE}.{os.getpid()}.tmp"
+        pointer_tmp.write_text(snapshot_name, encoding="utf-8")
+        os.replace(pointer_tmp, self.snapshot_dir / SNAPSHOT_POINTER_FILE)
+        self._remove_old_snapshots(keep=snapshot_name)
+
+    def _remove_old_snapshots(self, keep: str) -> None:
+        for snapshot_path in self.snapshot_dir.glob("snapshot_*"):
+            if snapshot_path.name == keep:
+                continue
+            try:
+                # Other workers may still map these files; that fails on Windows and is retried on the next snapshot
+                shutil.rmtree(snapshot_path)
+            except OSError:
+                pass
+
+    def _load_snapshot(self) -> Optional[_IndexState]:
+        pointer_file = self.snapshot_dir / SNAPSHOT_POINTER_FILE
+        if not pointer_file.exists():
+            return None
+
+        snapshot_path = self.snapshot_dir / pointer_file.read_text(encoding="utf-8").strip()
+        with open(snapshot_path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (snapshot_path / "payload_offsets.npy").exists():
+            payloads = _MappedPayloads(snapshot_path / "payloads.jsonl", np.load(snapshot_path / "payload_offsets.npy"))
+        else:
+            # Snapshots written before the payload offsets existed
+            with open(snapshot_path / "payloads.jsonl", "r", encoding="utf-8") as f:
+                payloads = [json.loads(line) for line in f]
+
+        return _IndexState(
+            vectors=np.load(snapshot_path / "vectors.npy", mmap_mode="r"),
+            row_ids=np.load(snapshot_path / "row_ids.npy", mmap_mode="r"),
+            centroids=np.load(snapshot_path / "centroids.npy"),
+            list_offsets=np.load(snapshot_path / "list_offsets.npy"),
+            payloads=payloads,
+            max_row_id=int(meta["max_row_id"]),
+        )
+
+    def rebuild(self) -> bool:
+        start = time.perf_counter()
+        row_ids, vectors, payloads = self._fetch_rows()
+        if len(row_ids) == 0:
+            self.state = None
+            return False
+
+        state = self._build_state(row_ids, vectors, payloads)
+        self._save_snapshot(state)
+        self.state = self._load_snapshot() or state
+        self.logger.info(f"In-process ANN index built with {state.count} vectors, {len(state.centroids)} lists in {time.perf_counter() - start:.2f}s.")
+        return True
+
+    def load(self) -> bool:
+        # Prefer an existing snapshot (possibly written by another worker) and catch up from Postgres
+        with self._lock:
+            try:
+                self.state = self._load_snapshot()
+                if self.state is not None:
+                    self.logger.info(f"In-process ANN index loaded from snapshot with {self.state.count} vectors.")
+                return self._refresh_locked()
+            except Exception as e:
+                self.logger.error(f"Failed to load in-process ANN index: {e}")
+                self.state = None
+                return False
+
+    def refresh(self) -> bool:
+        with self._lock:
+            try:
+                return self._refresh_locked()
+            except Exception as e:
+                self.logger.error(f"Failed to refresh in-process ANN index: {e}")
+                return False
+
+    def _refresh_locked(self) -> bool:
+        self.last_refresh_check = time.monotonic()
+        db_count, db_max_row_id = self._fetch_table_stats()
+        state = self.state
+
+        if state is None or db_max_row_id < state.max_row_id:
+            return self.rebuild()
+        if db_max_row_id == state.max_row_id:
+            if db_count == state.count:
+                return True
+            return self.rebuild()  # rows were deleted
+
+        # Rows were appended: keep them in the exactly-scanned delta
+        new_row_ids, new_vectors, new_payloads = self._fetch_rows(after_row_id=state.max_row_id)
+        if state.count + len(new_payloads) != db_count:
+            return self.rebuild()
+
+        delta_vectors = np.concatenate([state.delta_vectors, new_vectors]) if len(state.delta_payloads) else new_vectors
+        self.state = _IndexState(
+            vectors=state.vectors,
+            row_ids=state.row_ids,
+            centroids=state.centroids,
+            list_offsets=state.list_offsets,
+            payloads=state.payloads,
+            delta_vectors=delta_vectors,
+            delta_payloads=state.delta_payloads + new_payloads,
+            max_row_id=int(new_row_ids.max()),
+        )
+
+        # Fold a large delta into a fresh snapshot so searches stay on the IVF lists
+        if len(self.state.delta_payloads) > max(1000, len(state.payloads) // 10):
+            return self.rebuild()
+        self.logger.info(f"In-process ANN index refreshed with {len(new_payloads)} new vectors.")
+        return True
+
+    # ---- Search -----------------------------------------------------------
+
+    def is_ready(self) -> bool:
+        return self.state is not None and self.state.count > 0
+
+    def start_background_refresh(self) -> None:
+        # Picks up rows ingested by other processes every refresh_seconds; searches keep using the
+        # current state while a refresh (or a full rebuild) runs and see the new one once it is swapped in
+        if self.refresh_seconds <= 0 or self._refresh_thread is not None:
+            return
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(target=self._run_background_refresh, name="ann-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop_refresh.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+    def _run_background_refresh(self) -> None:
+        while not self._stop_refresh.wait(self.refresh_seconds):
+            self.refresh()
+
+    def search(self, query_embedding: List[float], top_k: int) -> List[NodeWithScore]:
+        state = self.state
+        if state is None:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        if len(state.centroids) > 1:
+            probe_lists = np.argsort(-(state.centroids @ query))[:self.nprobe]
+            candidate_index = np.concatenate([np.arange(state.list_offsets[i], state.list_offsets[i + 1]) for i in probe_lists])
+            scores = np.asarray(state.vectors[candidate_index]) @ query
+        else:
+            candidate_index = np.arange(len(state.payloads))
+            scores = np.asarray(state.vectors) @ query
+
+        # Positions past the main candidates refer to the delta rows
+        num_main = len(scores)
+        if len(state.delta_payloads):
+            scores = np.concatenate([scores, state.delta_vectors @ query])
+
+        if len(scores) == 0:
+            return []
+        top_k = min(int(top_k), len(scores))
+        top_positions = np.argpartition(-scores, top_k - 1)[:top_k]
+        top_positions = top_positions[np.argsort(-scores[top_positions])]
+
+        nodes = []
+        for position in top_positions:
+            if position < num_main:
+                row_index = candidate_index[position]
+                payload, vector = state.payloads[row_index], state.vectors[row_index]
+            else:
+                payload, vector = state.delta_payloads[position - num_main], state.delta_vectors[position - num_main]
+            nodes.append(row_to_node(payload["node_id"], payload["text"], payload["metadata"], vector, float(scores[position])))
+        return nodes
@@ -0,0 +1,89 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import copy
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from system.cache import LRUTTLCache
+
+
+class SemanticAnswerCache:
+    """
+    Bounded cache of final chat answers keyed by the embedding of the optimized query.
+    A lookup is a hit when the most similar stored query passes the similarity threshold
+    and was answered within the same scope (index version plus anything else that changes answers).
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_size: int = 256, ttl_seconds: float = 86400):
+        self.similarity_threshold = float(similarity_threshold)
+        self.entries = LRUTTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        # Lookups run concurrently on the request threadpool, the entries guard themselves, the counters need this
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, query: str, query_embedding: List[float], scope: Hashable) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        lookup_info = {"hit": False, "similarity": None, "cached_query": None}
+
+        candidates = [(key, entry) for key, entry in self.entries.items() if entry["scope"] == scope]
+        if not candidates:
+            self._count(hit=False)
+            return None, lookup_info
+
+        query_emb = np.asarray(query_embedding, dtype=float)
+        query_emb = query_emb / np.linalg.norm(query_emb)
+        cached_embs = np.stack([entry["embedding"] for _, entry in candidates])
+        similarities = cached_embs @ query_emb
+
+        best = int(np.argmax(similarities))
+        best_key, _ = candidates[best]
+        lookup_info["similarity"] = float(similarities[best])
+        entry = self.entries.get(best_key) if similarities[best] >= self.similarity_threshold else None
+        if entry is None:
+            self._count(hit=False)
+            return None, lookup_info
+
+        self._count(hit=True)
+        lookup_info["hit"] = True
+        lookup_info["cached_query"] = entry["query"]
+        return copy.deepcopy(entry["response"]), lookup_info
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def store(self, query: str, query_embedding: List[float], scope: Hashable, response: Dict[str, Any]) -> None:
+        query_emb = np.asarray(query_embedding, dtype=float)
+        self.entries.put((scope, " ".join(query.split())), {
+            "query": query,
+            "embedding": query_emb / np.linalg.norm(query_emb),
+            "scope": scope,
+            "response": copy.deepcopy(response),
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "size": len(self.entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / lookups) if lookups else 0.0,
+        }
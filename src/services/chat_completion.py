@@ -19,9 +19,11 @@ from services.observability import observability_reset
 from system.setup import get_config_logger
 from models.chat_completion import ChatRequest, ChatCompletionResponse
 from services.llm_langchain import LLMManager
-from services.rag import RAGManager
+from services.rag import RAGManager, RETRIEVAL_MODES
+from services.vectorstore import normalize_metadata_filters
 from services.multi_agents import MultiAgentsManager
 from services.query_preprocessor import QueryPreprocessor
+from services.answer_cache import SemanticAnswerCache
 
 from services.observability import observability_reset, observability_set_question, observability_evaluate_now, observability_set_answer
 
@@ -37,6 +39,14 @@ class ChatCompletionService:
         self.multi_agent_system = MultiAgentsManager(self.rag_manager, self.llm_manager)
         self.query_preprocessor = QueryPreprocessor(self.llm_manager)
 
+        self.answer_cache = None
+        if self.config.get('answer_cache_enabled', False):
+            self.answer_cache = SemanticAnswerCache(
+                similarity_threshold=float(self.config.get('answer_cache_similarity_threshold', 0.95)),
+                max_size=int(self.config.get('answer_cache_size', 256)),
+                ttl_seconds=float(self.config.get('answer_cache_ttl', 86400)),
+            )
+
     def chat_models(self):
         return {"object": "list", "data": ['Ollama']}
 
@@ -103,7 +113,20 @@ class ChatCompletionService:
         
         return response
     
-    def _process_query_normal(self, evaluation_result, question, multi_agent_system):
+    def _get_retrieval_options(self, dialogue: ChatRequest) -> Dict[str, Any]:
+        # Validated before any agent runs, a bad option raises ValueError (HTTP 400) instead of failing every tool call
+        retrieval_options = {}
+        if dialogue.retrieval_mode:
+            if dialogue.retrieval_mode not in RETRIEVAL_MODES:
+                raise ValueError(f"Unknown retrieval mode '{dialogue.retrieval_mode}', expected one of {RETRIEVAL_MODES}")
+            retrieval_options["retrieval_mode"] = dialogue.retrieval_mode
+        if dialogue.filters:
+            retrieval_options["filters"] = normalize_metadata_filters(dialogue.filters)
+        if dialogue.ef_search:
+            retrieval_options["ef_search"] = self.rag_manager.vector_store_manager.resolve_ef_search(dialogue.ef_search)
+        return retrieval_options
+
+    def _process_query_normal(self, evaluation_result, question, multi_agent_system, retrieval_options=None):
         optimized_query = evaluation_result.get("generated_query", question)
 
         self.logger.info(f"Original question: {question}")
@@ -112,10 +135,29 @@ class ChatCompletionService:
         if not optimized_query or len(optimized_query.strip()) == 0:
             optimized_query = question
 
+        answer_cache_info = {"enabled": self.answer_cache is not None, "hit": False}
+        if self.answer_cache is not None:
+            query_embedding = self.rag_manager.get_query_embedding(optimized_query)
+            # Answers depend on the indexed corpus and on the retrieval options they were produced with
+            cache_scope = (self.rag_manager.get_index_version(), json.dumps(retrieval_options or {}, sort_keys=True))
+            cached_response, lookup_info = self.answer_cache.lookup(optimized_query, query_embedding, cache_scope)
+            answer_cache_info.update(lookup_info)
+            if cached_response:
+                self.logger.info(f"Answer cache hit (similarity {lookup_info['similarity']:.4f}) for: {lookup_info['cached_query']}")
+                cached_response["metadata"].update({
+                    "evaluation": evaluation_result,
+                    "original_question": question,
+                    "optimized_query": optimized_query,
+                    "retrieval_options": retrieval_options,
+                    "answer_cache": answer_cache_info,
+                })
+                return cached_response
+
         observability_reset()
         observability_set_question(optimized_query)
 
-        result = self.multi_agent_system.answer_question(optimized_query)
+        result = self.multi_agent_system.answer_question(optimized_query, retrieval_options)
+        is_answered = bool(result)
         if not result:
             result = {
                 "final_answer": "Unable to find the answer.",
@@ -125,6 +167,7 @@ class ChatCompletionService:
                     "flow_type": "crew_agents",
                     "original_question": question,
                     "optimized_query": optimized_query,
+                    "retrieval_options": retrieval_options,
                     "model_id": self.model_id,
                     "inference_model": self.inference_model,
                 },
@@ -143,11 +186,18 @@ class ChatCompletionService:
                 "flow_type": "crew_agents",
                 "original_question": question,
                 "optimized_query": optimized_query,
+                "retrieval_options": retrieval_options,
                 "crew_validation": original_metadata,
+                "context_usage": result.get("context_usage"),
                 "model_id": self.model_id,
                 "inference_model": self.inference_model,
+                "answer_cache": answer_cache_info,
             },
         }
+
+        # Only real crew answers are worth serving again
+        if self.answer_cache is not None and is_answered and result.get("final_answer"):
+            self.answer_cache.store(optimized_query, query_embedding, cache_scope, response)
         return response
 
     def chat_completion(self, dialogue: ChatRequest):
@@ -175,6 +225,11 @@ class ChatCompletionService:
                 }
 
             self.logger.info(f"Dialogue model request: {json.dumps(dialogue.model_dump())}")
+            try:
+                retrieval_options = self._get_retrieval_options(dialogue)
+            except ValueError as e:
+                # Unknown retrieval mode or filter key, ef_search out of range: the request is wrong, not the server
+                raise HTTPException(status_code=400, detail=str(e))
             query = last_msg["content"]
             model_id = dialogue.model
 
@@ -191,10 +246,12 @@ class ChatCompletionService:
             elif preprocessing_result["type"] == "other":
                 response = self._process_query_when_other(preprocessing_result)
             else:
-                response = self._process_query_normal(preprocessing_result, query, self.multi_agent_system)
+                response = self._process_query_normal(preprocessing_result, query, self.multi_agent_system, retrieval_options)
 
             result = self._prepare_result(response)
             
+        except HTTPException:
+            raise
         except Exception as e:
             self.logger.error("Exception: " + str(e))
             raise HTTPException(
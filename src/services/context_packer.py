@@ -0,0 +1,61 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+from typing import List, Tuple, Callable
+
+from llama_index.core.schema import NodeWithScore
+
+from system.setup import get_config_logger
+
+CHARS_PER_TOKEN = 4  # rough fallback when the tokenizer cannot be loaded
+
+
+class ContextPacker:
+    def __init__(self, token_budget: int, tokenizer_name: str):
+        self.config, self.logger = get_config_logger()
+        self.token_budget = int(token_budget)
+        self.tokenizer_name = tokenizer_name
+        self.tokenizer = None
+        self.is_tokenizer_loaded = False
+
+    def _load_tokenizer(self):
+        if self.is_tokenizer_loaded:
+            return
+        self.is_tokenizer_loaded = True
+        try:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+            self.logger.info(f"Context packer uses tokenizer {self.tokenizer_name}.")
+        except Exception as e:
+            self.logger.warning(f"Failed to load tokenizer {self.tokenizer_name}, estimating {CHARS_PER_TOKEN} characters per token. Exception occurred: {e}")
+
+    def count_tokens(self, text: str) -> int:
+        self._load_tokenizer()
+        if self.tokenizer is None:
+            return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def pack(self, nodes: List[NodeWithScore], format_block: Callable[[int, NodeWithScore], str]) -> Tuple[List[NodeWithScore], List[int]]:
+        # Greedy: walk the chunks best first and keep every one that still fits the budget.
+        # format_block(position, node) renders the chunk exactly as it will appear in the context.
+        packed_nodes, token_counts, tokens_used = [], [], 0
+        for node in nodes:
+            num_tokens = self.count_tokens(format_block(len(packed_nodes) + 1, node))
+            if tokens_used + num_tokens > self.token_budget:
+                continue
+            packed_nodes.append(node)
+            token_counts.append(num_tokens)
+            tokens_used += num_tokens
+
+        if nodes and not packed_nodes:
+            self.logger.warning(f"No retrieved chunk fits the context token budget of {self.token_budget} tokens.")
+        return packed_nodes, token_counts
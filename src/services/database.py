@@ -12,13 +12,17 @@
 
 import sys
 import os
+from datetime import datetime
 
-from sqlalchemy import create_engine, text
+from typing import List, Tuple, Dict
+
+from sqlalchemy import create_engine, text, tuple_
 from sqlalchemy.orm import sessionmaker
 
 from models.documents import ProcessedDocument
-from models.database import Base, Document
-from models.database import DATABASE_NAME, TABLE_NAME_DOCUMENT, TABLE_NAME_EMBEDDING, CHECK_DATABASE_QUERY, CREATE_DATABASE_QUERY
+from models.database import Base, Document, DocumentSection, IndexState, EmbeddingModelState
+from models.database import DATABASE_NAME, TABLE_NAME_DOCUMENT, TABLE_NAME_DOCUMENT_SECTION, TABLE_NAME_EMBEDDING_DATA, CHECK_DATABASE_QUERY, CREATE_DATABASE_QUERY, BUMP_INDEX_VERSION_QUERY
+from models.database import ADD_DOCUMENT_CONTENT_HASH_COLUMN_QUERY, ADD_EMBED_TEXT_VERSION_COLUMN_QUERY
 from system.setup import get_config_logger
 
 
@@ -53,6 +57,9 @@ class DatabaseManager:
             if self.engine is None:
                 self.create_connection()
             Base.metadata.create_all(self.engine)
+            with self.engine.begin() as connection:
+                connection.execute(text(ADD_DOCUMENT_CONTENT_HASH_COLUMN_QUERY.strip()))
+                connection.execute(text(ADD_EMBED_TEXT_VERSION_COLUMN_QUERY.strip()))
         except Exception as e:
             self.logger.error(f"Failed to create/check the database and its tables: {e}")
         finally:
@@ -114,9 +121,11 @@ class DatabaseManager:
             session = Session()
             # Delete all records from the documents table using raw SQL
             session.execute(text(f"DELETE FROM {TABLE_NAME_DOCUMENT}"))
+            session.execute(text(f"DELETE FROM {TABLE_NAME_DOCUMENT_SECTION}"))
             if delete_indices_also:
                 # Delete all records from the embeddings table using raw SQL
-                session.execute(text(f"DELETE FROM {TABLE_NAME_EMBEDDING}"))
+                session.execute(text(f"DELETE FROM {TABLE_NAME_EMBEDDING_DATA}"))
+            session.execute(text(BUMP_INDEX_VERSION_QUERY.strip()))
             session.commit()
             session.close()
         except Exception as e:
@@ -125,21 +134,156 @@ class DatabaseManager:
             self.close_connection()
         return True
     
+    def get_index_version(self) -> int:
+        version = 0
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            index_state = session.get(IndexState, 1)
+            version = index_state.version if index_state else 0
+            session.close()
+        except Exception as e:
+            self.logger.error(f"Failed to read index version: {e}")
+        finally:
+            self.close_connection()
+        return version
+
+    def bump_index_version(self) -> int:
+        version = None
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            version = session.execute(text(BUMP_INDEX_VERSION_QUERY.strip())).scalar()
+            session.commit()
+            session.close()
+        except Exception as e:
+            self.logger.error(f"Failed to bump index version: {e}")
+        finally:
+            self.close_connection()
+        return version
+
+    def get_embedding_model_state(self) -> EmbeddingModelState:
+        model_state = None
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+            session = Session()
+            model_state = session.get(EmbeddingModelState, 1)
+            session.close()
+        except Exception as e:
+            self.logger.error(f"Failed to read embedding model state: {e}")
+        finally:
+            self.close_connection()
+        return model_state
+
+    def save_embedding_model_state(self, model_name: str, embed_dim: int, embed_text_version: int) -> bool:
+        is_success = False
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            session.merge(EmbeddingModelState(id=1, model_name=model_name, embed_dim=int(embed_dim), embed_text_version=int(embed_text_version), updated_at=datetime.now()))
+            session.commit()
+            session.close()
+            is_success = True
+        except Exception as e:
+            self.logger.error(f"Failed to save embedding model state: {e}")
+        finally:
+            self.close_connection()
+        return is_success
+
+    def save_document_sections(self, doc_id: str, sections: List[Tuple[str, str]]) -> bool:
+        # sections are (title, text) pairs, their position is the section_id the chunks are tagged with
+        is_success = False
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            session.query(DocumentSection).filter(DocumentSection.doc_id == str(doc_id)).delete()
+            session.add_all([
+                DocumentSection(doc_id=str(doc_id), section_id=section_id, title=title[:512], content=content)
+                for section_id, (title, content) in enumerate(sections)
+            ])
+            session.commit()
+            session.close()
+            is_success = True
+        except Exception as e:
+            self.logger.error(f"Failed to save document sections: {e}")
+        finally:
+            self.close_connection()
+        return is_success
+
+    def get_document_sections(self, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        sections = {}
+        if not keys:
+            return sections
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            rows = session.query(DocumentSection.doc_id, DocumentSection.section_id, DocumentSection.content).filter(
+                tuple_(DocumentSection.doc_id, DocumentSection.section_id).in_(keys)
+            ).all()
+            sections = {(row.doc_id, row.section_id): row.content for row in rows}
+            session.close()
+        except Exception as e:
+            self.logger.error(f"Failed to read document sections: {e}")
+        finally:
+            self.close_connection()
+        return sections
+
+    def get_document_hashes(self) -> Dict[str, str]:
+        # file name -> content hash of its indexed version, files whose chunks were never indexed have no hash
+        document_hashes = {}
+        try:
+            if self.engine is None:
+                self.create_connection()
+            Session = sessionmaker(bind=self.engine)
+            session = Session()
+            for name, content_hash in session.query(Document.name, Document.content_hash).order_by(Document.id).all():
+                document_hashes[name] = content_hash
+            session.close()
+        except Exception as e:
+            self.logger.error(f"Failed to read document hashes: {e}")
+        finally:
+            self.close_connection()
+        return document_hashes
+
     def save_processed_document(self, processed_document:ProcessedDocument):
+        # One row per file name: a re-processed file updates its row (and keeps its id), duplicates from older runs are removed.
+        # The content hash is only recorded together with the indexed chunks (VectorStoreManager.replace_document_chunks).
         try:
             if self.engine is None:
                 self.create_connection()
             Session = sessionmaker(bind=self.engine)
             session = Session()
-            document = Document(
-                name=processed_document.file_name,
-                path=processed_document.file_path,
-                created_at=processed_document.metadata.created_at,
-                num_of_nodes=0,
-                content_text=processed_document.text_content,
-                content_md=processed_document.markdown_content,
-            )
-            session.add(document)
+            existing_documents = session.query(Document).filter(Document.name == processed_document.file_name).order_by(Document.id.desc()).all()
+            if existing_documents:
+                document = existing_documents[0]
+                for duplicate_document in existing_documents[1:]:
+                    session.delete(duplicate_document)
+                document.path = processed_document.file_path
+                document.created_at = processed_document.metadata.created_at
+                document.content_text = processed_document.text_content
+                document.content_md = processed_document.markdown_content
+            else:
+                document = Document(
+                    name=processed_document.file_name,
+                    path=processed_document.file_path,
+                    created_at=processed_document.metadata.created_at,
+                    num_of_nodes=0,
+                    content_text=processed_document.text_content,
+                    content_md=processed_document.markdown_content,
+                )
+                session.add(document)
             session.commit()
             processed_document.doc_id = document.id
             session.close()
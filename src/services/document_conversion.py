@@ -0,0 +1,215 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import time
+import json
+import hashlib
+
+from docling.document_converter import DocumentConverter
+
+from system.setup import get_config_logger
+from models.documents import ProcessedDocument
+
+MAX_ATTEMPTS_AFTER_CRASH = 2  # a file in flight when a worker dies is retried once in a fresh pool
+
+_worker_converter: Optional[DocumentConverter] = None
+
+
+def md_content_extract_title(document_text: str, default_title: str) -> str:
+    try:
+        lines = document_text.split("\n")
+
+        for line in lines[:10]:
+            line = line.strip()
+            if line and len(line) > 3:
+                return line
+
+        return default_title
+    except:
+        return default_title
+
+
+def md_content_extract_sections(markdown_content: str) -> List[Dict[str, Any]]:
+    sections = []
+    lines = markdown_content.split("\n")
+    current_section = None
+
+    for line in lines:
+        if line.startswith("#"):
+            if current_section:
+                sections.append(current_section)
+            header_level = len(line) - len(line.lstrip("#"))
+            title = line.lstrip("#").strip()
+            current_section = {"title": title, "level": header_level, "content": []}
+        elif current_section and line.strip():
+            current_section["content"].append(line)
+
+    if current_section:
+        sections.append(current_section)
+
+    if not sections and markdown_content.strip():
+        sections.append(
+            {
+                "title": "Main Content",
+                "level": 1,
+                "content": markdown_content.split("\n"),
+            }
+        )
+
+    return sections
+
+
+def file_content_hash(file_path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def convert_pdf_to_processed_document(document_converter: DocumentConverter, file_path: Path, output_dir_path: Path, content_hash: Optional[str] = None) -> Optional[ProcessedDocument]:
+    # Converts one file and writes <name>_processed.json and <name>.md, raises on conversion errors
+    file_name_without_ext = file_path.stem
+
+    result = document_converter.convert(str(file_path))
+    if not result or not result.document:
+        return None
+
+    document = result.document
+    txt_exported = document.export_to_text()
+    md_exported = document.export_to_markdown()
+    title = md_content_extract_title(txt_exported, file_name_without_ext)
+    sections = md_content_extract_sections(md_exported)
+    processed_data = ProcessedDocument.create_from_document(file_path, document, txt_exported, md_exported, title, sections, content_hash)
+
+    # Save to output folder
+    output_file = output_dir_path / f"{file_name_without_ext}_processed.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(processed_data.to_dict(), f, indent=2, ensure_ascii=False)
+
+    # save markdown file here
+    markdown_file = output_dir_path / f"{file_name_without_ext}.md"
+    with open(markdown_file, "w", encoding="utf-8") as f:
+        f.write(md_exported)
+
+    return processed_data
+
+
+def _init_conversion_worker():
+    # Every worker process loads its own converter (and Docling models) once
+    global _worker_converter
+    _worker_converter = DocumentConverter()
+
+
+def _convert_in_worker(file_path: str, output_dir_path: str, content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+    processed_data = convert_pdf_to_processed_document(_worker_converter, Path(file_path), Path(output_dir_path), content_hash)
+    return processed_data.to_dict() if processed_data else None
+
+
+class ParallelDocumentConverter:
+    def __init__(self, output_dir_path: Path, num_workers: int, timeout_seconds: float):
+        self.config, self.logger = get_config_logger()
+        self.output_dir_path = Path(output_dir_path)
+        self.num_workers = max(1, int(num_workers))
+        self.timeout_seconds = float(timeout_seconds)
+        # Files handed to the pool at once, a consumer that stops pulling results also stops new conversions
+        self.max_in_flight = self.num_workers + 1
+
+    def convert(self, file_paths: List[Path], content_hashes: Dict[Path, str] = None) -> Dict[Path, ProcessedDocument]:
+        return dict(self.iter_convert(file_paths, content_hashes))
+
+    def iter_convert(self, file_paths: List[Path], content_hashes: Dict[Path, str] = None) -> Iterator[Tuple[Path, ProcessedDocument]]:
+        # Yields documents as they finish. Failed, crashed and timed out files are logged and left out,
+        # they never stop the other conversions.
+        attempts = {file_path: 0 for file_path in file_paths}
+        pending = list(file_paths)
+        while pending:
+            retry = []
+            yield from self._run_pool(pending, content_hashes or {}, attempts, retry)
+            pending = retry
+
+    def _run_pool(self, file_paths: List[Path], content_hashes: Dict[Path, str], attempts: Dict[Path, int], retry: List[Path]) -> Iterator[Tuple[Path, ProcessedDocument]]:
+        # Runs until every file is done or a conversion times out, files to run again in a fresh pool go to retry
+        self.logger.info(f"Converting {len(file_paths)} file(s) with {min(self.num_workers, len(file_paths))} Docling worker process(es).")
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.num_workers, len(file_paths)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_conversion_worker,
+        )
+        queued = list(reversed(file_paths))
+        futures, started_at, not_done = {}, {}, set()
+        is_broken = False
+        try:
+            while queued or not_done:
+                while queued and len(not_done) < self.max_in_flight:
+                    file_path = queued.pop()
+                    future = executor.submit(_convert_in_worker, str(file_path), str(self.output_dir_path), content_hashes.get(file_path))
+                    futures[future] = file_path
+                    not_done.add(future)
+
+                done, not_done = wait(not_done, timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = futures.pop(future)
+                    try:
+                        processed_data = future.result()
+                        if processed_data:
+                            self.logger.info(f"Processed {file_path.name} -> {file_path.stem}_processed.json")
+                            yield file_path, ProcessedDocument.create_from_dict(processed_data)
+                        else:
+                            self.logger.error(f"Failed to convert PDF: {file_path}")
+                    except BrokenProcessPool:
+                        is_broken = True
+                        # Files still queued fail with the pool too, only the ones seen running count as an attempt
+                        if future in started_at:
+                            attempts[file_path] += 1
+                        if attempts[file_path] < MAX_ATTEMPTS_AFTER_CRASH:
+                            retry.append(file_path)
+                        else:
+                            self.logger.error(f"Error processing {file_path.name}: conversion worker crashed")
+                    except Exception as e:
+                        self.logger.error(f"Error processing {file_path.name}: {e}")
+                if is_broken and queued:
+                    # A worker died, nothing more can be submitted to this pool
+                    retry.extend(reversed(queued))
+                    queued = []
+
+                # Timed from when the file was handed to a worker (approximately, the pool queues one extra call)
+                now = time.monotonic()
+                timed_out = []
+                for future in not_done:
+                    if future.running():
+                        started_at.setdefault(future, now)
+                        if now - started_at[future] > self.timeout_seconds:
+                            timed_out.append(future)
+                if timed_out:
+                    for future in timed_out:
+                        not_done.discard(future)
+                        self.logger.error(f"Error processing {futures[future].name}: conversion timed out after {self.timeout_seconds:.0f}s")
+                    # A running conversion cannot be cancelled, stop the workers and run the unfinished files again
+                    retry.extend(futures[future] for future in not_done)
+                    retry.extend(reversed(queued))
+                    self._kill_workers(executor)
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _kill_workers(self, executor: ProcessPoolExecutor):
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                process.kill()
+            except Exception as e:
+                self.logger.error(f"Failed to stop conversion worker {process.pid}: {e}")
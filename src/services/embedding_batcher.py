@@ -0,0 +1,246 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+from typing import List, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import queue
+import threading
+import time
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from system.setup import get_config_logger
+from system.cache import PersistentEmbeddingCache
+
+PROMPT_QUERY = "query"
+PROMPT_TEXT = "text"
+
+
+class MicroBatchEmbeddingExecutor:
+    def __init__(self, embed_model: BaseEmbedding, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.config, self.logger = get_config_logger()
+        self.embed_model = embed_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_seconds = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._embedded = 0
+        self._batches = 0
+        self._largest_batch = 0
+        self._last_batch_size = 0
+        self._total_queue_wait = 0.0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str, prompt_name: str = PROMPT_TEXT) -> Future:
+        future = Future()
+        with self._stats_lock:
+            self._submitted += 1
+        self._queue.put((text, prompt_name, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        is_running = True
+        while is_running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # Wait at most max_wait for more callers to join the batch, a full batch goes immediately
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait_seconds
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    is_running = False
+                    break
+                batch.append(item)
+
+            self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        started = time.perf_counter()
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+
+        for prompt_name in (PROMPT_QUERY, PROMPT_TEXT):
+            items = [item for item in batch if item[1] == prompt_name]
+            if not items:
+                continue
+            try:
+                embeddings = self._embed([item[0] for item in items], prompt_name)
+                for item, embedding in zip(items, embeddings):
+                    item[2].set_result(embedding)
+            except Exception as e:
+                self.logger.error(f"Embedding batch of {len(items)} failed. Exception occurred: {e}")
+                for item in items:
+                    item[2].set_exception(e)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._embedded += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._last_batch_size = len(batch)
+            self._total_queue_wait += sum(started - item[3] for item in batch)
+
+    def _embed(self, texts: List[str], prompt_name: str) -> List[List[float]]:
+        # HuggingFaceEmbedding encodes a list in one call with the model's query/text prompt
+        if hasattr(self.embed_model, "_embed"):
+            return self.embed_model._embed(texts, prompt_name=prompt_name)
+        if prompt_name == PROMPT_QUERY:
+            return [self.embed_model.get_query_embedding(text) for text in texts]
+        return self.embed_model.get_text_embedding_batch(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_seconds * 1000.0,
+                "submitted": self._submitted,
+                "embedded": self._embedded,
+                "batches": self._batches,
+                "mean_batch_size": self._embedded / self._batches if self._batches else 0.0,
+                "largest_batch_size": self._largest_batch,
+                "last_batch_size": self._last_batch_size,
+                "mean_queue_wait_ms": 1000.0 * self._total_queue_wait / self._embedded if self._embedded else 0.0,
+            }
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._worker.join()
+
+
+class IngestionEmbeddingBatcher:
+    # Ingestion side: the chunks of consecutive documents are pooled into batches of batch_size and embedded
+    # on num_workers threads. A partial batch only goes out when someone waits for its results (or on flush).
+    # With a cache, chunks embedded before by the same model (cache_model) are answered from it and never batched.
+    def __init__(self, embed_model: BaseEmbedding, batch_size: int = 128, num_workers: int = 2, cache: PersistentEmbeddingCache = None, cache_model: str = None):
+        self.config, self.logger = get_config_logger()
+        self.embed_model = embed_model
+        self.cache = cache
+        self.cache_model = cache_model
+        self.batch_size = max(1, int(batch_size))
+        self.num_workers = max(1, int(num_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ingestion-embedding")
+        self._lock = threading.Lock()
+        self._pending = []  # (text, future) not sent in a batch yet
+        self._embedded = 0
+        self._batches = 0
+        self._embedding_seconds = 0.0
+        self._started_at = time.perf_counter()
+
+    def submit(self, texts: List[str]) -> List[Future]:
+        futures = [Future() for _ in texts]
+        uncached = list(zip(texts, futures))
+        if self.cache is not None:
+            uncached = []
+            for text, future, embedding in zip(texts, futures, self.cache.get_many(self.cache_model, texts)):
+                if embedding is None:
+                    uncached.append((text, future))
+                else:
+                    future.set_result(embedding)
+        with self._lock:
+            self._pending.extend(uncached)
+            while len(self._pending) >= self.batch_size:
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                self._executor.submit(self._process_batch, batch)
+        return futures
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._executor.submit(self._process_batch, batch)
+
+    def results(self, futures: List[Future]) -> List[List[float]]:
+        if not all(future.done() for future in futures):
+            self.flush()
+        return [future.result() for future in futures]
+
+    def _process_batch(self, batch):
+        started = time.perf_counter()
+        try:
+            embeddings = self.embed_model.get_text_embedding_batch([text for text, _ in batch])
+            if self.cache is not None:
+                self.cache.put_many(self.cache_model, [text for text, _ in batch], embeddings)
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+        except Exception as e:
+            self.logger.error(f"Ingestion embedding batch of {len(batch)} failed. Exception occurred: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+        with self._lock:
+            self._batches += 1
+            self._embedded += len(batch)
+            self._embedding_seconds += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = time.perf_counter() - self._started_at
+            return {
+                "batch_size": self.batch_size,
+                "workers": self.num_workers,
+                "embedded": self._embedded,
+                "batches": self._batches,
+                "mean_batch_size": self._embedded / self._batches if self._batches else 0.0,
+                "embedding_seconds": self._embedding_seconds,
+                "chunks_per_second": self._embedded / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def shutdown(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+
+class MicroBatchingEmbedding(BaseEmbedding):
+    # llama-index embedding model that sends every call through a MicroBatchEmbeddingExecutor,
+    # so retrieval, rerank and ingestion (Settings.embed_model) all share the same batches
+    _executor: MicroBatchEmbeddingExecutor = PrivateAttr()
+
+    def __init__(self, executor: MicroBatchEmbeddingExecutor, **kwargs: Any):
+        super().__init__(
+            model_name=executor.embed_model.model_name,
+            embed_batch_size=executor.max_batch_size,
+            **kwargs,
+        )
+        self._executor = executor
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MicroBatchingEmbedding"
+
+    def _embed(self, texts: List[str], prompt_name: str = PROMPT_TEXT) -> List[List[float]]:
+        futures = [self._executor.submit(text, prompt_name) for text in texts]
+        return [future.result() for future in futures]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query], PROMPT_QUERY)[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.wrap_future(self._executor.submit(query, PROMPT_QUERY))
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text], PROMPT_TEXT)[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._executor.submit(text, PROMPT_TEXT))
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, PROMPT_TEXT)
@@ -0,0 +1,206 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+from typing import Dict, Callable, Tuple, List
+from pathlib import Path
+import threading
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.callbacks.schema import CBEventType, EventPayload
+from llama_index.core.instrumentation.events.embedding import EmbeddingStartEvent, EmbeddingEndEvent
+import llama_index.core.instrumentation as instrument
+
+from system.setup import get_config_logger
+
+# === Open Source Embedding model constants ===
+EMBEDDING_MODEL_NOMIC = "nomic-embed-text"
+EMBEDDING_MODEL_HF_BGE_SMALL = "BAAI/bge-small-en"
+EMBEDDING_MODEL_HF_BGE_LARGE = "BAAI/bge-large-en"
+EMBEDDING_MODEL_HF_E5_LARGE_V2 = "intfloat/e5-large-v2"
+EMBEDDING_MODEL_HF_ALL_MPNET_BASE_V2 = "sentence-transformers/all-mpnet-base-v2"
+
+# Known output dimensions, anything else is probed by embedding a short text once
+EMBEDDING_MODEL_DIMENSIONS = {
+    EMBEDDING_MODEL_NOMIC: 768,
+    EMBEDDING_MODEL_HF_BGE_SMALL: 384,
+    EMBEDDING_MODEL_HF_BGE_LARGE: 1024,
+    EMBEDDING_MODEL_HF_E5_LARGE_V2: 1024,
+    EMBEDDING_MODEL_HF_ALL_MPNET_BASE_V2: 768,
+}
+
+# Trained with a Matryoshka loss, i.e. their leading dimensions are a usable embedding on their own
+# (the reduced vector storage mode indexes only those, other models lose most of their recall there)
+MATRYOSHKA_EMBEDDING_MODELS = {
+    EMBEDDING_MODEL_NOMIC,
+    "nomic-ai/nomic-embed-text-v1.5",
+    "mixedbread-ai/mxbai-embed-large-v1",
+}
+
+# === Embedding backends ===
+EMBEDDING_BACKEND_HUGGINGFACE = "huggingface"   # sentence-transformers through llama-index HuggingFaceEmbedding
+EMBEDDING_BACKEND_ONNX = "onnx"                 # same interface, model exported to ONNX and run by ONNX Runtime on CPU
+
+# Dynamic int8 quantization targets understood by sentence-transformers (none keeps the fp32 ONNX model)
+ONNX_QUANTIZATION_NONE = "none"
+ONNX_QUANTIZATIONS = [ONNX_QUANTIZATION_NONE, "arm64", "avx2", "avx512", "avx512_vnni"]
+
+dispatcher = instrument.get_dispatcher(__name__)
+
+_embedding_backends: Dict[str, Callable[[str, Dict], BaseEmbedding]] = {}
+_query_batch_embedders: Dict[str, Callable[[BaseEmbedding, List[str]], List[List[float]]]] = {}
+_embedding_models: Dict[Tuple[str, str], BaseEmbedding] = {}
+_embedding_models_lock = threading.Lock()
+
+
+def register_embedding_backend(backend_name: str, factory: Callable[[str, Dict], BaseEmbedding], query_batch_embedder: Callable[[BaseEmbedding, List[str]], List[List[float]]] = None):
+    # factory(model_name, config) -> llama-index embedding model, called on first use only.
+    # query_batch_embedder(embed_model, queries) -> query embeddings of the factory's models in one encode call (optional)
+    _embedding_backends[backend_name] = factory
+    if query_batch_embedder is not None:
+        _query_batch_embedders[backend_name] = query_batch_embedder
+
+
+def get_embedding_backends():
+    return list(_embedding_backends.keys())
+
+
+def _resolve_model(model_name: str = None, backend_name: str = None) -> Tuple[str, str]:
+    config, _ = get_config_logger()
+    model_name = model_name or config.get('model_embedding') or EMBEDDING_MODEL_HF_BGE_LARGE
+    backend_name = backend_name or config.get('embedding_backend') or EMBEDDING_BACKEND_HUGGINGFACE
+    if backend_name not in _embedding_backends:
+        raise ValueError(f"Unknown embedding backend '{backend_name}', expected one of {get_embedding_backends()}")
+    return model_name, backend_name
+
+
+def get_embedding_model(model_name: str = None, backend_name: str = None) -> BaseEmbedding:
+    # Models are loaded once per process, the first time they are asked for
+    model_name, backend_name = _resolve_model(model_name, backend_name)
+    with _embedding_models_lock:
+        embed_model = _embedding_models.get((backend_name, model_name))
+        if embed_model is None:
+            config, logger = get_config_logger()
+            logger.info(f"Loading embedding model {model_name} with the {backend_name} backend.")
+            embed_model = _embedding_backends[backend_name](model_name, config)
+            _embedding_models[(backend_name, model_name)] = embed_model
+    return embed_model
+
+
+def get_embedding_model_key(model_name: str = None, backend_name: str = None) -> str:
+    # Identifies the vectors a model produces: the same model on another backend or quantization embeds differently
+    model_name, backend_name = _resolve_model(model_name, backend_name)
+    if backend_name == EMBEDDING_BACKEND_ONNX:
+        config, _ = get_config_logger()
+        return f"{backend_name}:{config.get('onnx_quantization', ONNX_QUANTIZATION_NONE) or ONNX_QUANTIZATION_NONE}:{model_name}"
+    return f"{backend_name}:{model_name}"
+
+
+def get_embedding_dimension(model_name: str = None, backend_name: str = None) -> int:
+    model_name, backend_name = _resolve_model(model_name, backend_name)
+    if model_name in EMBEDDING_MODEL_DIMENSIONS:
+        return EMBEDDING_MODEL_DIMENSIONS[model_name]
+    dimension = len(get_embedding_model(model_name, backend_name).get_text_embedding("dimension probe"))
+    EMBEDDING_MODEL_DIMENSIONS[model_name] = dimension
+    return dimension
+
+
+def get_query_embedding_batch(embed_model: BaseEmbedding, queries: List[str], backend_name: str = None) -> List[List[float]]:
+    # llama-index has no batched query API: the backend's query_batch_embedder encodes all queries at once, inside the
+    # same callback and instrumentation events as get_query_embedding. Other backends embed query by query.
+    _, backend_name = _resolve_model(backend_name=backend_name)
+    query_batch_embedder = _query_batch_embedders.get(backend_name)
+    if query_batch_embedder is None:
+        return [embed_model.get_query_embedding(query) for query in queries]
+
+    model_dict = embed_model.to_payload()
+    dispatcher.event(EmbeddingStartEvent(model_dict=model_dict))
+    with embed_model.callback_manager.event(CBEventType.EMBEDDING, payload={EventPayload.SERIALIZED: model_dict}) as event:
+        embeddings = query_batch_embedder(embed_model, queries)
+        event.on_end(payload={EventPayload.CHUNKS: queries, EventPayload.EMBEDDINGS: embeddings})
+    dispatcher.event(EmbeddingEndEvent(chunks=queries, embeddings=embeddings))
+    return embeddings
+
+
+def is_matryoshka_model(model_name: str = None) -> bool:
+    model_name, _ = _resolve_model(model_name)
+    return model_name in MATRYOSHKA_EMBEDDING_MODELS
+
+
+def _create_huggingface_embedding(model_name: str, config: Dict) -> BaseEmbedding:
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name=model_name)
+
+
+def _embed_huggingface_queries(embed_model: BaseEmbedding, queries: List[str]) -> List[List[float]]:
+    # HuggingFaceEmbedding (both backends) applies its query_instruction as the sentence-transformers "query" prompt
+    return embed_model._embed(queries, prompt_name="query")
+
+
+def _export_onnx_model(model_name: str, quantization: str, model_dir: str) -> Tuple[str, str]:
+    # Export once into model_dir/<model>, later starts load the exported files directly.
+    # Returns (local model path, ONNX file inside it).
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    _, logger = get_config_logger()
+    export_path = Path(model_dir) / model_name.replace("/", "__")
+    onnx_file_name = "onnx/model.onnx" if quantization == ONNX_QUANTIZATION_NONE else f"onnx/model_qint8_{quantization}.onnx"
+    if (export_path / onnx_file_name).exists():
+        return str(export_path), onnx_file_name
+
+    if not (export_path / "onnx" / "model.onnx").exists():
+        logger.info(f"Exporting {model_name} to ONNX in {export_path}.")
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save(str(export_path))
+    if quantization != ONNX_QUANTIZATION_NONE:
+        logger.info(f"Quantizing {model_name} to int8 ({quantization}).")
+        model = SentenceTransformer(str(export_path), device="cpu", backend="onnx")
+        export_dynamic_quantized_onnx_model(model, quantization, str(export_path))
+    return str(export_path), onnx_file_name
+
+
+def create_onnx_embedding(model_name: str, quantization: str = ONNX_QUANTIZATION_NONE, intra_op_threads: int = 0, model_dir: str = "data/onnx_models") -> BaseEmbedding:
+    import onnxruntime
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from llama_index.embeddings.huggingface.utils import get_query_instruct_for_model_name, get_text_instruct_for_model_name
+
+    if quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(f"Unknown ONNX quantization '{quantization}', expected one of {ONNX_QUANTIZATIONS}")
+    model_path, onnx_file_name = _export_onnx_model(model_name, quantization, model_dir)
+
+    session_options = onnxruntime.SessionOptions()
+    if intra_op_threads > 0:
+        session_options.intra_op_num_threads = intra_op_threads
+
+    embed_model = HuggingFaceEmbedding(
+        model_name=model_path,
+        # Instructions are looked up by the hub name, the local export path would not match
+        query_instruction=get_query_instruct_for_model_name(model_name),
+        text_instruction=get_text_instruct_for_model_name(model_name),
+        device="cpu",
+        backend="onnx",
+        model_kwargs={"file_name": onnx_file_name, "provider": "CPUExecutionProvider", "session_options": session_options},
+    )
+    embed_model.model_name = model_name  # report the hub name (cache keys, logs), not the export path
+    return embed_model
+
+
+def _create_onnx_embedding(model_name: str, config: Dict) -> BaseEmbedding:
+    return create_onnx_embedding(
+        model_name,
+        quantization=config.get('onnx_quantization', ONNX_QUANTIZATION_NONE) or ONNX_QUANTIZATION_NONE,
+        intra_op_threads=int(config.get('onnx_intra_op_threads', 0)),
+        model_dir=config.get('onnx_model_dir', 'data/onnx_models'),
+    )
+
+
+register_embedding_backend(EMBEDDING_BACKEND_HUGGINGFACE, _create_huggingface_embedding, _embed_huggingface_queries)
+register_embedding_backend(EMBEDDING_BACKEND_ONNX, _create_onnx_embedding, _embed_huggingface_queries)
@@ -13,7 +13,7 @@
 import warnings
 warnings.filterwarnings("ignore", message=".*pin_memory.*")
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from pathlib import Path
 import json
 
@@ -24,12 +24,18 @@ from models.documents import ProcessedDocument
 from services.database import DatabaseManager
 from services.vectorstore import VectorStoreManager
 from services.rag import RAGManager
+from services.ingestion_pipeline import StreamingPipeline
+from services.document_conversion import ParallelDocumentConverter, convert_pdf_to_processed_document, file_content_hash, md_content_extract_title, md_content_extract_sections
 
 class DocumentIndexingManager:
     def __init__(self):
         self.config, self.logger = get_config_logger()
         self.input_dir_path = Path(self.config['data_folder_raw'])
         self.output_dir_path = Path(self.config['data_folder_processed'])
+        self.conversion_workers = int(self.config.get('conversion_workers', 1))
+        self.conversion_timeout = float(self.config.get('conversion_timeout_seconds', 600))
+        self.ingestion_queue_size = int(self.config.get('ingestion_queue_size', 2))
+        self.bulk_load_min_documents = int(self.config.get('bulk_load_min_documents', 0))
 
         self.db_manager = DatabaseManager()
         self.vector_store_manager = VectorStoreManager()
@@ -71,7 +77,7 @@ class DocumentIndexingManager:
     def _do_convert_docx_to_pdf(self, document_path:str):
         return None
 
-    def _do_load_processed_document(self, document:Path):
+    def _do_load_processed_document(self, document:Path, content_hash:str=None):
         # get the document name only
         document_name = document.name
         document_name = document_name.split(".")[0]
@@ -81,99 +87,39 @@ class DocumentIndexingManager:
         if processed_file_json.exists() and processed_file_md.exists():
             with open(processed_file_json, "r", encoding="utf-8") as f:
                 processed_data = json.load(f)
-            return ProcessedDocument.create_from_dict(processed_data)
+            processed_document = ProcessedDocument.create_from_dict(processed_data)
+            # Outputs of another version of the file (or from before hashes were recorded) are converted again
+            if content_hash and processed_document.metadata.content_hash != content_hash:
+                return None
+            return processed_document
 
         return None
 
-    def _do_convert_pdf_to_md(self, file_path:Path):
+    def _do_convert_pdf_to_md(self, file_path:Path, content_hash:str=None):
         processed_data = None
         file_name_without_ext = file_path.stem
         try:
             self.logger.info(f"Processing file: {file_path.name} using Docling")
 
-            result = self.document_converter.convert(str(file_path))
-            if not result or not result.document:
+            processed_data = convert_pdf_to_processed_document(self.document_converter, file_path, self.output_dir_path, content_hash)
+            if not processed_data:
                 self.logger.error(f"Failed to convert PDF: {file_path}")
                 return None
 
-            document = result.document
-            txt_exported = document.export_to_text()
-            md_exported = document.export_to_markdown()
-            title = self._md_content_extract_title(txt_exported, file_name_without_ext)
-            sections = self._md_content_extract_sections(md_exported)
-            processed_data = ProcessedDocument.create_from_document(file_path, document, txt_exported, md_exported, title, sections)
-
-            # Save to output folder
-            output_file = self.output_dir_path / f"{file_name_without_ext}_processed.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(processed_data.to_dict(), f, indent=2, ensure_ascii=False)
-
-            # save markdown file here
-            markdown_file = self.output_dir_path / f"{file_name_without_ext}.md"
-            with open(markdown_file, "w", encoding="utf-8") as f:
-                f.write(md_exported)
-
-            self.logger.info(f"Processed {file_path.name} -> {output_file.name}")
+            self.logger.info(f"Processed {file_path.name} -> {file_name_without_ext}_processed.json")
         
         except Exception as e:
+            # A failed file is skipped, the others keep flowing through the ingestion pipeline
             self.logger.error(f"Error processing {file_path.name}: {e}")
-            processed_data = ProcessedDocument.create_from_dict({
-                "file_name": file_path.name,
-                "file_path": str(file_path),
-                "title": file_name_without_ext,
-                "markdown_content": "",
-                "text_content": "",
-                "sections": [],
-                "metadata": {
-                    "original_file": file_path.name,
-                    "processed_successfully": False,
-                    "error": str(e),
-                },
-            })
+            processed_data = None
         
         return processed_data
     
     def _md_content_extract_title(self, document_text, default_title: str) -> str:
-        try:
-            lines = document_text.split("\n")
-
-            for line in lines[:10]:
-                line = line.strip()
-                if line and len(line) > 3:
-                    return line
-
-            return default_title
-        except:
-            return default_title
+        return md_content_extract_title(document_text, default_title)
 
     def _md_content_extract_sections(self, markdown_content: str) -> List[Dict[str, Any]]:
-        sections = []
-        lines = markdown_content.split("\n")
-        current_section = None
-
-        for line in lines:
-            if line.startswith("#"):
-                if current_section:
-                    sections.append(current_section)
-                header_level = len(line) - len(line.lstrip("#"))
-                title = line.lstrip("#").strip()
-                current_section = {"title": title, "level": header_level, "content": []}
-            elif current_section and line.strip():
-                current_section["content"].append(line)
-
-        if current_section:
-            sections.append(current_section)
-
-        if not sections and markdown_content.strip():
-            sections.append(
-                {
-                    "title": "Main Content",
-                    "level": 1,
-                    "content": markdown_content.split("\n"),
-                }
-            )
-
-        return sections
+        return md_content_extract_sections(markdown_content)
 
     def _save_processed_documents_to_database(self, processed_document:ProcessedDocument):
         try:
@@ -183,13 +129,44 @@ class DocumentIndexingManager:
             self.logger.error(f"Failed to save processed document to database. Exception occurred: {e}")
             return None
         
-    def _index_processed_documents_to_vector_store(self, processed_document_list:list[ProcessedDocument]):
-        try:
-            self.rag_manager.ingest_processed_documents(processed_document_list)
-        except Exception as e:
-            self.logger.error(f"Failed to index processed document to vector store. Exception occurred: {e}")
+    def _iter_processed_documents(self, input_files:List[Path], content_hashes:Dict[Path, str]) -> Iterator[ProcessedDocument]:
+        # Already processed files first (loaded from the output folder), then conversions as they finish
+        pending_files = []
+        for input_file in input_files:
+            processed_document = self._do_load_processed_document(input_file, content_hashes[input_file])
+            if processed_document:
+                yield processed_document
+            else:
+                pending_files.append(input_file)
+
+        if self.conversion_workers > 1 and len(pending_files) > 1:
+            parallel_converter = ParallelDocumentConverter(self.output_dir_path, self.conversion_workers, self.conversion_timeout)
+            for _, processed_document in parallel_converter.iter_convert(pending_files, content_hashes):
+                yield processed_document
+        else:
+            for input_file in pending_files:
+                processed_document = self._do_convert_pdf_to_md(input_file, content_hashes[input_file])
+                if processed_document:
+                    yield processed_document
+
+    def _reject_duplicate_names(self, converted_files: List[Path]) -> List[Path]:
+        # A document is keyed by its file name (document row, chunk rows, content hash) and its processed outputs by the
+        # name before the first dot: a second file with either key would overwrite the first one's chunks, so it is skipped
+        accepted_files, seen_names, seen_stems = [], {}, {}
+        for converted_file in sorted(converted_files):
+            stem = converted_file.name.split(".")[0]
+            earlier_file = seen_names.get(converted_file.name) or seen_stems.get(stem)
+            if earlier_file:
+                self.logger.error(f"Skipping {converted_file}, it would be indexed as the same document as {earlier_file}. Rename one of them.")
+                continue
+            seen_names[converted_file.name] = seen_stems[stem] = converted_file
+            accepted_files.append(converted_file)
+        return accepted_files
+
+    def start_indexing_from_directory(self) -> int:
+        # Returns the number of documents indexed. Documents stream through the pipeline and are not kept,
+        # so the processed documents themselves are no longer returned.
 
-    def start_indexing_from_directory(self):
         # Step 1: Get all the files ...
         input_files = self._get_input_files()
 
@@ -200,23 +177,31 @@ class DocumentIndexingManager:
             if converted_file:
                 converted_files.append(converted_file)
         
-        input_files = converted_files
-        processed_documents = []        
-        # Step 3: Process each PDF file 
-        for input_file in input_files:
-            processed_document = self._do_load_processed_document(input_file)
-            if not processed_document:
-                processed_document = self._do_convert_pdf_to_md(input_file)
-            if processed_document:
-                processed_documents.append(processed_document)
-
-        # Step 4: Save processed documents to database
-        for processed_document in processed_documents:
-            upd_processed_document = self._save_processed_documents_to_database(processed_document)
-            if upd_processed_document:
-                processed_document.doc_id = upd_processed_document.doc_id
-
-        # Step 5: Index processed documents to vector store
-        self._index_processed_documents_to_vector_store(processed_documents)
-
-        return processed_documents
\ No newline at end of file
+        converted_files = self._reject_duplicate_names(converted_files)
+
+        # Step 2.1: Skip files whose current content is already indexed
+        indexed_hashes = self.db_manager.get_document_hashes()
+        content_hashes = {converted_file: file_content_hash(converted_file) for converted_file in converted_files}
+        input_files = [converted_file for converted_file in converted_files if indexed_hashes.get(converted_file.name) != content_hashes[converted_file]]
+        self.logger.info(f"{len(converted_files) - len(input_files)} file(s) unchanged since they were indexed, {len(input_files)} new or changed file(s) to index.")
+
+        # Large loads go in with COPY and without a live HNSW index, the index is built once afterwards
+        bulk_load = 0 < self.bulk_load_min_documents <= len(input_files)
+        if not self.rag_manager.begin_ingestion(bulk_load=bulk_load):
+            return 0
+
+        # Step 3-5: Every document streams through conversion, database save, chunking + embedding and the vector write
+        # on its own, each document is searchable as soon as it is written and only a few are held in memory at a time
+        pipeline = StreamingPipeline(
+            [
+                ("save", self._save_processed_documents_to_database),
+                ("chunk", self.rag_manager.chunk_processed_document),
+                ("embed", self.rag_manager.embed_prepared_document),
+                ("write", self.rag_manager.write_prepared_document),
+            ],
+            queue_size=self.ingestion_queue_size,
+        )
+        success_count = pipeline.run(self._iter_processed_documents(input_files, content_hashes))
+        self.rag_manager.finish_ingestion(success_count)
+
+        return success_count
@@ -0,0 +1,73 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+from typing import List, Tuple, Callable, Iterable, Any
+import threading
+import queue
+
+from system.setup import get_config_logger
+
+_END_OF_STREAM = object()
+
+
+class StreamingPipeline:
+    # Every stage runs on its own thread and hands items to the next one through a bounded queue. A slow stage
+    # blocks the ones before it (backpressure), so at most queue_size items wait between two stages at any time.
+    # A stage returns the item for the next stage, or None to drop it; the last stage returns a truthy value per success.
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2):
+        self.config, self.logger = get_config_logger()
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.completed = 0
+
+    def run(self, source: Iterable[Any]) -> int:
+        self.completed = 0
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        for i, (name, stage_fn) in enumerate(self.stages):
+            output_queue = queues[i + 1] if i + 1 < len(queues) else None
+            thread = threading.Thread(target=self._run_stage, args=(name, stage_fn, queues[i], output_queue), name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        # The source (e.g. document conversion) runs on the calling thread and blocks when the first queue is full
+        try:
+            for item in source:
+                queues[0].put(item)
+        except Exception as e:
+            self.logger.error(f"Pipeline source failed, finishing the items already queued. Exception occurred: {e}")
+        finally:
+            queues[0].put(_END_OF_STREAM)
+            for thread in threads:
+                thread.join()
+        return self.completed
+
+    def _run_stage(self, name: str, stage_fn: Callable[[Any], Any], input_queue: queue.Queue, output_queue: queue.Queue):
+        while True:
+            item = input_queue.get()
+            if item is _END_OF_STREAM:
+                break
+            try:
+                result = stage_fn(item)
+            except Exception as e:
+                self.logger.error(f"Pipeline stage '{name}' failed for an item. Exception occurred: {e}")
+                result = None
+            item = None  # release the input before blocking on the next queue
+            if not result:
+                continue
+            if output_queue is not None:
+                output_queue.put(result)
+            else:
+                self.completed += 1
+        if output_queue is not None:
+            output_queue.put(_END_OF_STREAM)
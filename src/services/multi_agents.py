@@ -29,12 +29,38 @@ def document_search(query: str) -> str:
     CrewAI/LangChain compatible: Search through the document collection to find relevant context and information. Input should be a question or search query. Returns relevant document excerpts with sources.
     """
     try:
-        context = _rag_manager.query_context_retrieval(query)        
+        context, _, _, _ = _rag_manager.query_context_retrieval(query)
         return context
     except Exception as e:
         error_msg = f"Error in Document Search Tool. Exception occurred: {str(e)}"
         return error_msg
 
+def _context_tokens_used(sources: List[Dict[str, Any]]) -> Optional[int]:
+    # Sources only carry token counts when the context token budget is enabled
+    if any("tokens" not in source for source in sources):
+        return None
+    return sum(source["tokens"] for source in sources)
+
+def create_document_search_tool(retrieval_options: Dict[str, Any], context_log: Optional[List[Dict[str, Any]]] = None):
+    # Same tool as document_search, bound to per-request retrieval options (e.g. retrieval_mode)
+    # and recording what every search put into the context in context_log
+
+    @tool("document_search")
+    def document_search_with_options(query: str) -> str:
+        """
+        CrewAI/LangChain compatible: Search through the document collection to find relevant context and information. Input should be a question or search query. Returns relevant document excerpts with sources.
+        """
+        try:
+            context, sources, _, _ = _rag_manager.query_context_retrieval(query, **retrieval_options)
+            if context_log is not None:
+                context_log.append({"query": query, "chunks": len(sources), "tokens_used": _context_tokens_used(sources)})
+            return context
+        except Exception as e:
+            error_msg = f"Error in Document Search Tool. Exception occurred: {str(e)}"
+            return error_msg
+
+    return document_search_with_options
+
 class MultiAgentsManager:
     def __init__(self, rag_manager: RAGManager, llm_manager: LLMManager):
         global _rag_manager
@@ -119,7 +145,9 @@ class MultiAgentsManager:
             memory=False,
         )
 
-    def _create_crew(self, question: str) -> Crew:
+    def _create_crew(self, question: str, retrieval_options: Optional[Dict[str, Any]] = None, context_log: Optional[List[Dict[str, Any]]] = None) -> Crew:
+        task_tools = [create_document_search_tool(retrieval_options or {}, context_log)]
+
         retrieval_task = Task(
             description=f"""You MUST use the 'document_search' tool to get relevant context for this question:
             '{question}'
@@ -141,6 +169,7 @@ class MultiAgentsManager:
             - Do not add information that isn't in the provided context
             - Include proper citations from the sources mentioned in the context""",
             agent=self.retriever_agent,
+            tools=task_tools,
             expected_output="A comprehensive answer with clear source citations based on the context returned by document_search tool",
         )
 
@@ -171,6 +200,7 @@ class MultiAgentsManager:
             
             If there are issues, provide specific feedback and suggestions for improvement.""",
             agent=self.validator_agent,
+            tools=task_tools,
             expected_output="Validation status (PASSED or specific improvement suggestions)",
         )
 
@@ -192,12 +222,22 @@ class MultiAgentsManager:
             self.logger.error(f"Error creating crew. Exception occurred: {e}")
             return None
 
-    def answer_question(self, question: str) -> Dict[str, Any]:
+    def _get_context_usage(self, context_log: List[Dict[str, Any]]) -> Dict[str, Any]:
+        context_packer = self.rag_manager.context_packer
+        tokens_used = [search["tokens_used"] for search in context_log]
+        return {
+            "token_budget": context_packer.token_budget if context_packer is not None else None,
+            "tokens_used": sum(tokens_used) if tokens_used and None not in tokens_used else None,
+            "searches": context_log,
+        }
+
+    def answer_question(self, question: str, retrieval_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         self.logger.info(f"Starting CrewAI processing for: {question}")
         response = None
+        context_log = []
         
         try:
-            crew = self._create_crew(question)
+            crew = self._create_crew(question, retrieval_options, context_log)
             # Execute crew with timeout
             try:
                 self.logger.info(">>> Starting crew execution...")
@@ -232,6 +272,7 @@ class MultiAgentsManager:
                 "metadata": validation_output,
                 "agents_used": [agent.role for agent in crew.agents],
                 "model_id": self.model_id,
+                "context_usage": self._get_context_usage(context_log),
             }
 
         except Exception as e:
@@ -10,54 +10,241 @@
 # Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
 # =============================================================================
 
-from typing import List, Tuple, Dict, Any
-
-from llama_index.core import Settings, QueryBundle, get_response_synthesizer, StorageContext, Document, VectorStoreIndex
-from llama_index.core.schema import NodeWithScore
+from typing import List, Tuple, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+from llama_index.core import Settings, QueryBundle, get_response_synthesizer, Document
+from llama_index.core.schema import NodeWithScore, TextNode, MetadataMode
 from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core.vector_stores.types import VectorStoreQueryMode
 from llama_index.core.node_parser import SentenceSplitter
 import numpy as np
 
 from system.setup import get_config_logger
-from services.vectorstore import VectorStoreManager
+from system.cache import LRUTTLCache, PersistentEmbeddingCache
+from services.vectorstore import VectorStoreManager, normalize_metadata_filters, build_metadata_filters
+from services.database import DatabaseManager
+from services.context_packer import ContextPacker
+from services.embeddings import get_embedding_model, get_embedding_model_key, get_query_embedding_batch, EMBEDDING_MODEL_HF_BGE_LARGE
+from services.embedding_batcher import MicroBatchEmbeddingExecutor, MicroBatchingEmbedding, IngestionEmbeddingBatcher
 from models.documents import ProcessedDocument
 
 from services.observability import observability_set_contexts
 
-# === Open Source Embedding model constants ===
-EMBEDDING_MODEL_NOMIC = "nomic-embed-text"
-EMBEDDING_MODEL_HF_BGE_SMALL = "BAAI/bge-small-en"
-EMBEDDING_MODEL_HF_BGE_LARGE = "BAAI/bge-large-en"
-EMBEDDING_MODEL_HF_E5_LARGE_V2 = "intfloat/e5-large-v2"
-EMBEDDING_MODEL_HF_ALL_MPNET_BASE_V2 = "sentence-transformers/all-mpnet-base-v2"
+# === Rerank modes ===
+RERANK_MODE_EMBED = "embed"     # re-embed the query and every retrieved chunk text (original behaviour)
+RERANK_MODE_STORED = "stored"   # reuse the retrieval query vector and the chunk vectors stored in PGVector
+
+# === Retrieval modes ===
+RETRIEVAL_MODE_VECTOR = "vector"    # dense HNSW search only
+RETRIEVAL_MODE_HYBRID = "hybrid"    # dense HNSW + Postgres full-text search, fused with reciprocal rank fusion
+RETRIEVAL_MODES = [RETRIEVAL_MODE_VECTOR, RETRIEVAL_MODE_HYBRID]
+
+RRF_K = 60  # rank smoothing constant from the original reciprocal rank fusion paper
+
+CONTEXT_SEPARATOR = "\\n"  # what the context parts have always been joined with
+
+# Bookkeeping metadata left out of the embedded chunk text, so a chunk's vector (and its embedding cache key)
+# does not change when only its position, document id or the document's section count does
+EMBED_EXCLUDED_METADATA_KEYS = ["doc_id", "chunk_id", "section_id", "sections_count"]
+# Bumped whenever the embedded chunk text changes, vectors of another version are not comparable (1: bookkeeping
+# metadata embedded, 2: EMBED_EXCLUDED_METADATA_KEYS left out)
+EMBED_TEXT_VERSION = 2
+
+
+def _format_context_block(position: int, node: NodeWithScore) -> List[str]:
+    return [
+        f"[Source {position} - {node.node.metadata.get('filename', 'Unknown')}]",
+        f"Section: {node.node.metadata.get('section', node.node.metadata.get('title', 'N/A'))}",
+        node.node.text,
+        "",
+    ]
+
+
+def _section_text(section: Dict[str, Any]) -> str:
+    # Sections come from DocumentIndexingManager._md_content_extract_sections: heading title/level and content lines
+    heading = "#" * int(section.get("level", 1)) + " " + section.get("title", "")
+    return "\n".join([heading.strip(), *section.get("content", [])]).strip()
+
+
+def _cosine_similarities(query_emb, node_embs) -> np.ndarray:
+    query_emb = np.asarray(query_emb, dtype=float)
+    node_embs = np.asarray(node_embs, dtype=float)
+
+    # Normalize embeddings
+    query_emb_norm = query_emb / np.linalg.norm(query_emb)
+    node_embs_norm = node_embs / np.linalg.norm(node_embs, axis=1, keepdims=True)
+
+    # Cosine similarities of all nodes in a single matrix-vector product
+    return node_embs_norm @ query_emb_norm
+
+
+def _mmr_select(relevance: np.ndarray, node_embs, top_k: int, lambda_mult: float, duplicate_threshold: float = 1.0) -> List[int]:
+    # Maximal marginal relevance over the candidate set: each pick maximizes
+    # lambda * relevance - (1 - lambda) * (max similarity to the already picked chunks).
+    # Candidates at least duplicate_threshold similar to a picked chunk are dropped, which can return fewer than top_k
+    # (1.0 keeps all, float rounding puts exact duplicates right at 1.0).
+    node_embs = np.asarray(node_embs, dtype=float)
+    node_embs = node_embs / np.linalg.norm(node_embs, axis=1, keepdims=True)
+    pairwise = node_embs @ node_embs.T
+
+    available = np.ones(len(relevance), dtype=bool)
+    redundancy = np.zeros(len(relevance))
+    selected = []
+    while len(selected) < top_k and available.any():
+        mmr_scores = relevance if not selected else lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        best = int(np.argmax(np.where(available, mmr_scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        redundancy = pairwise[best] if len(selected) == 1 else np.maximum(redundancy, pairwise[best])
+        if duplicate_threshold < 1.0:
+            available &= redundancy < duplicate_threshold
+    return selected
+
+
+def _reciprocal_rank_fusion(ranked_lists: List[List[NodeWithScore]], top_k: int, k: int = RRF_K) -> List[NodeWithScore]:
+    fused_scores, fused_nodes = {}, {}
+    for ranked_nodes in ranked_lists:
+        for rank, node in enumerate(ranked_nodes, start=1):
+            node_id = node.node.node_id
+            fused_scores[node_id] = fused_scores.get(node_id, 0.0) + 1.0 / (k + rank)
+            fused_nodes.setdefault(node_id, node)
+
+    fused_ids = sorted(fused_scores, key=fused_scores.get, reverse=True)[:top_k]
+    return [NodeWithScore(node=fused_nodes[node_id].node, score=fused_scores[node_id]) for node_id in fused_ids]
 
 
 class RAGManager:
     is_llamaindex_setup = False
     embed_model = None
+    embedding_cache: LRUTTLCache = None
+    embedding_executor: ThreadPoolExecutor = None
+    embedding_batcher: MicroBatchEmbeddingExecutor = None
+    retrieval_cache: LRUTTLCache = None
+    chunk_embedding_cache: PersistentEmbeddingCache = None
 
     def __init__(self):
         self.config, self.logger = get_config_logger()
      
         self._setup_llamaindex()
+        self.rerank_mode = self.config.get('rerank_mode', RERANK_MODE_EMBED)
+        self.retrieval_mode = self.config.get('retrieval_mode', RETRIEVAL_MODE_VECTOR)
+        self.mmr_enabled = self.config.get('mmr_enabled', False)
+        self.mmr_lambda = float(self.config.get('mmr_lambda', 0.7))
+        self.mmr_duplicate_threshold = float(self.config.get('mmr_duplicate_threshold', 1.0))
+        # Small-to-big: index small chunks tagged with their markdown section, answer with the whole section
+        self.section_retrieval_enabled = self.config.get('section_retrieval_enabled', False)
+        self.section_max_chars = int(self.config.get('section_max_chars', 6000))
+        self.context_packer = None
+        if int(self.config.get('context_token_budget', 0)) > 0:
+            self.context_packer = ContextPacker(
+                token_budget=int(self.config['context_token_budget']),
+                tokenizer_name=self.config.get('context_tokenizer', 'NousResearch/Meta-Llama-3-8B-Instruct'),
+            )
         
+        self.db_manager = DatabaseManager()
         self.vector_store_manager = VectorStoreManager()
-        self.vs_engine = self.vector_store_manager.create_vector_store()
+        self.embedding_model_name = self.config.get('model_embedding', EMBEDDING_MODEL_HF_BGE_LARGE)
+        self.embedding_model_error = self._check_embedding_model()
+        self.vs_engine = self.vector_store_manager.create_vector_store(
+            return_embeddings=(self.rerank_mode == RERANK_MODE_STORED)
+        )
         self.vs_index = self.vector_store_manager.load_index()
 
+        # Long-lived objects shared by all requests of this manager, created on first use
+        self._shared_objects_lock = threading.Lock()
+        self._node_parser = None
+        self._retrievers: Dict[Tuple[int, VectorStoreQueryMode], VectorIndexRetriever] = {}
+
+        # Set between begin_ingestion and finish_ingestion
+        self.ingestion_embedder = None
+        self._ingestion_started_at = None
+        self._ingestion_chunks = 0
+
     def _setup_llamaindex(self):
         if RAGManager.is_llamaindex_setup:
             return
 
-        RAGManager.embed_model = HuggingFaceEmbedding(model_name=EMBEDDING_MODEL_HF_BGE_LARGE)
+        RAGManager.embed_model = get_embedding_model()
+        if self.config.get('embedding_batching_enabled', False):
+            # Concurrent requests and ingestion share model calls through one micro-batching queue
+            RAGManager.embedding_batcher = MicroBatchEmbeddingExecutor(
+                RAGManager.embed_model,
+                max_batch_size=int(self.config.get('embedding_batch_max_size', 32)),
+                max_wait_ms=float(self.config.get('embedding_batch_max_wait_ms', 5)),
+            )
+            RAGManager.embed_model = MicroBatchingEmbedding(RAGManager.embedding_batcher)
 
         Settings.embed_model = RAGManager.embed_model
+        if self.config.get('chunk_embedding_cache_enabled', False):
+            # Re-ingestion (changed chunk_size, small document edits) re-embeds only chunks whose text is new
+            RAGManager.chunk_embedding_cache = PersistentEmbeddingCache(
+                self.config.get('chunk_embedding_cache_path', 'data/embedding_cache/chunk_embeddings.sqlite'),
+            )
+        RAGManager.embedding_cache = LRUTTLCache(
+            max_size=int(self.config.get('embedding_cache_size', 2048)),
+            ttl_seconds=float(self.config.get('embedding_cache_ttl', 3600)),
+        )
+        if self.config.get('retrieval_cache_enabled', False):
+            RAGManager.retrieval_cache = LRUTTLCache(
+                max_size=int(self.config.get('retrieval_cache_size', 1024)),
+                ttl_seconds=float(self.config.get('retrieval_cache_ttl', 3600)),
+            )
+        RAGManager.embedding_executor = ThreadPoolExecutor(
+            max_workers=int(self.config.get('embedding_executor_workers', 2)),
+            thread_name_prefix="embedding",
+        )
         Settings.chunk_size = int(self.config['chunk_size'])
         Settings.chunk_overlap = int(self.config['chunk_overlap'])
 
         RAGManager.is_llamaindex_setup = True
     
+    def _check_embedding_model(self) -> str:
+        # Vectors from different models are not comparable, refuse to use a table built with another model
+        embed_dim = self.vector_store_manager.embed_dim
+        try:
+            table_dim, has_rows = self.vector_store_manager.get_embedding_table_state()
+        except Exception as e:
+            self.logger.error(f"Failed to check the embedding table against model {self.embedding_model_name}. Exception occurred: {e}")
+            return None
+
+        if not has_rows:
+            if table_dim is not None and table_dim != embed_dim:
+                # Nothing indexed yet, let PGVectorStore recreate the table with the new dimension
+                self.logger.warning(f"Empty embedding table has {table_dim} dimensions, {self.embedding_model_name} needs {embed_dim}. Recreating it.")
+                self.vector_store_manager.drop_embedding_table()
+            return None
+
+        model_state = self.db_manager.get_embedding_model_state()
+        if model_state is None and table_dim == embed_dim:
+            # Indexed before the model was recorded, the dimension is all there is to go by. Such a table predates
+            # the embed text versions, so its chunk texts are version 1 and the check below asks for a re-index.
+            self.logger.warning(f"Embedding table has no recorded model, assuming {self.embedding_model_name}.")
+            self.db_manager.save_embedding_model_state(self.embedding_model_name, embed_dim, 1)
+            model_state = self.db_manager.get_embedding_model_state()
+
+        built_with = f"{model_state.model_name} ({model_state.embed_dim} dimensions)" if model_state else f"a {table_dim} dimension model"
+        if model_state is None or model_state.model_name != self.embedding_model_name or table_dim != embed_dim:
+            error = (f"The embedding table was built with {built_with} but model_embedding is {self.embedding_model_name} "
+                     f"({embed_dim} dimensions). Reset the vector store and re-index, or set model_embedding back.")
+            self.logger.error(error)
+            return error
+        if model_state.embed_text_version != EMBED_TEXT_VERSION:
+            error = (f"The embedding table holds chunk texts of embed text version {model_state.embed_text_version}, this release "
+                     f"embeds version {EMBED_TEXT_VERSION}. Reset the vector store and re-index.")
+            self.logger.error(error)
+            return error
+        return None
+
+    def _ensure_embedding_model_matches(self):
+        if self.embedding_model_error:
+            raise RuntimeError(self.embedding_model_error)
+
     def _create_document_from_processed(self, processed_document:ProcessedDocument) -> Document:
         document = None
         
@@ -89,117 +276,556 @@ class RAGManager:
         
         return document
 
-    def _index_document(self, file_name:str, document: Document):
-        is_sucess = False
-
-        storage_context = StorageContext.from_defaults(vector_store=self.vs_engine)
-        parser = SentenceSplitter(
-            chunk_size=int(self.config['chunk_size']),
-            chunk_overlap=int(self.config['chunk_overlap']),
-            separator=" "
-        )
-        
-        nodes = parser.get_nodes_from_documents([document])
+    def _get_node_parser(self) -> SentenceSplitter:
+        if self._node_parser is None:
+            with self._shared_objects_lock:
+                if self._node_parser is None:
+                    if self.section_retrieval_enabled:
+                        chunk_size, chunk_overlap = int(self.config.get('section_chunk_size', 256)), int(self.config.get('section_chunk_overlap', 32))
+                    else:
+                        chunk_size, chunk_overlap = int(self.config['chunk_size']), int(self.config['chunk_overlap'])
+                    self._node_parser = SentenceSplitter(
+                        chunk_size=chunk_size,
+                        chunk_overlap=chunk_overlap,
+                        separator=" "
+                    )
+        return self._node_parser
+
+    def _create_section_documents(self, document: Document, sections: List[Dict[str, Any]]) -> List[Tuple[str, Document]]:
+        # One document per non-empty section so no chunk straddles two sections
+        section_documents = []
+        for section in sections:
+            text = _section_text(section)
+            if not text:
+                continue
+            metadata = dict(document.metadata)
+            metadata.update({"section_id": str(len(section_documents)), "section": section.get("title", "")})
+            section_documents.append((section.get("title", ""), Document(text=text, metadata=metadata)))
+        return section_documents
+
+    def _chunk_document(self, file_name:str, document: Document, sections: List[Dict[str, Any]] = None, content_hash: str = None) -> Dict[str, Any]:
+        # Chunk one document, the result holds everything _write_document needs (once embedded) and nothing else
+        parser = self._get_node_parser()
+
+        section_documents = self._create_section_documents(document, sections) if self.section_retrieval_enabled and sections else []
+        if section_documents:
+            nodes = parser.get_nodes_from_documents([section_document for _, section_document in section_documents])
+        else:
+            nodes = parser.get_nodes_from_documents([document])
         
         chunk_id = 1
         for node in nodes:
             node.metadata.update({                
                 "chunk_id": str(chunk_id)
             })
+            node.excluded_embed_metadata_keys = sorted(set(node.excluded_embed_metadata_keys) | set(EMBED_EXCLUDED_METADATA_KEYS))
             chunk_id += 1
-        
-        # self.logger.info(f"Created {len(nodes)} nodes from document {document.get('file_name', 'Unknown')}.")
-        
+
+        return {
+            "file_name": file_name,
+            "doc_id": document.metadata["doc_id"],
+            "nodes": nodes,
+            "sections": [(title, section_document.text) for title, section_document in section_documents],
+            "content_hash": content_hash,
+        }
+
+    def _chunk_texts(self, prepared_document: Dict[str, Any]) -> List[str]:
+        # Same texts VectorStoreIndex embeds, the rows are then written by replace_document_chunks
+        return [node.get_content(metadata_mode=MetadataMode.EMBED) for node in prepared_document["nodes"]]
+
+    def _write_document(self, prepared_document: Dict[str, Any]) -> bool:
+        embedding_futures = prepared_document.pop("embedding_futures", None)
+        if embedding_futures is not None:
+            for node, embedding in zip(prepared_document["nodes"], self.ingestion_embedder.results(embedding_futures)):
+                node.embedding = embedding
+        if prepared_document["sections"] and not self.db_manager.save_document_sections(prepared_document["doc_id"], prepared_document["sections"]):
+            return False
+        # The content hash is recorded with the chunks, a failed document is picked up again on the next run
+        return self.vector_store_manager.replace_document_chunks(
+            prepared_document["file_name"], prepared_document["doc_id"], prepared_document["nodes"], prepared_document["content_hash"],
+        )
+
+    def begin_ingestion(self, bulk_load: bool = False) -> bool:
+        # Checked again, the vector store may have been reset since start-up
+        self.embedding_model_error = self._check_embedding_model()
+        if self.embedding_model_error:
+            self.logger.error(f"Ingestion refused. {self.embedding_model_error}")
+            return False
+        # Recorded up front, chunks become searchable one document at a time
+        self.db_manager.save_embedding_model_state(self.embedding_model_name, self.vector_store_manager.embed_dim, EMBED_TEXT_VERSION)
+        if bulk_load:
+            self.vector_store_manager.begin_bulk_load()
+        # Raw model, not the micro-batching wrapper: ingestion batches are already large
+        embed_model = RAGManager.embedding_batcher.embed_model if RAGManager.embedding_batcher else RAGManager.embed_model
+        self.ingestion_embedder = IngestionEmbeddingBatcher(
+            embed_model,
+            batch_size=int(self.config.get('ingestion_embed_batch_size', 128)),
+            num_workers=int(self.config.get('ingestion_embed_workers', 2)),
+            cache=RAGManager.chunk_embedding_cache,
+            cache_model=get_embedding_model_key(),
+        )
+        if RAGManager.chunk_embedding_cache is not None:
+            RAGManager.chunk_embedding_cache.reset_stats()
+        self._ingestion_started_at = time.perf_counter()
+        self._ingestion_chunks = 0
+        return True
+
+    def chunk_processed_document(self, processed_document: ProcessedDocument) -> Optional[Dict[str, Any]]:
+        file_name = processed_document.file_name
+        self.logger.info(f" > Processing document: {file_name}")
+        document = self._create_document_from_processed(processed_document)
+        if not document:
+            self.logger.error(f" > Failed to create document from {file_name}")
+            return None
         try:
-            self.index = VectorStoreIndex(
-                nodes=nodes,
-                storage_context=storage_context,
-                show_progress=True
-            )
-            is_sucess = True    
+            return self._chunk_document(file_name, document, processed_document.sections, processed_document.metadata.content_hash)
         except Exception as e:
             self.logger.error(f"Error creating index from document {file_name}. Exception occurred: {e}")
-            
-        return is_sucess
+            return None
+
+    def embed_prepared_document(self, prepared_document: Dict[str, Any]) -> Dict[str, Any]:
+        # Does not wait: the chunks join the shared batches, write_prepared_document collects the embeddings
+        prepared_document["embedding_futures"] = self.ingestion_embedder.submit(self._chunk_texts(prepared_document))
+        return prepared_document
+
+    def prepare_processed_document(self, processed_document: ProcessedDocument) -> Optional[Dict[str, Any]]:
+        prepared_document = self.chunk_processed_document(processed_document)
+        return self.embed_prepared_document(prepared_document) if prepared_document else None
+
+    def write_prepared_document(self, prepared_document: Dict[str, Any]) -> bool:
+        try:
+            is_success = self._write_document(prepared_document)
+        except Exception as e:
+            self.logger.error(f"Error creating index from document {prepared_document['file_name']}. Exception occurred: {e}")
+            is_success = False
+        if not is_success:
+            self.logger.error(f" > Failed to index document {prepared_document['file_name']}")
+            return False
+        # Every written document changes the corpus, cached retrievals and answers must not outlive it
+        self.db_manager.bump_index_version()
+        self._ingestion_chunks += len(prepared_document["nodes"])
+        return True
+
+    def finish_ingestion(self, success_count: int):
+        embedding_stats = None
+        if self.ingestion_embedder is not None:
+            self.ingestion_embedder.shutdown()
+            embedding_stats = self.ingestion_embedder.stats()
+            self.ingestion_embedder = None
+        # Also after a failed bulk load, the HNSW index has to come back
+        self.vector_store_manager.finish_bulk_load()
+        if success_count > 0:
+            self.vector_store_manager.ensure_indexes()
+            self.vector_store_manager.refresh_ann_index()
+
+        elapsed = time.perf_counter() - self._ingestion_started_at if self._ingestion_started_at else 0.0
+        self.logger.info("-------------------------------------------------------")
+        self.logger.info(f"Ingestion completed successfully with {success_count} document(s).")
+        self.logger.info(f"Indexed {self._ingestion_chunks} chunk(s) in {elapsed:.2f}s ({self._ingestion_chunks / elapsed if elapsed > 0 else 0.0:.1f} chunks/s).")
+        if embedding_stats:
+            self.logger.info(
+                f"Embedded {embedding_stats['embedded']} chunk(s) in {embedding_stats['batches']} batch(es) of {embedding_stats['mean_batch_size']:.1f} on average "
+                f"with {embedding_stats['workers']} worker(s), {embedding_stats['chunks_per_second']:.1f} chunks/s."
+            )
+        if RAGManager.chunk_embedding_cache is not None:
+            cache_stats = RAGManager.chunk_embedding_cache.stats()
+            self.logger.info(
+                f"Chunk embedding cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es), "
+                f"hit rate {cache_stats['hit_rate']:.1%}, {cache_stats['writes']} new embedding(s) stored."
+            )
 
     def ingest_processed_documents(self, list_of_processed_documents: list[ProcessedDocument]):
+        if not self.begin_ingestion():
+            return
+
         self.logger.info(f"Ingesting {len(list_of_processed_documents)} processed documents.")
         self.logger.info("-------------------------------------------------------")
 
         success_count = 0
         for processed_document in list_of_processed_documents:
-            file_name = processed_document.file_name
-            self.logger.info(f" > Processing document: {file_name}")
-            document = self._create_document_from_processed(processed_document)
-
-            if not document:
-                self.logger.error(f" > Failed to create document from {file_name}")
-                continue
-
-            if self._index_document(file_name, document):
+            prepared_document = self.prepare_processed_document(processed_document)
+            if prepared_document and self.write_prepared_document(prepared_document):
                 success_count += 1
-            else:
-                self.logger.error(f" > Failed to index document {file_name}")
-
-        self.logger.info("-------------------------------------------------------")
-        self.logger.info(f"Ingestion completed successfully with {success_count} document(s).")
 
+        self.finish_ingestion(success_count)
 
+    def get_index_version(self) -> int:
+        return self.db_manager.get_index_version()
 
-    def _retrieve_nodes(self, query: str, top_k: int) -> List[NodeWithScore]:
+    def _get_cached_embedding(self, text: str, is_query: bool) -> List[float]:
+        # Query and text embeddings differ for instruction-tuned models (e.g. bge), so both are part of the key
+        normalized_text = " ".join(text.split())
+        cache_key = (RAGManager.embed_model.model_name, "query" if is_query else "text", normalized_text)
 
-        retriever = VectorIndexRetriever(index=self.vs_index, similarity_top_k=top_k)
-        retrieved_nodes = retriever.retrieve(QueryBundle(query_str=query))
+        embedding = RAGManager.embedding_cache.get(cache_key)
+        if embedding is None:
+            # Embed exactly the text of the key, so inputs sharing an entry also share their embedding
+            if is_query:
+                embedding = RAGManager.embed_model.get_query_embedding(normalized_text)
+            else:
+                embedding = RAGManager.embed_model.get_text_embedding(normalized_text)
+            RAGManager.embedding_cache.put(cache_key, embedding)
+        return embedding
+
+    def get_query_embedding(self, query: str) -> List[float]:
+        return self._get_cached_embedding(query, is_query=True)
+
+    def get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        # Cache hits are served as usual, all misses go through the model in a single encode call
+        model_name = RAGManager.embed_model.model_name
+        cache_keys = [(model_name, "query", " ".join(query.split())) for query in queries]
+        embeddings = [RAGManager.embedding_cache.get(cache_key) for cache_key in cache_keys]
+
+        missing = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(cache_keys[i], []).append(i)
+        if not missing:
+            return embeddings
+
+        # Raw model, not the micro-batching wrapper: the misses already form one batch
+        embed_model = RAGManager.embedding_batcher.embed_model if RAGManager.embedding_batcher else RAGManager.embed_model
+        missing_embeddings = get_query_embedding_batch(embed_model, [cache_key[2] for cache_key in missing])
+
+        for (cache_key, positions), embedding in zip(missing.items(), missing_embeddings):
+            RAGManager.embedding_cache.put(cache_key, embedding)
+            for i in positions:
+                embeddings[i] = embedding
+        return embeddings
+
+    def get_text_embedding(self, text: str) -> List[float]:
+        return self._get_cached_embedding(text, is_query=False)
+
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        return RAGManager.embedding_cache.stats()
+
+    def get_embedding_batcher_stats(self) -> Dict[str, Any]:
+        if RAGManager.embedding_batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **RAGManager.embedding_batcher.stats()}
+
+    def _embed_query(self, query: str) -> QueryBundle:
+        query_embedding = self.get_query_embedding(query)
+        return QueryBundle(query_str=query, embedding=query_embedding)
+
+    async def _aembed_query(self, query: str) -> QueryBundle:
+        # The HuggingFace model has no real async path, run it on the embedding executor instead of the event loop
+        loop = asyncio.get_running_loop()
+        query_embedding = await loop.run_in_executor(RAGManager.embedding_executor, self.get_query_embedding, query)
+        return QueryBundle(query_str=query, embedding=query_embedding)
+
+    def _use_ann_index(self, query_mode: VectorStoreQueryMode, filters: Dict[str, List[str]] = None) -> bool:
+        # The in-process index has no metadata, filtered queries always go to PostgreSQL
+        ann_index = self.vector_store_manager.ann_index
+        if query_mode != VectorStoreQueryMode.DEFAULT or ann_index is None or filters:
+            return False
+        # Refreshed in the background (InProcessVectorIndex.start_background_refresh), never here
+        return ann_index.is_ready()
+
+    def _search_ann_index(self, query_bundle: QueryBundle, top_k: int) -> List[NodeWithScore]:
+        try:
+            return self.vector_store_manager.ann_index.search(query_bundle.embedding, top_k)
+        except Exception as e:
+            self.logger.error(f"In-process ANN search failed, falling back to PostgreSQL. Exception occurred: {e}")
+            return None
+
+    def _search_vectors(self, query_bundle: QueryBundle, top_k: int, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        # Dense queries run our own SQL: SET LOCAL hnsw.ef_search inside the query's transaction (PGVectorStore issues
+        # a session-level SET that stays on the pooled connection), compact vector storage, iterative filtered scans
+        return self.vector_store_manager.batch_vector_search([query_bundle.embedding], top_k, filters, ef_search=ef_search)[0]
+
+    async def _asearch_vectors(self, query_bundle: QueryBundle, top_k: int, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        # Same SQL as _search_vectors on the asyncpg engine, awaited on the event loop
+        return (await self.vector_store_manager.abatch_vector_search([query_bundle.embedding], top_k, filters, ef_search=ef_search))[0]
+
+    def _move_stored_embeddings(self, retrieved_nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        # Move the stored chunk vector (selected alongside the row, see VectorStoreManager) onto the node
+        for node in retrieved_nodes:
+            custom_fields = node.node.metadata.pop("custom_fields", None) or {}
+            embedding = custom_fields.get("embedding")
+            if embedding is not None:
+                node.node.embedding = np.asarray(embedding, dtype=float).tolist()
         return retrieved_nodes
 
-    def _rerank_results(self, query: str, nodes: List[NodeWithScore], top_k: int) -> List[NodeWithScore]:
-
-        query_emb = np.array(RAGManager.embed_model.get_text_embedding(query))
-        node_texts = [node.node.text for node in nodes]
-        node_embs = np.array([RAGManager.embed_model.get_text_embedding(node_text) for node_text in node_texts])
-        # node_embs = np.array(RAGManager.embed_model.get_text_embeddings(node_texts))
-
-        # Normalize embeddings
-        query_emb_norm = query_emb / np.linalg.norm(query_emb)
-        node_embs_norm = node_embs / np.linalg.norm(node_embs, axis=1, keepdims=True)
+    def _create_retriever(self, top_k: int, query_mode: VectorStoreQueryMode, filters: Dict[str, List[str]] = None) -> VectorIndexRetriever:
+        # Full-text search only (dense queries use _search_vectors), metadata filters become WHERE predicates
+        return VectorIndexRetriever(
+            index=self.vs_index,
+            similarity_top_k=top_k,
+            vector_store_query_mode=query_mode,
+            sparse_top_k=top_k,
+            filters=build_metadata_filters(filters),
+        )
 
-        # Cosine similarities
-        similarities = np.dot(node_embs_norm, query_emb_norm)
+    def _get_retriever(self, top_k: int, query_mode: VectorStoreQueryMode, filters: Dict[str, List[str]] = None) -> VectorIndexRetriever:
+        # Retrievers keep no per-query state, so one per (top_k, mode) serves every thread.
+        # Filters are fixed at construction and vary per request, filtered retrievers are built per call.
+        if filters:
+            return self._create_retriever(top_k, query_mode, filters)
+        retriever_key = (top_k, query_mode)
+        retriever = self._retrievers.get(retriever_key)
+        if retriever is None:
+            with self._shared_objects_lock:
+                retriever = self._retrievers.get(retriever_key)
+                if retriever is None:
+                    retriever = self._create_retriever(top_k, query_mode)
+                    self._retrievers[retriever_key] = retriever
+        return retriever
+
+    def _run_retriever(self, query_bundle: QueryBundle, top_k: int, query_mode: VectorStoreQueryMode = VectorStoreQueryMode.DEFAULT, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        if self._use_ann_index(query_mode, filters):
+            ann_nodes = self._search_ann_index(query_bundle, top_k)
+            if ann_nodes is not None:
+                return ann_nodes
+
+        if query_mode == VectorStoreQueryMode.DEFAULT:
+            return self._search_vectors(query_bundle, top_k, filters, ef_search)
+
+        retriever = self._get_retriever(top_k, query_mode, filters)
+        return self._move_stored_embeddings(retriever.retrieve(query_bundle))
+
+    async def _arun_retriever(self, query_bundle: QueryBundle, top_k: int, query_mode: VectorStoreQueryMode = VectorStoreQueryMode.DEFAULT, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        if self._use_ann_index(query_mode, filters):
+            ann_nodes = self._search_ann_index(query_bundle, top_k)
+            if ann_nodes is not None:
+                return ann_nodes
+
+        if query_mode == VectorStoreQueryMode.DEFAULT:
+            return await self._asearch_vectors(query_bundle, top_k, filters, ef_search)
+
+        # PGVectorStore runs aretrieve on its asyncpg engine
+        retriever = self._get_retriever(top_k, query_mode, filters)
+        return self._move_stored_embeddings(await retriever.aretrieve(query_bundle))
+
+    def _retrieve_nodes(self, query_bundle: QueryBundle, top_k: int, retrieval_mode: str = RETRIEVAL_MODE_VECTOR, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        if retrieval_mode == RETRIEVAL_MODE_HYBRID:
+            dense_nodes = self._run_retriever(query_bundle, top_k, VectorStoreQueryMode.DEFAULT, filters, ef_search)
+            try:
+                lexical_nodes = self._run_retriever(query_bundle, top_k, VectorStoreQueryMode.TEXT_SEARCH, filters)
+            except Exception as e:
+                self.logger.error(f"Full-text search failed, using vector results only. Exception occurred: {e}")
+                lexical_nodes = []
+            return _reciprocal_rank_fusion([dense_nodes, lexical_nodes], top_k=top_k)
+
+        return self._run_retriever(query_bundle, top_k, VectorStoreQueryMode.DEFAULT, filters, ef_search)
+
+    async def _aretrieve_nodes(self, query_bundle: QueryBundle, top_k: int, retrieval_mode: str = RETRIEVAL_MODE_VECTOR, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[NodeWithScore]:
+        if retrieval_mode == RETRIEVAL_MODE_HYBRID:
+            dense_nodes, lexical_nodes = await asyncio.gather(
+                self._arun_retriever(query_bundle, top_k, VectorStoreQueryMode.DEFAULT, filters, ef_search),
+                self._arun_retriever(query_bundle, top_k, VectorStoreQueryMode.TEXT_SEARCH, filters),
+                return_exceptions=True,
+            )
+            if isinstance(dense_nodes, Exception):
+                raise dense_nodes
+            if isinstance(lexical_nodes, Exception):
+                self.logger.error(f"Full-text search failed, using vector results only. Exception occurred: {lexical_nodes}")
+                lexical_nodes = []
+            return _reciprocal_rank_fusion([dense_nodes, lexical_nodes], top_k=top_k)
+
+        return await self._arun_retriever(query_bundle, top_k, VectorStoreQueryMode.DEFAULT, filters, ef_search)
+
+    def _has_stored_embeddings(self, nodes: List[NodeWithScore]) -> bool:
+        return self.rerank_mode == RERANK_MODE_STORED and all(node.node.embedding is not None for node in nodes)
+
+    def _rerank_results(self, query_bundle: QueryBundle, nodes: List[NodeWithScore], top_k: int) -> List[NodeWithScore]:
+        if not nodes:
+            return []
+
+        if self._has_stored_embeddings(nodes):
+            query_emb = query_bundle.embedding
+            node_embs = [node.node.embedding for node in nodes]
+        else:
+            if self.rerank_mode == RERANK_MODE_STORED:
+                self.logger.warning("Stored chunk embeddings not available, falling back to re-embedding for rerank.")
+            query_emb = self.get_text_embedding(query_bundle.query_str)
+            node_texts = [node.node.text for node in nodes]
+            node_embs = [self.get_text_embedding(node_text) for node_text in node_texts]
+            # node_embs = RAGManager.embed_model.get_text_embeddings(node_texts)
+
+        similarities = _cosine_similarities(query_emb, node_embs)
 
         # Attach similarity as score, sort, return top_k
         for node, sim in zip(nodes, similarities):
             node.score = float(sim)
+        if self.mmr_enabled:
+            # Overlapping chunks are often near-copies, pick a diverse top_k instead of the k most similar
+            selected = _mmr_select(similarities, node_embs, top_k, self.mmr_lambda, self.mmr_duplicate_threshold)
+            return [nodes[i] for i in selected]
         reranked_nodes = sorted(nodes, key=lambda x: x.score or 0, reverse=True)[:top_k]
         return reranked_nodes
 
-    def query_context_retrieval(self, query: str, retrieve_top_k:int=None, rerank_top_k:int=None) -> Tuple[str, List[Dict[str, Any]], List[str], List[Any]]:
+    async def _arerank_results(self, query_bundle: QueryBundle, nodes: List[NodeWithScore], top_k: int) -> List[NodeWithScore]:
+        if self._has_stored_embeddings(nodes):
+            return self._rerank_results(query_bundle, nodes, top_k)
+        # Re-embedding is CPU bound, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(RAGManager.embedding_executor, self._rerank_results, query_bundle, nodes, top_k)
+
+    def _expand_to_sections(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        # Replace every matched chunk by its parent section text, in rank order, once per section.
+        # Chunks indexed without a section, or whose section is too long, are kept as they are.
+        if not self.section_retrieval_enabled or not nodes:
+            return nodes
+
+        def section_key(node):
+            metadata = node.node.metadata
+            if metadata.get("section_id") is None or metadata.get("doc_id") is None:
+                return None
+            return (str(metadata["doc_id"]), int(metadata["section_id"]))
+
+        keys = [section_key(node) for node in nodes]
+        section_texts = self.db_manager.get_document_sections(list({key for key in keys if key is not None}))
+
+        expanded_nodes, seen_keys = [], set()
+        for node, key in zip(nodes, keys):
+            section_text = section_texts.get(key)
+            if section_text is None or len(section_text) > self.section_max_chars:
+                expanded_nodes.append(node)
+                continue
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            section_node = TextNode(id_=node.node.node_id, text=section_text, metadata=dict(node.node.metadata), embedding=node.node.embedding)
+            expanded_nodes.append(NodeWithScore(node=section_node, score=node.score))
+        return expanded_nodes
+
+    def _resolve_retrieval_args(self, retrieve_top_k: int, rerank_top_k: int, retrieval_mode: str, filters: Dict[str, Any] = None, ef_search: int = None) -> Tuple[int, int, str, Dict[str, List[str]], int]:
+        self._ensure_embedding_model_matches()
         if not retrieve_top_k or retrieve_top_k == 0:
             retrieve_top_k = self.config['top_k_retrieval']
         if not rerank_top_k or rerank_top_k == 0:
             rerank_top_k = self.config['top_k_rerank']
-
-        retrieved_nodes = self._retrieve_nodes(query, top_k=retrieve_top_k)
-        reranked_nodes = self._rerank_results(query, retrieved_nodes, top_k=rerank_top_k)
-
+        if not retrieval_mode:
+            retrieval_mode = self.retrieval_mode
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}', expected one of {RETRIEVAL_MODES}")
+        if self.context_packer is not None:
+            # The token budget decides how many chunks make it into the context, rerank keeps every candidate
+            rerank_top_k = retrieve_top_k
+        return int(retrieve_top_k), int(rerank_top_k), retrieval_mode, normalize_metadata_filters(filters), self.vector_store_manager.resolve_ef_search(ef_search)
+
+    def _build_context(self, reranked_nodes: List[NodeWithScore], retrieved_nodes: List[NodeWithScore]) -> Tuple[str, List[Dict[str, Any]], List[str], List[Any]]:
+        token_counts = [None] * len(reranked_nodes)
+        if self.context_packer is not None:
+            reranked_nodes, token_counts = self.context_packer.pack(
+                reranked_nodes,
+                lambda position, node: CONTEXT_SEPARATOR.join(_format_context_block(position, node)) + CONTEXT_SEPARATOR,
+            )
         observability_set_contexts(reranked_nodes)
 
         context_parts, sources, context_used = [], [], []
-        for i, node in enumerate(reranked_nodes):
-            context_parts.append(
-                f"[Source {i + 1} - {node.node.metadata.get('filename', 'Unknown')}]"
-            )
-            context_parts.append(f"Section: {node.node.metadata.get('title', 'N/A')}")
-            context_parts.append(node.node.text)
-            context_parts.append("")
-
-            sources.append(
-                {
-                    "file_name": node.node.metadata.get("filename"),
-                    "section": node.node.metadata.get("title"),
-                    "score": node.score,
-                    "text": node.node.text,
-                }
-            )
+        for i, (node, num_tokens) in enumerate(zip(reranked_nodes, token_counts)):
+            context_parts.extend(_format_context_block(i + 1, node))
+
+            source = {
+                "file_name": node.node.metadata.get("filename"),
+                "section": node.node.metadata.get("section", node.node.metadata.get("title")),
+                "score": node.score,
+                "text": node.node.text,
+            }
+            if num_tokens is not None:
+                source["tokens"] = num_tokens
+            sources.append(source)
             context_used.append(node.node.text)
 
-        return "\\n".join(context_parts), sources, context_used, retrieved_nodes
\ No newline at end of file
+        return CONTEXT_SEPARATOR.join(context_parts), sources, context_used, retrieved_nodes
+
+    def _retrieval_cache_key(self, query_bundle: QueryBundle, retrieve_top_k: int, rerank_top_k: int, retrieval_mode: str, filters: Dict[str, List[str]], ef_search: int) -> Tuple:
+        if RAGManager.retrieval_cache is None:
+            return None
+        # The index version is bumped by every ingestion and reset, results from an older corpus are never matched
+        embedding_hash = hashlib.sha1(np.asarray(query_bundle.embedding, dtype=np.float32).tobytes()).hexdigest()
+        return (embedding_hash, retrieve_top_k, rerank_top_k, retrieval_mode, json.dumps(filters, sort_keys=True), ef_search, self.get_index_version())
+
+    def _get_cached_retrieval(self, cache_key: Tuple) -> Tuple[List[NodeWithScore], List[NodeWithScore]]:
+        if cache_key is None:
+            return None
+        return RAGManager.retrieval_cache.get(cache_key)
+
+    def _put_cached_retrieval(self, cache_key: Tuple, reranked_nodes: List[NodeWithScore], retrieved_nodes: List[NodeWithScore]):
+        if cache_key is not None:
+            RAGManager.retrieval_cache.put(cache_key, (reranked_nodes, retrieved_nodes))
+
+    def get_retrieval_cache_stats(self) -> Dict[str, Any]:
+        if RAGManager.retrieval_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **RAGManager.retrieval_cache.stats()}
+
+    def query_context_retrieval(self, query: str, retrieve_top_k:int=None, rerank_top_k:int=None, retrieval_mode:str=None, filters:Dict[str, Any]=None, ef_search:int=None) -> Tuple[str, List[Dict[str, Any]], List[str], List[Any]]:
+        retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search = self._resolve_retrieval_args(retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search)
+
+        query_bundle = self._embed_query(query)
+        cache_key = self._retrieval_cache_key(query_bundle, retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search)
+        cached = self._get_cached_retrieval(cache_key)
+        if cached is not None:
+            return self._build_context(*cached)
+
+        retrieved_nodes = self._retrieve_nodes(query_bundle, top_k=retrieve_top_k, retrieval_mode=retrieval_mode, filters=filters, ef_search=ef_search)
+        reranked_nodes = self._expand_to_sections(self._rerank_results(query_bundle, retrieved_nodes, top_k=rerank_top_k))
+        self._put_cached_retrieval(cache_key, reranked_nodes, retrieved_nodes)
+
+        return self._build_context(reranked_nodes, retrieved_nodes)
+
+    def _batch_retrieve_nodes(self, query_bundles: List[QueryBundle], top_k: int, retrieval_mode: str, filters: Dict[str, List[str]] = None, ef_search: int = None) -> List[List[NodeWithScore]]:
+        if self._use_ann_index(VectorStoreQueryMode.DEFAULT, filters):
+            dense_results = [self._search_ann_index(query_bundle, top_k) for query_bundle in query_bundles]
+        else:
+            dense_results = [None] * len(query_bundles)
+
+        pending = [i for i, nodes in enumerate(dense_results) if nodes is None]
+        if pending:
+            pending_results = self.vector_store_manager.batch_vector_search([query_bundles[i].embedding for i in pending], top_k, filters, ef_search=ef_search)
+            for i, nodes in zip(pending, pending_results):
+                dense_results[i] = nodes
+
+        if retrieval_mode != RETRIEVAL_MODE_HYBRID:
+            return dense_results
+
+        try:
+            lexical_results = self.vector_store_manager.batch_text_search([query_bundle.query_str for query_bundle in query_bundles], top_k, filters)
+        except Exception as e:
+            self.logger.error(f"Full-text search failed, using vector results only. Exception occurred: {e}")
+            lexical_results = [[] for _ in query_bundles]
+        return [_reciprocal_rank_fusion([dense_nodes, lexical_nodes], top_k=top_k) for dense_nodes, lexical_nodes in zip(dense_results, lexical_results)]
+
+    def query_context_retrieval_batch(self, queries: List[str], retrieve_top_k:int=None, rerank_top_k:int=None, retrieval_mode:str=None, filters:Dict[str, Any]=None, ef_search:int=None) -> List[Tuple[str, List[Dict[str, Any]], List[str], List[Any]]]:
+        if not queries:
+            return []
+        retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search = self._resolve_retrieval_args(retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search)
+
+        query_embeddings = self.get_query_embeddings(queries)
+        query_bundles = [QueryBundle(query_str=query, embedding=embedding) for query, embedding in zip(queries, query_embeddings)]
+        cache_keys = [self._retrieval_cache_key(query_bundle, retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search) for query_bundle in query_bundles]
+        cached_results = [self._get_cached_retrieval(cache_key) for cache_key in cache_keys]
+
+        # Only the cache misses go to the database
+        pending = [i for i, cached in enumerate(cached_results) if cached is None]
+        if pending:
+            retrieved_results = self._batch_retrieve_nodes([query_bundles[i] for i in pending], top_k=retrieve_top_k, retrieval_mode=retrieval_mode, filters=filters, ef_search=ef_search)
+            for i, retrieved_nodes in zip(pending, retrieved_results):
+                reranked_nodes = self._expand_to_sections(self._rerank_results(query_bundles[i], retrieved_nodes, top_k=rerank_top_k))
+                self._put_cached_retrieval(cache_keys[i], reranked_nodes, retrieved_nodes)
+                cached_results[i] = (reranked_nodes, retrieved_nodes)
+
+        return [self._build_context(reranked_nodes, retrieved_nodes) for reranked_nodes, retrieved_nodes in cached_results]
+
+    async def aquery_context_retrieval(self, query: str, retrieve_top_k:int=None, rerank_top_k:int=None, retrieval_mode:str=None, filters:Dict[str, Any]=None, ef_search:int=None) -> Tuple[str, List[Dict[str, Any]], List[str], List[Any]]:
+        retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search = self._resolve_retrieval_args(retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search)
+
+        query_bundle = await self._aembed_query(query)
+        loop = asyncio.get_running_loop()
+        # Reading the index version is a blocking database call
+        cache_key = await loop.run_in_executor(None, self._retrieval_cache_key, query_bundle, retrieve_top_k, rerank_top_k, retrieval_mode, filters, ef_search)
+        cached = self._get_cached_retrieval(cache_key)
+        if cached is not None:
+            return self._build_context(*cached)
+
+        retrieved_nodes = await self._aretrieve_nodes(query_bundle, top_k=retrieve_top_k, retrieval_mode=retrieval_mode, filters=filters, ef_search=ef_search)
+        reranked_nodes = await self._arerank_results(query_bundle, retrieved_nodes, top_k=rerank_top_k)
+        if self.section_retrieval_enabled:
+            # Reading the section texts is a blocking database call
+            reranked_nodes = await loop.run_in_executor(None, self._expand_to_sections, reranked_nodes)
+        self._put_cached_retrieval(cache_key, reranked_nodes, retrieved_nodes)
+
+        return self._build_context(reranked_nodes, retrieved_nodes)
@@ -10,21 +10,154 @@
 # Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
 # =============================================================================
 
+import re
+import io
+import json
+import time
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
 from llama_index.vector_stores.postgres import PGVectorStore
 from llama_index.core import VectorStoreIndex
 from llama_index.core import StorageContext
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from system.setup import get_config_logger
-from models.database import TABLE_NAME_EMBEDDING
+from llama_index.core.schema import NodeWithScore, BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from llama_index.core.vector_stores.types import MetadataFilters, MetadataFilter, FilterOperator, FilterCondition
+from services.ann_index import InProcessVectorIndex, row_to_node
+from services.embeddings import get_embedding_dimension, is_matryoshka_model, MATRYOSHKA_EMBEDDING_MODELS
+from models.database import TABLE_NAME_EMBEDDING, TABLE_NAME_EMBEDDING_DATA, ADD_TEXT_SEARCH_COLUMN_QUERY, CREATE_TEXT_SEARCH_INDEX_QUERY
+from models.database import BATCH_VECTOR_SEARCH_QUERY, BATCH_TEXT_SEARCH_QUERY, CREATE_METADATA_FILTER_INDEX_QUERY
+from models.database import BATCH_RESCORED_VECTOR_SEARCH_QUERY, HALFVEC_FIRST_PASS_DISTANCE, BINARY_FIRST_PASS_DISTANCE, REDUCED_FIRST_PASS_DISTANCE
+from models.database import INDEX_NAME_EMBEDDING_FLOAT32, INDEX_NAME_EMBEDDING_HALFVEC, INDEX_NAME_EMBEDDING_BINARY, INDEX_NAME_EMBEDDING_REDUCED
+from models.database import CREATE_FLOAT32_EMBEDDING_INDEX_QUERY, CREATE_HALFVEC_EMBEDDING_INDEX_QUERY, CREATE_BINARY_EMBEDDING_INDEX_QUERY, CREATE_REDUCED_EMBEDDING_INDEX_QUERY
+from models.database import DROP_INDEX_QUERY, INDEX_SIZE_QUERY, INDEX_DEFINITION_QUERY, RESTORE_CHUNK_DOC_ID_QUERY, PGVECTOR_VERSION_QUERY
+from models.database import COUNT_EMBEDDING_ROWS_QUERY
+from models.database import DELETE_DOCUMENT_CHUNKS_QUERY, INSERT_EMBEDDING_QUERY, COPY_EMBEDDING_QUERY, UPDATE_DOCUMENT_INDEXED_QUERY
+from models.database import EMBEDDING_COLUMN_DIMENSION_QUERY, EMBEDDING_TABLE_HAS_ROWS_QUERY, DROP_EMBEDDING_TABLE_QUERY
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+HNSW_MAX_EF_SEARCH = 1000  # pgvector upper bound for hnsw.ef_search
+PGVECTOR_ITERATIVE_SCAN_VERSION = (0, 8, 0)  # first pgvector release with hnsw.iterative_scan
+
+# === Vector storage modes ===
+VECTOR_STORAGE_FLOAT32 = "float32"  # HNSW over the full-precision vectors (original behaviour)
+VECTOR_STORAGE_HALFVEC = "halfvec"  # HNSW over embedding::halfvec (half the index size, the table keeps float32), candidates re-scored in float32
+VECTOR_STORAGE_BINARY = "binary"    # HNSW over binary_quantize(embedding) (1 bit per dimension in the index only), candidates re-scored in float32
+VECTOR_STORAGE_REDUCED = "reduced"  # HNSW over the first vector_reduced_dim dimensions (Matryoshka-style), candidates re-scored in float32
+VECTOR_STORAGE_MODES = [VECTOR_STORAGE_FLOAT32, VECTOR_STORAGE_HALFVEC, VECTOR_STORAGE_BINARY, VECTOR_STORAGE_REDUCED]
+
+# index name, index DDL and first-pass distance per storage mode
+VECTOR_STORAGE_INDEXES = {
+    VECTOR_STORAGE_FLOAT32: (INDEX_NAME_EMBEDDING_FLOAT32, CREATE_FLOAT32_EMBEDDING_INDEX_QUERY, None),
+    VECTOR_STORAGE_HALFVEC: (INDEX_NAME_EMBEDDING_HALFVEC, CREATE_HALFVEC_EMBEDDING_INDEX_QUERY, HALFVEC_FIRST_PASS_DISTANCE),
+    VECTOR_STORAGE_BINARY: (INDEX_NAME_EMBEDDING_BINARY, CREATE_BINARY_EMBEDDING_INDEX_QUERY, BINARY_FIRST_PASS_DISTANCE),
+    VECTOR_STORAGE_REDUCED: (INDEX_NAME_EMBEDDING_REDUCED, CREATE_REDUCED_EMBEDDING_INDEX_QUERY, REDUCED_FIRST_PASS_DISTANCE),
+}
+
+# top_k * factor first-pass candidates re-scored per compact mode when vector_rescore_factor is 0,
+# binary codes rank coarsely and need the wider candidate set to keep recall
+VECTOR_STORAGE_RESCORE_FACTORS = {
+    VECTOR_STORAGE_HALFVEC: 4,
+    VECTOR_STORAGE_BINARY: 10,
+    VECTOR_STORAGE_REDUCED: 4,
+}
+
+# Chunk metadata keys retrieval can be scoped by (set in RAGManager._create_document_from_processed / _chunk_document)
+METADATA_FILTER_KEYS = ["doc_id", "filename", "title", "chunk_id"]
+
+
+def normalize_metadata_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+    # {"doc_id": "a"} / {"doc_id": ["a", "b"]} -> {"doc_id": ["a"]} / {"doc_id": ["a", "b"]}, keys must be known
+    normalized = {}
+    for key, values in (filters or {}).items():
+        if key not in METADATA_FILTER_KEYS:
+            raise ValueError(f"Unknown metadata filter '{key}', expected one of {METADATA_FILTER_KEYS}")
+        if values is None:
+            continue
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        normalized[key] = sorted(str(value) for value in values)
+    return normalized
+
+
+def build_metadata_filters(filters: Dict[str, List[str]]) -> Optional[MetadataFilters]:
+    # PGVectorStore inlines filter values into its WHERE clause, so quotes are escaped here.
+    # IN keeps the predicate as metadata_->>'key' (no float cast), which is what the btree indexes cover.
+    if not filters:
+        return None
+    return MetadataFilters(
+        filters=[
+            MetadataFilter(key=key, value=[value.replace("'", "''") for value in values], operator=FilterOperator.IN)
+            for key, values in filters.items()
+        ],
+        condition=FilterCondition.AND,
+    )
+
+
+def _vector_literal(embedding) -> str:
+    return "[" + ",".join(str(float(x)) for x in np.asarray(embedding).ravel()) + "]"
+
+
+def _copy_field(value: str) -> str:
+    # Escapes for COPY's text format, backslash first
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _select_embedding_column(stmt, table_class, **kwargs):
+    # Return each chunk's stored vector with its row, it lands in node.metadata["custom_fields"]
+    return stmt.add_columns(table_class.embedding)
+
 
 class VectorStoreManager:
     def __init__(self):
         self.config, self.logger = get_config_logger()
         self.vector_store = None
         self.index = None
+        self.engine = None
+        self.async_engine = None
+        self.ann_index = None
+        self.return_embeddings = False
+        self.text_search_config = self.config.get('text_search_config', 'english')
+        self.vector_storage = self.config.get('vector_storage', VECTOR_STORAGE_FLOAT32)
+        self.rescore_factor = int(self.config.get('vector_rescore_factor', 0))  # 0: VECTOR_STORAGE_RESCORE_FACTORS
+        self.embed_dim = get_embedding_dimension()
+        self.reduced_dim = int(self.config.get('vector_reduced_dim', 256))
+        self.hnsw_m = int(self.config.get('hnsw_m', HNSW_M))
+        self.hnsw_ef_construction = int(self.config.get('hnsw_ef_construction', HNSW_EF_CONSTRUCTION))
+        self.ef_search = self.resolve_ef_search(self.config.get('hnsw_ef_search', HNSW_EF_SEARCH))
+        self.bulk_load_maintenance_work_mem = str(self.config.get('bulk_load_maintenance_work_mem', '1GB'))
+        self.bulk_load_parallel_workers = int(self.config.get('bulk_load_parallel_workers', 2))
+        self.bulk_load_max_existing_chunks = int(self.config.get('bulk_load_max_existing_chunks', 0))
+        self.bulk_load_stats = None  # set between begin_bulk_load and finish_bulk_load
+        self._supports_iterative_scan = None  # checked on the first filtered vector search
+        if self.vector_storage not in VECTOR_STORAGE_MODES:
+            raise ValueError(f"Unknown vector storage '{self.vector_storage}', expected one of {VECTOR_STORAGE_MODES}")
+        if self.vector_storage == VECTOR_STORAGE_REDUCED and not is_matryoshka_model():
+            raise ValueError(f"Vector storage '{VECTOR_STORAGE_REDUCED}' needs a Matryoshka-trained embedding model, one of {sorted(MATRYOSHKA_EMBEDDING_MODELS)}")
+        if self.vector_storage == VECTOR_STORAGE_REDUCED and not 0 < self.reduced_dim < self.embed_dim:
+            raise ValueError(f"vector_reduced_dim must be between 1 and {self.embed_dim - 1}, got {self.reduced_dim}")
+
+    def get_engine(self):
+        # Long-lived pooled engine for the SQL that PGVectorStore does not expose
+        if self.engine is None:
+            self.engine = create_engine(self.config['postgresql_conn_str'], pool_pre_ping=True)
+        return self.engine
 
-    def create_vector_store(self):
+    def get_async_engine(self):
+        # asyncpg twin of get_engine for the async retrieval path, bound to the event loop that first uses it
+        if self.async_engine is None:
+            conn_str = self.config['postgresql_conn_str'].replace("postgresql://", "postgresql+asyncpg://", 1)
+            self.async_engine = create_async_engine(conn_str, pool_pre_ping=True)
+        return self.async_engine
+
+    def create_vector_store(self, return_embeddings: bool = False):
         self.vector_store = None
+        self.return_embeddings = return_embeddings
         try:
             self.vector_store = PGVectorStore.from_params(
                 database=self.config['postgresql_db'],
@@ -33,19 +166,121 @@ class VectorStoreManager:
                 port=int(self.config['postgresql_port']),
                 user=self.config['postgresql_user'],
                 table_name=TABLE_NAME_EMBEDDING,
+                hybrid_search=True,
+                text_search_config=self.text_search_config,
                 # embed_dim=1536, 
-                embed_dim=1024,
+                embed_dim=self.embed_dim,
+                # PGVectorStore (re)creates its float32 HNSW index on start-up, the compact modes manage their own index
                 hnsw_kwargs={
-                    "hnsw_m": 16, # The number of bi-directional connections created for each node in the graph
-                    "hnsw_ef_construction": 64, # how many neighbors are considered when inserting a new node.
-                    "hnsw_ef_search": 40, # how many candidates are considered in the graph during a query
-                }
+                    "hnsw_m": self.hnsw_m, # The number of bi-directional connections created for each node in the graph
+                    "hnsw_ef_construction": self.hnsw_ef_construction, # how many neighbors are considered when inserting a new node.
+                    "hnsw_ef_search": self.ef_search, # how many candidates are considered in the graph during a query (dense queries SET LOCAL it per request, see batch_vector_search)
+                } if self.vector_storage == VECTOR_STORAGE_FLOAT32 else None,
+                customize_query_fn=_select_embedding_column if return_embeddings else None,
             )
             self.logger.info("Vector store created successfully.")
+            self.ensure_indexes()
         except Exception as e:
             self.logger.error(f"Failed to create vector store: {e}")
         return self.vector_store
 
+    def ensure_indexes(self):
+        # The table only exists after the first ingestion, so this runs at start-up and after every ingestion
+        self.ensure_text_search_index()
+        self.ensure_metadata_filter_indexes()
+        self.ensure_vector_storage_index()
+
+    def ensure_text_search_index(self):
+        # Tables created before hybrid retrieval have no tsvector column, add it (and its GIN index) in place
+        try:
+            with self.get_engine().begin() as connection:
+                if connection.execute(text(f"SELECT to_regclass('{TABLE_NAME_EMBEDDING_DATA}')")).scalar() is None:
+                    return False
+                connection.execute(text(ADD_TEXT_SEARCH_COLUMN_QUERY.replace("[TEXT_SEARCH_CONFIG]", self.text_search_config).strip()))
+                connection.execute(text(CREATE_TEXT_SEARCH_INDEX_QUERY.strip()))
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to create full-text search index: {e}")
+            return False
+
+    def ensure_metadata_filter_indexes(self):
+        # Not PGVectorStore's indexed_metadata_keys: those index a varchar cast the filter predicates never match
+        try:
+            with self.get_engine().begin() as connection:
+                if connection.execute(text(f"SELECT to_regclass('{TABLE_NAME_EMBEDDING_DATA}')")).scalar() is None:
+                    return False
+                restored = connection.execute(text(RESTORE_CHUNK_DOC_ID_QUERY.strip())).rowcount
+                if restored:
+                    self.logger.info(f"Restored the document id of {restored} chunk(s) indexed with the LlamaIndex ref_doc_id.")
+                for key in METADATA_FILTER_KEYS:
+                    connection.execute(text(CREATE_METADATA_FILTER_INDEX_QUERY.replace("[METADATA_KEY]", key).strip()))
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to create metadata filter indexes: {e}")
+            return False
+
+    def ensure_vector_storage_index(self, vector_storage: str = None, build_settings: Dict[str, str] = None) -> bool:
+        # Migration between storage modes: build the index of the configured mode, then drop the other modes' indexes
+        vector_storage = vector_storage or self.vector_storage
+        try:
+            with self.get_engine().begin() as connection:
+                if connection.execute(text(f"SELECT to_regclass('{TABLE_NAME_EMBEDDING_DATA}')")).scalar() is None:
+                    return False
+                for name, value in (build_settings or {}).items():
+                    connection.execute(text(f"SET LOCAL {name} = '{value}'"))
+                for mode, (index_name, create_index_query, _) in VECTOR_STORAGE_INDEXES.items():
+                    if mode == vector_storage:
+                        # The index name carries neither the build parameters nor the reduced dimension, rebuild it when they changed
+                        expected = [f"m='{self.hnsw_m}'", f"ef_construction='{self.hnsw_ef_construction}'"]
+                        if mode == VECTOR_STORAGE_REDUCED:
+                            expected.append(f"vector({self.reduced_dim})")
+                        index_definition = connection.execute(text(INDEX_DEFINITION_QUERY.replace("[INDEX_NAME]", index_name).strip())).scalar()
+                        if index_definition is not None and not all(fragment in index_definition for fragment in expected):
+                            connection.execute(text(DROP_INDEX_QUERY.replace("[INDEX_NAME]", index_name).strip()))
+                        self.logger.info(f"Ensuring {mode} HNSW index {index_name}, this can take a while on large tables.")
+                        query = self._fill_dimensions(create_index_query).replace("[HNSW_M]", str(self.hnsw_m))
+                        connection.execute(text(query.replace("[HNSW_EF_CONSTRUCTION]", str(self.hnsw_ef_construction)).strip()))
+                for mode, (index_name, _, _) in VECTOR_STORAGE_INDEXES.items():
+                    if mode != vector_storage:
+                        connection.execute(text(DROP_INDEX_QUERY.replace("[INDEX_NAME]", index_name).strip()))
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to migrate vector storage to '{vector_storage}': {e}")
+            return False
+
+    def resolve_ef_search(self, ef_search: Optional[int] = None) -> int:
+        if ef_search is None:
+            return self.ef_search
+        ef_search = int(ef_search)
+        if not 1 <= ef_search <= HNSW_MAX_EF_SEARCH:
+            raise ValueError(f"ef_search must be between 1 and {HNSW_MAX_EF_SEARCH}, got {ef_search}")
+        return ef_search
+
+    def _fill_dimensions(self, query: str) -> str:
+        return query.replace("[EMBED_DIM]", str(self.embed_dim)).replace("[REDUCED_DIM]", str(self.reduced_dim))
+
+    def get_vector_index_size(self, vector_storage: str = None) -> int:
+        index_name = VECTOR_STORAGE_INDEXES[vector_storage or self.vector_storage][0]
+        with self.get_engine().connect() as connection:
+            return connection.execute(text(INDEX_SIZE_QUERY.replace("[INDEX_NAME]", index_name).strip())).scalar() or 0
+
+    def uses_rescoring(self) -> bool:
+        return self.vector_storage != VECTOR_STORAGE_FLOAT32
+
+    def get_embedding_table_state(self) -> Tuple[Optional[int], bool]:
+        # (dimension of the embedding column, whether it holds any chunk), (None, False) when there is no table yet
+        with self.get_engine().connect() as connection:
+            embed_dim = connection.execute(text(EMBEDDING_COLUMN_DIMENSION_QUERY.strip())).scalar()
+            if embed_dim is None:
+                return None, False
+            has_rows = connection.execute(text(EMBEDDING_TABLE_HAS_ROWS_QUERY.strip())).scalar()
+        return int(embed_dim), bool(has_rows)
+
+    def drop_embedding_table(self):
+        with self.get_engine().begin() as connection:
+            connection.execute(text(DROP_EMBEDDING_TABLE_QUERY.strip()))
+        self.logger.info(f"Dropped table {TABLE_NAME_EMBEDDING_DATA}.")
+
     def load_index(self):
         if not self.vector_store:
             self.create_vector_store()
@@ -56,8 +291,220 @@ class VectorStoreManager:
         except Exception as e:
             self.logger.error(f"Failed to load index: {e}")
 
+        if self.config.get('ann_index_enabled', False):
+            self.load_ann_index()
+
         return self.index
 
+    def load_ann_index(self):
+        self.ann_index = InProcessVectorIndex(
+            engine=self.get_engine(),
+            snapshot_dir=self.config.get('ann_index_snapshot_dir', 'data/ann_index'),
+            nprobe=int(self.config.get('ann_index_nprobe', 8)),
+            refresh_seconds=float(self.config.get('ann_index_refresh_seconds', 30)),
+        )
+        self.ann_index.load()
+        self.ann_index.start_background_refresh()
+        return self.ann_index
+
+    def refresh_ann_index(self):
+        if self.ann_index is not None:
+            self.ann_index.refresh()
+
+    def resolve_rescore_factor(self) -> int:
+        return self.rescore_factor or VECTOR_STORAGE_RESCORE_FACTORS.get(self.vector_storage, 1)
+
+    def _parse_iterative_scan_support(self, version: Optional[str]) -> bool:
+        version = tuple(int(part) for part in re.findall(r"\d+", version or "0")[:3])
+        self._supports_iterative_scan = version >= PGVECTOR_ITERATIVE_SCAN_VERSION
+        return self._supports_iterative_scan
+
+    def supports_iterative_scan(self) -> bool:
+        if self._supports_iterative_scan is None:
+            with self.get_engine().connect() as connection:
+                self._parse_iterative_scan_support(connection.execute(text(PGVECTOR_VERSION_QUERY.strip())).scalar())
+        return self._supports_iterative_scan
+
+    async def asupports_iterative_scan(self) -> bool:
+        if self._supports_iterative_scan is None:
+            async with self.get_async_engine().connect() as connection:
+                self._parse_iterative_scan_support((await connection.execute(text(PGVECTOR_VERSION_QUERY.strip()))).scalar())
+        return self._supports_iterative_scan
+
+    def _prepare_batch_query(self, query: str, params: Dict[str, Any], filters: Dict[str, List[str]] = None) -> str:
+        embedding_column = "e.embedding::real[]" if self.return_embeddings else "NULL::real[]"
+        # Filters are part of the same statement as the HNSW scan, values are bound parameters
+        filter_clause = ""
+        for key, values in (filters or {}).items():
+            filter_clause += f" AND e.metadata_->>'{key}' = ANY(CAST(:filter_{key} AS text[]))"
+            params[f"filter_{key}"] = values
+        return query.replace("[EMBEDDING_COLUMN]", embedding_column).replace("[FILTER_CLAUSE]", filter_clause).strip()
+
+    def _batch_query_settings(self, ef_search: int, exact: bool, filtered_vector_scan: bool, iterative_scan: bool) -> List[str]:
+        # Transaction-scoped, pooled connections never carry one request's setting into the next
+        settings = [f"SET LOCAL hnsw.ef_search = {self.resolve_ef_search(ef_search)}"]
+        if exact:
+            # No index scan means a sequential scan with an exact sort, the ground truth for recall measurements
+            settings.append("SET LOCAL enable_indexscan = off")
+        elif filtered_vector_scan:
+            # HNSW post-filters its ef_search candidates, a selective filter would leave fewer than top_k rows.
+            # pgvector >= 0.8 keeps scanning the graph until enough rows pass; older versions get an exact
+            # scan over the rows the btree filter indexes select.
+            settings.append("SET LOCAL hnsw.iterative_scan = relaxed_order" if iterative_scan else "SET LOCAL enable_indexscan = off")
+        return settings
+
+    def _rows_to_results(self, rows, num_queries: int) -> List[List[NodeWithScore]]:
+        results = [[] for _ in range(num_queries)]
+        for row in rows:
+            score = (1 - row.distance) if hasattr(row, "distance") else row.rank
+            results[row.query_index].append(row_to_node(row.node_id, row.text, row.metadata_, row.embedding, float(score)))
+        return results
+
+    def _batch_query(self, query: str, params: Dict[str, Any], num_queries: int, filters: Dict[str, List[str]] = None, ef_search: int = None, exact: bool = False, vector_scan: bool = False) -> List[List[NodeWithScore]]:
+        query = self._prepare_batch_query(query, params, filters)
+        filtered_vector_scan = vector_scan and bool(filters) and not exact
+        settings = self._batch_query_settings(ef_search, exact, filtered_vector_scan, filtered_vector_scan and self.supports_iterative_scan())
+        with self.get_engine().begin() as connection:
+            for setting in settings:
+                connection.execute(text(setting))
+            rows = connection.execute(text(query), params).all()
+        return self._rows_to_results(rows, num_queries)
+
+    async def _abatch_query(self, query: str, params: Dict[str, Any], num_queries: int, filters: Dict[str, List[str]] = None, ef_search: int = None, exact: bool = False, vector_scan: bool = False) -> List[List[NodeWithScore]]:
+        # Same statement and settings as _batch_query, on the asyncpg engine in one transaction
+        query = self._prepare_batch_query(query, params, filters)
+        filtered_vector_scan = vector_scan and bool(filters) and not exact
+        settings = self._batch_query_settings(ef_search, exact, filtered_vector_scan, filtered_vector_scan and await self.asupports_iterative_scan())
+        async with self.get_async_engine().connect() as connection:
+            async with connection.begin():
+                for setting in settings:
+                    await connection.execute(text(setting))
+                rows = (await connection.execute(text(query), params)).all()
+        return self._rows_to_results(rows, num_queries)
+
+    def _vector_search_query(self, query_embeddings: List[List[float]], top_k: int, ef_search: int = None, exact: bool = False) -> Tuple[str, Dict[str, Any], int]:
+        params = {
+            "query_indexes": list(range(len(query_embeddings))),
+            "query_vectors": [_vector_literal(embedding) for embedding in query_embeddings],
+            "top_k": int(top_k),
+        }
+        ef_search = self.resolve_ef_search(ef_search)
+        if exact or not self.uses_rescoring():
+            return BATCH_VECTOR_SEARCH_QUERY, params, ef_search
+
+        # An HNSW scan returns at most ef_search rows, so it has to cover the whole candidate set
+        num_candidates = min(int(top_k) * self.resolve_rescore_factor(), HNSW_MAX_EF_SEARCH)
+        params["num_candidates"] = num_candidates
+        first_pass_distance = self._fill_dimensions(VECTOR_STORAGE_INDEXES[self.vector_storage][2])
+        query = BATCH_RESCORED_VECTOR_SEARCH_QUERY.replace("[FIRST_PASS_DISTANCE]", first_pass_distance)
+        return query, params, max(ef_search, num_candidates)
+
+    def batch_vector_search(self, query_embeddings: List[List[float]], top_k: int, filters: Dict[str, List[str]] = None, ef_search: int = None, exact: bool = False) -> List[List[NodeWithScore]]:
+        query, params, ef_search = self._vector_search_query(query_embeddings, top_k, ef_search, exact)
+        return self._batch_query(query, params, len(query_embeddings), filters, ef_search=ef_search, exact=exact, vector_scan=True)
+
+    async def abatch_vector_search(self, query_embeddings: List[List[float]], top_k: int, filters: Dict[str, List[str]] = None, ef_search: int = None, exact: bool = False) -> List[List[NodeWithScore]]:
+        query, params, ef_search = self._vector_search_query(query_embeddings, top_k, ef_search, exact)
+        return await self._abatch_query(query, params, len(query_embeddings), filters, ef_search=ef_search, exact=exact, vector_scan=True)
+
+    def batch_text_search(self, query_texts: List[str], top_k: int, filters: Dict[str, List[str]] = None) -> List[List[NodeWithScore]]:
+        # Same tsquery preparation as PGVectorStore: drop punctuation, OR the remaining terms
+        ts_queries = [re.sub(r"(?!\b\.\b)\W+", " ", query_text).strip().replace(" ", "|") for query_text in query_texts]
+        params = {
+            "query_indexes": [i for i, ts_query in enumerate(ts_queries) if ts_query],
+            "query_texts": [ts_query for ts_query in ts_queries if ts_query],
+            "text_search_config": self.text_search_config,
+            "top_k": int(top_k),
+        }
+        return self._batch_query(BATCH_TEXT_SEARCH_QUERY, params, len(query_texts), filters)
+
+    def _node_to_row(self, node: BaseNode) -> Dict[str, Any]:
+        # Same row PGVectorStore.add writes, except that the top-level doc_id keeps our document id
+        # (node_to_metadata_dict overwrites it with the LlamaIndex ref_doc_id) so doc_id filters match
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+        if node.metadata.get("doc_id") is not None:
+            metadata["doc_id"] = str(node.metadata["doc_id"])
+        return {
+            "text": node.get_content(metadata_mode=MetadataMode.NONE),
+            "metadata_": json.dumps(metadata),
+            "node_id": node.node_id,
+            "embedding": _vector_literal(node.get_embedding()),
+        }
+
+    def replace_document_chunks(self, filename: str, doc_id: int, nodes: List[BaseNode], content_hash: Optional[str]) -> bool:
+        # Old chunks out, new (already embedded) chunks in and the document marked as indexed at content_hash,
+        # in one transaction: readers see either the old or the new version of the document, never both or neither
+        try:
+            self.vector_store.add([])  # PGVectorStore creates its table lazily on first use
+            rows = [self._node_to_row(node) for node in nodes]
+            started_at = time.perf_counter()
+            with self.get_engine().begin() as connection:
+                connection.execute(text(DELETE_DOCUMENT_CHUNKS_QUERY.strip()), {"filename": filename})
+                if rows and self.bulk_load_stats is not None:
+                    self._copy_rows(connection, rows)
+                elif rows:
+                    connection.execute(text(INSERT_EMBEDDING_QUERY.strip()), rows)
+                connection.execute(text(UPDATE_DOCUMENT_INDEXED_QUERY.strip()), {"doc_id": int(doc_id), "content_hash": content_hash, "num_of_nodes": len(rows)})
+            if self.bulk_load_stats is not None:
+                self.bulk_load_stats["documents"] += 1
+                self.bulk_load_stats["rows"] += len(rows)
+                self.bulk_load_stats["load_seconds"] += time.perf_counter() - started_at
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to replace the chunks of {filename}: {e}")
+            return False
+
+    def _copy_rows(self, connection, rows: List[Dict[str, Any]]):
+        # COPY through the psycopg2 connection behind the SQLAlchemy one, so it joins the same transaction
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_field(row[column]) for column in ["text", "metadata_", "node_id", "embedding"]))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(COPY_EMBEDDING_QUERY.strip(), buffer)
+        finally:
+            cursor.close()
+
+    def begin_bulk_load(self) -> bool:
+        # Cold loads: without a live HNSW index every chunk is a plain COPY, the index is built once at the end.
+        # Until then vector search falls back to an exact scan; an interrupted load gets its index back on the next start-up.
+        # A corpus with more than bulk_load_max_existing_chunks chunks is being served, its index is never dropped.
+        try:
+            self.vector_store.add([])
+            index_name = VECTOR_STORAGE_INDEXES[self.vector_storage][0]
+            with self.get_engine().begin() as connection:
+                existing_chunks = connection.execute(text(COUNT_EMBEDDING_ROWS_QUERY.strip()), {"limit": self.bulk_load_max_existing_chunks + 1}).scalar()
+                if existing_chunks > self.bulk_load_max_existing_chunks:
+                    self.logger.info(f"Bulk load skipped, {TABLE_NAME_EMBEDDING_DATA} already holds more than {self.bulk_load_max_existing_chunks} chunk(s) served by the live HNSW index.")
+                    return False
+                connection.execute(text(DROP_INDEX_QUERY.replace("[INDEX_NAME]", index_name).strip()))
+            self.bulk_load_stats = {"documents": 0, "rows": 0, "load_seconds": 0.0, "index_build_seconds": 0.0}
+            self.logger.info(f"Bulk load started, HNSW index {index_name} dropped until the load finishes.")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to start the bulk load, chunks are inserted into the live index: {e}")
+            return False
+
+    def finish_bulk_load(self) -> Optional[Dict[str, Any]]:
+        bulk_load_stats = self.bulk_load_stats
+        if bulk_load_stats is None:
+            return None
+        self.bulk_load_stats = None
+        build_settings = {
+            "maintenance_work_mem": self.bulk_load_maintenance_work_mem,
+            "max_parallel_maintenance_workers": self.bulk_load_parallel_workers,
+        }
+        started_at = time.perf_counter()
+        self.ensure_vector_storage_index(build_settings=build_settings)
+        bulk_load_stats["index_build_seconds"] = time.perf_counter() - started_at
+        self.logger.info(
+            f"Bulk load finished: {bulk_load_stats['rows']} chunk(s) of {bulk_load_stats['documents']} document(s) "
+            f"loaded in {bulk_load_stats['load_seconds']:.2f}s, HNSW index built in {bulk_load_stats['index_build_seconds']:.2f}s."
+        )
+        return bulk_load_stats
+
     def check_connection(self):
         return DatabaseManager().check_connection()
 
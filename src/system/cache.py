@@ -0,0 +1,167 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-memory cache bounded by entry count (least recently used is evicted first)
+    and by age (entries older than ttl_seconds are treated as missing). A ttl of 0 disables expiry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 0):
+        self.max_size = max(int(max_size), 1)
+        self.ttl_seconds = float(ttl_seconds or 0)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and (now - stored_at) > self.ttl_seconds
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, stored_at = entry
+            if self._is_expired(stored_at, now):
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (value, stored_at) in self._entries.items() if not self._is_expired(stored_at, now)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class PersistentEmbeddingCache:
+    """
+    Thread-safe on-disk (SQLite) cache of text embeddings keyed by (sha256 of the text, model name).
+    Entries never expire: the same text embedded by the same model always gives the same vector.
+    Vectors are stored as float32 bytes.
+    """
+
+    LOOKUP_BATCH_SIZE = 500  # stays below SQLite's bound-parameter limit
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embedding ("
+            "text_hash TEXT NOT NULL, model TEXT NOT NULL, embedding BLOB NOT NULL, "
+            "PRIMARY KEY (text_hash, model)) WITHOUT ROWID"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        text_hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        with self._lock:
+            unique_hashes = list(set(text_hashes))
+            for start in range(0, len(unique_hashes), self.LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + self.LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    f"SELECT text_hash, embedding FROM chunk_embedding WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                found.update({text_hash: np.frombuffer(embedding, dtype=np.float32).tolist() for text_hash, embedding in rows})
+            embeddings = [found.get(text_hash) for text_hash in text_hashes]
+            self.hits += sum(1 for embedding in embeddings if embedding is not None)
+            self.misses += sum(1 for embedding in embeddings if embedding is None)
+        return embeddings
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        rows = [
+            (self.text_hash(text), model, np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO chunk_embedding (text_hash, model, embedding) VALUES (?, ?, ?)", rows)
+            self._connection.commit()
+            self.writes += len(rows)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.writes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -38,6 +38,17 @@ CONFIG_MAP = [
     # Document files settings
     {'conf_name': 'data_folder_raw', 'env_name': 'DATA_FOLDER_RAW', 'default_value': 'data/raw', 'is_required': True},
     {'conf_name': 'data_folder_processed', 'env_name': 'DATA_FOLDER_PROCESSED', 'default_value': 'data/processed', 'is_required': True},
+    {'conf_name': 'conversion_workers', 'env_name': 'CONVERSION_WORKERS', 'default_value': 1, 'is_required': False},
+    {'conf_name': 'conversion_timeout_seconds', 'env_name': 'CONVERSION_TIMEOUT_SECONDS', 'default_value': 600, 'is_required': False},
+    {'conf_name': 'ingestion_queue_size', 'env_name': 'INGESTION_QUEUE_SIZE', 'default_value': 2, 'is_required': False},
+    {'conf_name': 'ingestion_embed_batch_size', 'env_name': 'INGESTION_EMBED_BATCH_SIZE', 'default_value': 128, 'is_required': False},
+    {'conf_name': 'ingestion_embed_workers', 'env_name': 'INGESTION_EMBED_WORKERS', 'default_value': 2, 'is_required': False},
+    {'conf_name': 'chunk_embedding_cache_enabled', 'env_name': 'CHUNK_EMBEDDING_CACHE_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'chunk_embedding_cache_path', 'env_name': 'CHUNK_EMBEDDING_CACHE_PATH', 'default_value': 'data/embedding_cache/chunk_embeddings.sqlite', 'is_required': False},
+    {'conf_name': 'bulk_load_min_documents', 'env_name': 'BULK_LOAD_MIN_DOCUMENTS', 'default_value': 0, 'is_required': False},
+    {'conf_name': 'bulk_load_max_existing_chunks', 'env_name': 'BULK_LOAD_MAX_EXISTING_CHUNKS', 'default_value': 0, 'is_required': False},
+    {'conf_name': 'bulk_load_maintenance_work_mem', 'env_name': 'BULK_LOAD_MAINTENANCE_WORK_MEM', 'default_value': '1GB', 'is_required': False},
+    {'conf_name': 'bulk_load_parallel_workers', 'env_name': 'BULK_LOAD_PARALLEL_WORKERS', 'default_value': 2, 'is_required': False},
     
     # PostgreSQL settings
     {'conf_name': 'postgresql_host', 'env_name': 'POSTGRES_HOST', 'default_value': 'localhost', 'is_required': True},
@@ -53,11 +64,50 @@ CONFIG_MAP = [
 
     # Indexing settings
     {'conf_name': 'model_embedding', 'env_name': 'EMBEDDING_MODEL', 'default_value': 'BAAI/bge-large-en', 'is_required': True},
+    {'conf_name': 'embedding_backend', 'env_name': 'EMBEDDING_BACKEND', 'default_value': 'huggingface', 'is_required': False},
+    {'conf_name': 'onnx_quantization', 'env_name': 'ONNX_QUANTIZATION', 'default_value': 'none', 'is_required': False},
+    {'conf_name': 'onnx_intra_op_threads', 'env_name': 'ONNX_INTRA_OP_THREADS', 'default_value': 0, 'is_required': False},
+    {'conf_name': 'onnx_model_dir', 'env_name': 'ONNX_MODEL_DIR', 'default_value': 'data/onnx_models', 'is_required': False},
 
     {'conf_name': 'chunk_size', 'env_name': 'CHUNK_SIZE', 'default_value': 1000, 'is_required': True},
     {'conf_name': 'chunk_overlap', 'env_name': 'CHUNK_OVERLAP', 'default_value': 200, 'is_required': True},
     {'conf_name': 'top_k_retrieval', 'env_name': 'TOP_K_RETRIEVAL', 'default_value': 10, 'is_required': True},
     {'conf_name': 'top_k_rerank', 'env_name': 'TOP_K_RERANK', 'default_value': 3, 'is_required': True},
+    {'conf_name': 'retrieval_mode', 'env_name': 'RETRIEVAL_MODE', 'default_value': 'vector', 'is_required': False},
+    {'conf_name': 'text_search_config', 'env_name': 'TEXT_SEARCH_CONFIG', 'default_value': 'english', 'is_required': False},
+    {'conf_name': 'vector_storage', 'env_name': 'VECTOR_STORAGE', 'default_value': 'float32', 'is_required': False},
+    {'conf_name': 'vector_rescore_factor', 'env_name': 'VECTOR_RESCORE_FACTOR', 'default_value': 0, 'is_required': False},
+    {'conf_name': 'vector_reduced_dim', 'env_name': 'VECTOR_REDUCED_DIM', 'default_value': 256, 'is_required': False},
+    {'conf_name': 'hnsw_m', 'env_name': 'HNSW_M', 'default_value': 16, 'is_required': False},
+    {'conf_name': 'hnsw_ef_construction', 'env_name': 'HNSW_EF_CONSTRUCTION', 'default_value': 64, 'is_required': False},
+    {'conf_name': 'hnsw_ef_search', 'env_name': 'HNSW_EF_SEARCH', 'default_value': 40, 'is_required': False},
+    {'conf_name': 'ann_index_enabled', 'env_name': 'ANN_INDEX_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'ann_index_snapshot_dir', 'env_name': 'ANN_INDEX_SNAPSHOT_DIR', 'default_value': 'data/ann_index', 'is_required': False},
+    {'conf_name': 'ann_index_nprobe', 'env_name': 'ANN_INDEX_NPROBE', 'default_value': 8, 'is_required': False},
+    {'conf_name': 'ann_index_refresh_seconds', 'env_name': 'ANN_INDEX_REFRESH_SECONDS', 'default_value': 30, 'is_required': False},
+    {'conf_name': 'rerank_mode', 'env_name': 'RERANK_MODE', 'default_value': 'embed', 'is_required': False},
+    {'conf_name': 'mmr_enabled', 'env_name': 'MMR_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'mmr_lambda', 'env_name': 'MMR_LAMBDA', 'default_value': 0.7, 'is_required': False},
+    {'conf_name': 'mmr_duplicate_threshold', 'env_name': 'MMR_DUPLICATE_THRESHOLD', 'default_value': 1.0, 'is_required': False},
+    {'conf_name': 'section_retrieval_enabled', 'env_name': 'SECTION_RETRIEVAL_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'section_chunk_size', 'env_name': 'SECTION_CHUNK_SIZE', 'default_value': 256, 'is_required': False},
+    {'conf_name': 'section_chunk_overlap', 'env_name': 'SECTION_CHUNK_OVERLAP', 'default_value': 32, 'is_required': False},
+    {'conf_name': 'section_max_chars', 'env_name': 'SECTION_MAX_CHARS', 'default_value': 6000, 'is_required': False},
+    {'conf_name': 'context_token_budget', 'env_name': 'CONTEXT_TOKEN_BUDGET', 'default_value': 0, 'is_required': False},
+    {'conf_name': 'context_tokenizer', 'env_name': 'CONTEXT_TOKENIZER', 'default_value': 'NousResearch/Meta-Llama-3-8B-Instruct', 'is_required': False},
+    {'conf_name': 'embedding_cache_size', 'env_name': 'EMBEDDING_CACHE_SIZE', 'default_value': 2048, 'is_required': False},
+    {'conf_name': 'embedding_cache_ttl', 'env_name': 'EMBEDDING_CACHE_TTL', 'default_value': 3600, 'is_required': False},
+    {'conf_name': 'embedding_executor_workers', 'env_name': 'EMBEDDING_EXECUTOR_WORKERS', 'default_value': 2, 'is_required': False},
+    {'conf_name': 'embedding_batching_enabled', 'env_name': 'EMBEDDING_BATCHING_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'embedding_batch_max_size', 'env_name': 'EMBEDDING_BATCH_MAX_SIZE', 'default_value': 32, 'is_required': False},
+    {'conf_name': 'embedding_batch_max_wait_ms', 'env_name': 'EMBEDDING_BATCH_MAX_WAIT_MS', 'default_value': 5, 'is_required': False},
+    {'conf_name': 'retrieval_cache_enabled', 'env_name': 'RETRIEVAL_CACHE_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'retrieval_cache_size', 'env_name': 'RETRIEVAL_CACHE_SIZE', 'default_value': 1024, 'is_required': False},
+    {'conf_name': 'retrieval_cache_ttl', 'env_name': 'RETRIEVAL_CACHE_TTL', 'default_value': 3600, 'is_required': False},
+    {'conf_name': 'answer_cache_enabled', 'env_name': 'ANSWER_CACHE_ENABLED', 'default_value': False, 'is_required': False},
+    {'conf_name': 'answer_cache_similarity_threshold', 'env_name': 'ANSWER_CACHE_SIMILARITY_THRESHOLD', 'default_value': 0.95, 'is_required': False},
+    {'conf_name': 'answer_cache_size', 'env_name': 'ANSWER_CACHE_SIZE', 'default_value': 256, 'is_required': False},
+    {'conf_name': 'answer_cache_ttl', 'env_name': 'ANSWER_CACHE_TTL', 'default_value': 86400, 'is_required': False},
 
     {'conf_name': 'llm_ollama_base_url', 'env_name': 'LLM_OLLAMA_BASE_URL', 'default_value': 'http://localhost:11434', 'is_required': False},
     {'conf_name': 'llm_ollama_model', 'env_name': 'LLM_OLLAMA_MODEL', 'default_value': 'llama3', 'is_required': False},
@@ -11,12 +11,13 @@
 # Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
 # =============================================================================
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import Any, Dict
 
 from system.setup import get_config_logger
 from services.chat_completion import ChatCompletionService
-from models.chat_completion import ChatRequest, ChatCompletionResponse
+from models.chat_completion import ChatRequest, ChatCompletionResponse, RAGRequest
 
 config, logger = get_config_logger()
 router_prefix = config.get('restapi_prefix')
@@ -47,7 +48,34 @@ async def models() -> Dict[str, Any]:
 async def get_config() -> Dict[str, Any]:
     return {"object": "config", "data": config}
 
+@router.get("/metrics/embeddings")
+async def embedding_metrics() -> Dict[str, Any]:
+    rag_manager = chat_completion_service.rag_manager
+    return {
+        "object": "metrics.embeddings",
+        "cache": rag_manager.get_embedding_cache_stats(),
+        "batcher": rag_manager.get_embedding_batcher_stats(),
+        "retrieval_cache": rag_manager.get_retrieval_cache_stats(),
+    }
+
 @router.post("/chat/completions")
 async def chat_completion(req: ChatRequest) -> Dict[str, Any]:
-    result = chat_completion_service.chat_completion(req)
+    # The agent pipeline is synchronous, run it in the threadpool so it does not stall the event loop
+    result = await run_in_threadpool(chat_completion_service.chat_completion, req)
     return ChatCompletionResponse.create_response(result).to_dict()
+
+@router.post("/rag/retrieve")
+async def rag_retrieve(req: RAGRequest) -> Dict[str, Any]:
+    try:
+        context, sources, _, _ = await chat_completion_service.rag_manager.aquery_context_retrieval(
+            req.query,
+            retrieval_mode=req.retrieval_mode,
+            filters=req.filters,
+            ef_search=req.ef_search,
+        )
+    except ValueError as e:
+        # Unknown retrieval mode or filter key, ef_search out of range: the request is wrong, not the server
+        raise HTTPException(status_code=400, detail=str(e))
+    tokens = [source.get("tokens") for source in sources]
+    tokens_used = sum(tokens) if None not in tokens else None
+    return {"object": "rag.context", "context": context, "sources": sources, "tokens_used": tokens_used}
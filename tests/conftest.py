@@ -0,0 +1,30 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+# Unit tests for the pure logic of the application packages (no PostgreSQL, no models).
+# Run from the project root: python -m pytest -q
+
+import os
+import sys
+import logging
+
+# The application packages (system, services, models) live in src/ and import each other from there
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ['OTEL_SDK_DISABLED'] = 'true'
+
+from system import setup
+from system.config import CONFIG_MAP
+
+# Defaults only, the tests never depend on config.yaml
+setup.config = {config['conf_name']: config['default_value'] for config in CONFIG_MAP}
+setup.logger = logging.getLogger("tests")
@@ -0,0 +1,69 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import time
+import threading
+
+import numpy as np
+
+from services.ann_index import InProcessVectorIndex, _MappedPayloads, _normalize_rows
+
+
+def _corpus(num_rows=50, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = _normalize_rows(rng.normal(size=(num_rows, dim)).astype(np.float32))
+    row_ids = np.arange(1, num_rows + 1, dtype=np.int64)
+    payloads = [{"node_id": f"n{i}", "text": f"chunk [{i}] é", "metadata": {"doc_id": str(i)}} for i in range(num_rows)]
+    return row_ids, vectors, payloads
+
+
+def test_snapshot_round_trip_maps_payloads(tmp_path):
+    ann_index = InProcessVectorIndex(engine=None, snapshot_dir=str(tmp_path), refresh_seconds=0)
+    row_ids, vectors, payloads = _corpus()
+    ann_index._save_snapshot(ann_index._build_state(row_ids, vectors, payloads))
+
+    state = ann_index._load_snapshot()
+    assert isinstance(state.payloads, _MappedPayloads)
+    assert len(state.payloads) == len(payloads)
+    assert sorted(state.payloads[i]["node_id"] for i in range(len(payloads))) == sorted(p["node_id"] for p in payloads)
+
+    ann_index.state = state
+    nodes = ann_index.search(vectors[7], top_k=3)
+    assert nodes[0].node.node_id == "n7"
+    assert nodes[0].node.text == "chunk [7] é"
+    assert abs(nodes[0].score - 1.0) < 1e-5
+
+
+def test_background_refresh_runs_off_the_request_path(tmp_path, monkeypatch):
+    ann_index = InProcessVectorIndex(engine=None, snapshot_dir=str(tmp_path), refresh_seconds=0.01)
+    refreshed = threading.Event()
+    monkeypatch.setattr(ann_index, "refresh", lambda: refreshed.set() or True)
+
+    ann_index.start_background_refresh()
+    try:
+        assert refreshed.wait(2.0)
+    finally:
+        ann_index.stop_background_refresh()
+    assert ann_index._refresh_thread is None
+
+
+def test_search_does_not_wait_for_a_running_refresh(tmp_path):
+    ann_index = InProcessVectorIndex(engine=None, snapshot_dir=str(tmp_path), refresh_seconds=0)
+    row_ids, vectors, payloads = _corpus()
+    ann_index.state = ann_index._build_state(row_ids, vectors, payloads)
+
+    with ann_index._lock:  # what a refresh holds while it rebuilds
+        start = time.perf_counter()
+        nodes = ann_index.search(vectors[0], top_k=1)
+        assert time.perf_counter() - start < 1.0
+    assert nodes[0].node.node_id == "n0"
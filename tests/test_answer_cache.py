@@ -0,0 +1,62 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import threading
+
+from services.answer_cache import SemanticAnswerCache
+
+
+def test_similar_query_in_same_scope_hits():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.store("what is the refund policy", [1.0, 0.0, 0.0], scope=1, response={"answer": "30 days"})
+
+    response, info = cache.lookup("what's the refund policy", [0.99, 0.05, 0.0], scope=1)
+    assert response == {"answer": "30 days"}
+    assert info["hit"] and info["cached_query"] == "what is the refund policy"
+
+
+def test_other_scope_or_dissimilar_query_misses():
+    cache = SemanticAnswerCache(similarity_threshold=0.95)
+    cache.store("what is the refund policy", [1.0, 0.0, 0.0], scope=1, response={"answer": "30 days"})
+
+    assert cache.lookup("what is the refund policy", [1.0, 0.0, 0.0], scope=2)[0] is None
+    response, info = cache.lookup("who signs contracts", [0.0, 1.0, 0.0], scope=1)
+    assert response is None and not info["hit"]
+    assert info["similarity"] < 0.95
+
+
+def test_cached_response_is_a_copy():
+    cache = SemanticAnswerCache()
+    cache.store("q", [1.0, 0.0], scope=1, response={"sources": ["a"]})
+    response, _ = cache.lookup("q", [1.0, 0.0], scope=1)
+    response["sources"].append("b")
+    assert cache.lookup("q", [1.0, 0.0], scope=1)[0] == {"sources": ["a"]}
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    cache = SemanticAnswerCache()
+    cache.store("q", [1.0, 0.0], scope=1, response={})
+
+    def lookups():
+        for _ in range(500):
+            cache.lookup("q", [1.0, 0.0], scope=1)
+            cache.lookup("q", [1.0, 0.0], scope=2)
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["hits"] == 4000 and stats["misses"] == 4000
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,89 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import threading
+
+from llama_index.core import Document
+
+from system import setup
+from system.cache import PersistentEmbeddingCache
+from models.database import EmbeddingModelState
+from services.rag import RAGManager, EMBED_TEXT_VERSION
+
+
+def _chunk_texts(document):
+    rag_manager = RAGManager.__new__(RAGManager)
+    rag_manager.config, rag_manager.logger = setup.config, setup.logger
+    rag_manager._node_parser, rag_manager._shared_objects_lock = None, threading.Lock()
+    rag_manager.section_retrieval_enabled = False
+    return rag_manager._chunk_texts(rag_manager._chunk_document("a.md", document))
+
+
+def test_chunk_texts_leave_out_bookkeeping_metadata():
+    text = "Retrieval augmented generation. " * 10
+    first = _chunk_texts(Document(text=text, metadata={"filename": "a.md", "title": "A", "doc_id": 1, "sections_count": 3}))
+    second = _chunk_texts(Document(text=text, metadata={"filename": "a.md", "title": "A", "doc_id": 2, "sections_count": 4}))
+    assert first == second
+    assert "title: A" in first[0] and "doc_id" not in first[0] and "chunk_id" not in first[0]
+
+
+def test_persistent_cache_round_trip_per_model(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite")
+    cache = PersistentEmbeddingCache(path)
+    cache.put_many("model-a", ["x", "y"], [[0.5, 1.0], [2.0, 0.25]])
+    assert cache.get_many("model-a", ["y", "z", "x"]) == [[2.0, 0.25], None, [0.5, 1.0]]
+    assert cache.get_many("model-b", ["x"]) == [None]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (2, 2, 2)
+
+    # Entries survive the process, stats do not
+    reopened = PersistentEmbeddingCache(path)
+    assert reopened.get_many("model-a", ["x"]) == [[0.5, 1.0]]
+    reopened.reset_stats()
+    assert reopened.stats()["hits"] == 0
+
+
+class _FakeVectorStoreManager:
+    embed_dim = 1024
+
+    def get_embedding_table_state(self):
+        return 1024, True
+
+
+class _FakeDatabaseManager:
+    def __init__(self, model_state):
+        self.model_state = model_state
+
+    def get_embedding_model_state(self):
+        return self.model_state
+
+    def save_embedding_model_state(self, model_name, embed_dim, embed_text_version):
+        self.model_state = EmbeddingModelState(id=1, model_name=model_name, embed_dim=embed_dim, embed_text_version=embed_text_version)
+        return True
+
+
+def _check_embedding_model(model_state):
+    rag_manager = RAGManager.__new__(RAGManager)
+    rag_manager.config, rag_manager.logger = setup.config, setup.logger
+    rag_manager.embedding_model_name = "BAAI/bge-large-en"
+    rag_manager.vector_store_manager, rag_manager.db_manager = _FakeVectorStoreManager(), _FakeDatabaseManager(model_state)
+    return rag_manager._check_embedding_model()
+
+
+def test_tables_of_another_embed_text_version_need_a_re_index():
+    current = EmbeddingModelState(id=1, model_name="BAAI/bge-large-en", embed_dim=1024, embed_text_version=EMBED_TEXT_VERSION)
+    assert _check_embedding_model(current) is None
+    previous = EmbeddingModelState(id=1, model_name="BAAI/bge-large-en", embed_dim=1024, embed_text_version=1)
+    assert "re-index" in _check_embedding_model(previous)
+    # Tables indexed before any state was recorded predate the embed text versions
+    assert "re-index" in _check_embedding_model(None)
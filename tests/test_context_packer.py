@@ -0,0 +1,58 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from services.context_packer import ContextPacker
+
+
+class _WordTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+
+def _packer(token_budget):
+    packer = ContextPacker(token_budget, "unused")
+    packer.tokenizer, packer.is_tokenizer_loaded = _WordTokenizer(), True
+    return packer
+
+
+def _nodes(*texts):
+    return [NodeWithScore(node=TextNode(id_=str(i), text=text), score=1.0) for i, text in enumerate(texts)]
+
+
+def _format_block(position, node):
+    return f"[{position}] {node.node.get_content()}"
+
+
+def test_pack_skips_chunks_that_do_not_fit_and_keeps_later_ones():
+    nodes = _nodes("a b c", "d e f g h i", "j")
+    packed, token_counts = _packer(6).pack(nodes, _format_block)
+    assert [node.node.node_id for node in packed] == ["0", "2"]
+    assert token_counts == [4, 2]
+
+
+def test_positions_follow_the_packed_order():
+    blocks = []
+    _packer(100).pack(_nodes("a", "b"), lambda position, node: blocks.append(position) or _format_block(position, node))
+    assert blocks == [1, 2]
+
+
+def test_nothing_fits():
+    assert _packer(1).pack(_nodes("a b c"), _format_block) == ([], [])
+
+
+def test_character_estimate_without_tokenizer():
+    packer = ContextPacker(10, "unused")
+    packer.is_tokenizer_loaded = True
+    assert packer.count_tokens("abcdefghi") == 3
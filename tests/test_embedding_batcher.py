@@ -0,0 +1,94 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import threading
+
+import pytest
+
+from system.cache import PersistentEmbeddingCache
+from services.embedding_batcher import MicroBatchEmbeddingExecutor, IngestionEmbeddingBatcher, PROMPT_QUERY, PROMPT_TEXT
+
+
+class _FakeEmbedModel:
+    # Embeds a text as [len(text)], query embeddings are negated, records every batch call
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def get_query_embedding(self, text):
+        return [-float(len(text))]
+
+    def get_text_embedding_batch(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model failed")
+        return [[float(len(text))] for text in texts]
+
+
+def test_micro_batches_keep_prompts_apart():
+    executor = MicroBatchEmbeddingExecutor(_FakeEmbedModel(), max_batch_size=8, max_wait_ms=50)
+    try:
+        futures = [executor.submit("ab", PROMPT_TEXT), executor.submit("abc", PROMPT_QUERY), executor.submit("a", PROMPT_TEXT)]
+        assert [future.result(timeout=5) for future in futures] == [[2.0], [-3.0], [1.0]]
+        stats = executor.stats()
+        assert stats["submitted"] == stats["embedded"] == 3
+    finally:
+        executor.shutdown()
+
+
+def test_micro_batch_failure_reaches_every_caller():
+    executor = MicroBatchEmbeddingExecutor(_FakeEmbedModel(fail=True), max_batch_size=8, max_wait_ms=1)
+    try:
+        with pytest.raises(RuntimeError):
+            executor.submit("ab").result(timeout=5)
+    finally:
+        executor.shutdown()
+
+
+def test_ingestion_batches_pool_chunks_across_documents():
+    embed_model = _FakeEmbedModel()
+    batcher = IngestionEmbeddingBatcher(embed_model, batch_size=4, num_workers=1)
+    try:
+        first = batcher.submit(["a", "bb", "ccc"])
+        second = batcher.submit(["dddd", "e"])
+        assert batcher.results(first) == [[1.0], [2.0], [3.0]]
+        assert batcher.results(second) == [[4.0], [1.0]]
+        assert embed_model.batches == [["a", "bb", "ccc", "dddd"], ["e"]]
+        assert batcher.stats()["embedded"] == 5
+    finally:
+        batcher.shutdown()
+
+
+def test_ingestion_batch_failure_reaches_its_futures():
+    batcher = IngestionEmbeddingBatcher(_FakeEmbedModel(fail=True), batch_size=2, num_workers=1)
+    try:
+        futures = batcher.submit(["a"])
+        with pytest.raises(RuntimeError):
+            batcher.results(futures)
+    finally:
+        batcher.shutdown()
+
+
+def test_ingestion_answers_cached_chunks_without_embedding(tmp_path):
+    cache = PersistentEmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cache.put_many("model", ["a"], [[9.0]])
+    embed_model = _FakeEmbedModel()
+    batcher = IngestionEmbeddingBatcher(embed_model, batch_size=8, cache=cache, cache_model="model")
+    try:
+        assert batcher.results(batcher.submit(["a", "bb"])) == [[9.0], [2.0]]
+        assert embed_model.batches == [["bb"]]
+        assert cache.get_many("model", ["bb"]) == [[2.0]]
+    finally:
+        batcher.shutdown()
@@ -0,0 +1,68 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import time
+
+from system.cache import LRUTTLCache
+from services.rag import RAGManager
+
+
+class FakeEmbedModel:
+    model_name = "fake-model"
+
+    def __init__(self):
+        self.calls = []
+
+    def get_query_embedding(self, text):
+        self.calls.append(("query", text))
+        return [float(len(text)), 1.0]
+
+    def get_text_embedding(self, text):
+        self.calls.append(("text", text))
+        return [float(len(text)), 0.0]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries():
+    cache = LRUTTLCache(max_size=10, ttl_seconds=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a", "missing") == "missing"
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 0
+
+
+def test_cached_embedding_embeds_the_normalized_key_text(monkeypatch):
+    embed_model = FakeEmbedModel()
+    monkeypatch.setattr(RAGManager, "embed_model", embed_model)
+    monkeypatch.setattr(RAGManager, "embedding_cache", LRUTTLCache(max_size=10))
+    rag_manager = RAGManager.__new__(RAGManager)
+
+    first = rag_manager.get_query_embedding("what  is\tthis ")
+    second = rag_manager.get_query_embedding("what is this")
+    assert first == second
+    assert embed_model.calls == [("query", "what is this")]
+
+    # Query and text embeddings of the same text are separate entries
+    rag_manager.get_text_embedding("what is this")
+    assert embed_model.calls[-1] == ("text", "what is this")
@@ -0,0 +1,42 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+from llama_index.core import MockEmbedding
+from llama_index.core.callbacks import CallbackManager, LlamaDebugHandler
+from llama_index.core.callbacks.schema import CBEventType
+
+from services.embeddings import register_embedding_backend, get_query_embedding_batch
+
+
+def _create_mock_embedding(model_name, config):
+    return MockEmbedding(embed_dim=2)
+
+
+def test_query_batch_goes_through_the_backend_in_one_call_with_callbacks():
+    calls = []
+
+    def embed_queries(embed_model, queries):
+        calls.append(list(queries))
+        return [[float(len(query)), 0.0] for query in queries]
+
+    register_embedding_backend("test-batched", _create_mock_embedding, embed_queries)
+    debug_handler = LlamaDebugHandler()
+    embed_model = MockEmbedding(embed_dim=2, callback_manager=CallbackManager([debug_handler]))
+    assert get_query_embedding_batch(embed_model, ["a", "bbb"], backend_name="test-batched") == [[1.0, 0.0], [3.0, 0.0]]
+    assert calls == [["a", "bbb"]]
+    assert len(debug_handler.get_event_pairs(CBEventType.EMBEDDING)) == 1
+
+
+def test_backends_without_a_query_batch_embedder_use_the_public_api():
+    register_embedding_backend("test-plain", _create_mock_embedding)
+    assert get_query_embedding_batch(MockEmbedding(embed_dim=2), ["a", "b"], backend_name="test-plain") == [[0.5, 0.5], [0.5, 0.5]]
@@ -0,0 +1,65 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import threading
+
+from services.ingestion_pipeline import StreamingPipeline
+
+
+def test_items_pass_every_stage_in_order():
+    written = []
+    pipeline = StreamingPipeline([("double", lambda item: item * 2), ("write", lambda item: written.append(item) or True)], queue_size=1)
+    assert pipeline.run(range(1, 6)) == 5
+    assert written == [2, 4, 6, 8, 10]
+
+
+def test_falsy_results_and_failing_items_are_dropped():
+    def check(item):
+        if item == 3:
+            raise ValueError("broken document")
+        return item if item % 2 else None
+
+    written = []
+    pipeline = StreamingPipeline([("check", check), ("write", lambda item: written.append(item) or True)])
+    assert pipeline.run(range(1, 8)) == 3
+    assert written == [1, 5, 7]
+
+
+def test_queued_items_finish_when_the_source_fails():
+    def source():
+        yield 1
+        yield 2
+        raise RuntimeError("conversion failed")
+
+    assert StreamingPipeline([("write", lambda item: True)]).run(source()) == 2
+
+
+def test_a_slow_stage_bounds_the_items_in_flight():
+    release, in_flight, max_in_flight, lock = threading.Event(), [0], [0], threading.Lock()
+
+    def source():
+        for item in range(10):
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            yield item
+
+    def slow_write(item):
+        release.wait(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return True
+
+    assert StreamingPipeline([("write", slow_write)], queue_size=2).run(source()) == 10
+    # queue_size waiting, one being written and one blocked in put()
+    assert max_in_flight[0] <= 4
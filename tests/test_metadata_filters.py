@@ -0,0 +1,121 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import asyncio
+
+import pytest
+from llama_index.core import QueryBundle
+from llama_index.core.vector_stores.types import FilterOperator, VectorStoreQueryMode
+
+from services.rag import RAGManager
+from services.vectorstore import VectorStoreManager, normalize_metadata_filters, build_metadata_filters
+
+
+class _FakeResult:
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def all(self):
+        return []
+
+
+class _FakeEngine:
+    # Records the SQL a VectorStoreManager issues, answers the pgvector version query
+    def __init__(self, pgvector_version):
+        self.pgvector_version = pgvector_version
+        self.statements = []
+
+    def begin(self):
+        return self
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        return _FakeResult(self.pgvector_version if "pg_extension" in sql else None)
+
+
+def _search(pgvector_version, filters):
+    manager = VectorStoreManager()
+    manager.engine = _FakeEngine(pgvector_version)
+    manager.batch_vector_search([[0.1] * manager.embed_dim], top_k=3, filters=filters, ef_search=80)
+    return [sql for sql in manager.engine.statements if sql.startswith("SET LOCAL")]
+
+
+def test_normalize_metadata_filters():
+    assert normalize_metadata_filters({"doc_id": 7, "filename": ["b.pdf", "a.pdf"], "title": None}) == {"doc_id": ["7"], "filename": ["a.pdf", "b.pdf"]}
+    with pytest.raises(ValueError):
+        normalize_metadata_filters({"author": "x"})
+
+
+def test_build_metadata_filters_escapes_quotes():
+    assert build_metadata_filters({}) is None
+    metadata_filters = build_metadata_filters({"title": ["O'Brien"]})
+    assert metadata_filters.filters[0].operator == FilterOperator.IN
+    assert metadata_filters.filters[0].value == ["O''Brien"]
+
+
+def test_filtered_search_scans_iteratively_on_pgvector_0_8():
+    assert _search("0.8.0", {"doc_id": ["7"]}) == ["SET LOCAL hnsw.ef_search = 80", "SET LOCAL hnsw.iterative_scan = relaxed_order"]
+
+
+def test_filtered_search_scans_exactly_before_pgvector_0_8():
+    assert _search("0.7.4", {"doc_id": ["7"]}) == ["SET LOCAL hnsw.ef_search = 80", "SET LOCAL enable_indexscan = off"]
+
+
+def test_unfiltered_search_keeps_the_hnsw_scan():
+    assert _search("0.8.0", None) == ["SET LOCAL hnsw.ef_search = 80"]
+
+
+def test_dense_retrieval_sets_ef_search_for_its_transaction_only():
+    rag_manager = RAGManager.__new__(RAGManager)
+    rag_manager.vector_store_manager = VectorStoreManager()
+    rag_manager.vector_store_manager.engine = _FakeEngine("0.8.0")
+    query_bundle = QueryBundle(query_str="query", embedding=[0.1] * rag_manager.vector_store_manager.embed_dim)
+    rag_manager._run_retriever(query_bundle, 3, VectorStoreQueryMode.DEFAULT, ef_search=120)
+    settings = [sql for sql in rag_manager.vector_store_manager.engine.statements if sql.startswith("SET")]
+    assert settings == ["SET LOCAL hnsw.ef_search = 120"]
+
+
+class _FakeAsyncEngine(_FakeEngine):
+    # Async twin of _FakeEngine: connect() and begin() are async context managers, execute is awaited
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def execute(self, statement, params=None):
+        return _FakeEngine.execute(self, statement, params)
+
+
+def test_async_dense_retrieval_runs_on_the_async_engine_in_one_transaction():
+    rag_manager = RAGManager.__new__(RAGManager)
+    rag_manager.vector_store_manager = VectorStoreManager()
+    rag_manager.vector_store_manager.engine = None  # the sync engine must not be used
+    rag_manager.vector_store_manager.async_engine = _FakeAsyncEngine("0.8.0")
+    query_bundle = QueryBundle(query_str="query", embedding=[0.1] * rag_manager.vector_store_manager.embed_dim)
+    asyncio.run(rag_manager._arun_retriever(query_bundle, 3, VectorStoreQueryMode.DEFAULT, filters={"doc_id": ["7"]}, ef_search=120))
+    settings = [sql for sql in rag_manager.vector_store_manager.async_engine.statements if sql.startswith("SET")]
+    assert settings == ["SET LOCAL hnsw.ef_search = 120", "SET LOCAL hnsw.iterative_scan = relaxed_order"]
@@ -0,0 +1,35 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import numpy as np
+
+from services.rag import _mmr_select
+
+
+def test_pure_relevance_order_at_lambda_one():
+    relevance = np.array([0.2, 0.9, 0.5])
+    node_embs = np.eye(3)
+    assert _mmr_select(relevance, node_embs, top_k=3, lambda_mult=1.0) == [1, 2, 0]
+
+
+def test_diversity_beats_a_near_copy():
+    relevance = np.array([0.9, 0.85, 0.6])
+    node_embs = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+    assert _mmr_select(relevance, node_embs, top_k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_exact_duplicates_are_kept_at_threshold_one():
+    relevance = np.array([0.9, 0.8])
+    node_embs = [[1.0, 2.0, 3.0], [1.0, 2.0, 3.0]]  # self-similarity rounds to exactly 1.0
+    assert _mmr_select(relevance, node_embs, top_k=2, lambda_mult=0.7, duplicate_threshold=1.0) == [0, 1]
+    assert _mmr_select(relevance, node_embs, top_k=2, lambda_mult=0.7, duplicate_threshold=0.95) == [0]
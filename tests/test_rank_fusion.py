@@ -0,0 +1,39 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from services.rag import _reciprocal_rank_fusion, RRF_K
+
+
+def _ranked(*node_ids):
+    return [NodeWithScore(node=TextNode(id_=node_id, text=node_id), score=1.0) for node_id in node_ids]
+
+
+def test_nodes_in_both_lists_rank_first():
+    fused = _reciprocal_rank_fusion([_ranked("a", "b", "c"), _ranked("c", "d")], top_k=4)
+    assert [node.node.node_id for node in fused] == ["c", "a", "b", "d"]
+    assert fused[0].score == 1.0 / (RRF_K + 3) + 1.0 / (RRF_K + 1)
+
+
+def test_fusion_is_cut_to_top_k_and_keeps_first_node_object():
+    dense, lexical = _ranked("a", "b"), _ranked("b", "a", "c")
+    fused = _reciprocal_rank_fusion([dense, lexical], top_k=2)
+    assert len(fused) == 2
+    assert {node.node.node_id for node in fused} == {"a", "b"}
+    assert fused[0].node is dense[0].node or fused[0].node is dense[1].node
+
+
+def test_empty_lists():
+    assert _reciprocal_rank_fusion([[], []], top_k=3) == []
+    assert [node.node.node_id for node in _reciprocal_rank_fusion([_ranked("a"), []], top_k=3)] == ["a"]
@@ -0,0 +1,79 @@
+# =============================================================================
+# © 2025 Kashif Ali Siddiqui, Pakistan
+# Developed by: Kashif Ali Siddiqui 
+# Github: https://github.com/ksiddiqui
+# LinkedIn: https://www.linkedin.com/in/ksiddiqui
+# Email: kashif.ali.siddiqui@gmail.com
+# Dated: July, 2025 
+# -----------------------------------------------------------------------------
+# This source code is the property of Kashif Ali Siddiqui and is confidential.
+# Unauthorized copying or distribution of this file, via any medium, is strictly prohibited.
+# =============================================================================
+
+
+import pytest
+
+from system import setup
+from services.embeddings import EMBEDDING_MODEL_HF_BGE_LARGE, EMBEDDING_MODEL_NOMIC
+from services.vectorstore import VectorStoreManager, VECTOR_STORAGE_BINARY, VECTOR_STORAGE_HALFVEC, VECTOR_STORAGE_REDUCED
+
+
+def test_binary_storage_rescores_ten_candidates_per_result_by_default():
+    manager = VectorStoreManager()
+    manager.vector_storage = VECTOR_STORAGE_BINARY
+    assert manager.resolve_rescore_factor() == 10
+    manager.vector_storage = VECTOR_STORAGE_HALFVEC
+    assert manager.resolve_rescore_factor() == 4
+    manager.rescore_factor = 6
+    assert manager.resolve_rescore_factor() == 6
+
+
+def test_reduced_storage_is_refused_for_models_without_matryoshka_training(monkeypatch):
+    monkeypatch.setitem(setup.config, "vector_storage", VECTOR_STORAGE_REDUCED)
+    monkeypatch.setitem(setup.config, "model_embedding", EMBEDDING_MODEL_HF_BGE_LARGE)
+    with pytest.raises(ValueError):
+        VectorStoreManager()
+    monkeypatch.setitem(setup.config, "model_embedding", EMBEDDING_MODEL_NOMIC)
+    assert VectorStoreManager().vector_storage == VECTOR_STORAGE_REDUCED
+
+
+class _FakeVectorStore:
+    def add(self, nodes):
+        return []
+
+
+class _FakeEngine:
+    # Answers the stored chunk count, records everything else
+    def __init__(self, stored_chunks):
+        self.stored_chunks = stored_chunks
+        self.statements = []
+
+    def begin(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return self
+
+    def scalar(self):
+        return self.stored_chunks
+
+
+def _begin_bulk_load(stored_chunks, max_existing_chunks=0):
+    manager = VectorStoreManager()
+    manager.vector_store, manager.engine = _FakeVectorStore(), _FakeEngine(stored_chunks)
+    manager.bulk_load_max_existing_chunks = max_existing_chunks
+    started = manager.begin_bulk_load()
+    return started, any(sql.startswith("DROP INDEX") for sql in manager.engine.statements)
+
+
+def test_bulk_load_drops_the_index_of_an_empty_table_only():
+    assert _begin_bulk_load(0) == (True, True)
+    assert _begin_bulk_load(1) == (False, False)
+    assert _begin_bulk_load(100, max_existing_chunks=100) == (True, True)